@@ -1,31 +1,236 @@
+import asyncio
 import json
 import os
+import random
+import time
+import weakref
+from collections.abc import AsyncIterator
+from typing import TYPE_CHECKING
 
-from openai import OpenAI
+import httpx
+
+import metrics
+from ai_cache import cache_key, response_cache
+from board_ops import OperationError, apply_operations
+from prompt import ChatPrompt, build_chat_prompt, restore_omitted
+
+if TYPE_CHECKING:
+    # openai takes about half a second to import, longer than the rest of the
+    # app together, so it is imported where a client is first built instead.
+    from openai import AsyncOpenAI, OpenAI
 
 MODEL = "openai/gpt-oss-120b"
 BASE_URL = "https://openrouter.ai/api/v1"
 
 
-def get_client() -> OpenAI:
+# --- client ---
+
+def _setting(name: str, default: float) -> float:
+    return float(os.environ.get(name, default))
+
+
+def _api_key() -> str:
     api_key = os.environ.get("OPENROUTER_API_KEY")
     if not api_key:
         raise ValueError("OPENROUTER_API_KEY environment variable is not set")
-    return OpenAI(base_url=BASE_URL, api_key=api_key)
+    return api_key
+
+
+def _client_options() -> tuple[str, httpx.Timeout, httpx.Limits]:
+    base_url = os.environ.get("AI_BASE_URL", BASE_URL)
+    timeout = httpx.Timeout(
+        _setting("AI_READ_TIMEOUT", 120.0), connect=_setting("AI_CONNECT_TIMEOUT", 5.0)
+    )
+    limits = httpx.Limits(
+        max_connections=int(_setting("AI_MAX_CONNECTIONS", 20)),
+        max_keepalive_connections=int(_setting("AI_MAX_CONNECTIONS", 20)),
+        keepalive_expiry=_setting("AI_KEEPALIVE_SECONDS", 60.0),
+    )
+    return base_url, timeout, limits
+
+
+# Async clients are kept per event loop: an httpx pool cannot be shared across loops.
+_async_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+_sync_clients: dict[tuple, "OpenAI"] = {}
+
+
+def get_client() -> "AsyncOpenAI":
+    """Return the shared async client for this event loop (keep-alive pooled).
+
+    Called outside a running loop it returns a fresh, unshared client.
+    Retries are disabled in the SDK because _complete() retries with its own
+    jittered backoff.
+    """
+    from openai import AsyncOpenAI
+
+    api_key = _api_key()
+    base_url, timeout, limits = _client_options()
+    key = (base_url, api_key, repr(timeout), repr(limits))
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return AsyncOpenAI(base_url=base_url, api_key=api_key, timeout=timeout, max_retries=0)
+    clients = _async_clients.setdefault(loop, {})
+    if key not in clients:
+        clients[key] = AsyncOpenAI(
+            base_url=base_url,
+            api_key=api_key,
+            timeout=timeout,
+            max_retries=0,
+            http_client=httpx.AsyncClient(timeout=timeout, limits=limits),
+        )
+    return clients[key]
+
+
+def get_sync_client() -> "OpenAI":
+    """Return the shared blocking client, for scripts and code off the event loop."""
+    from openai import OpenAI
+
+    api_key = _api_key()
+    base_url, timeout, limits = _client_options()
+    key = (base_url, api_key, repr(timeout), repr(limits))
+    if key not in _sync_clients:
+        _sync_clients[key] = OpenAI(
+            base_url=base_url,
+            api_key=api_key,
+            timeout=timeout,
+            max_retries=int(_setting("AI_MAX_RETRIES", 3)),
+            http_client=httpx.Client(timeout=timeout, limits=limits),
+        )
+    return _sync_clients[key]
+
+
+async def close_clients() -> None:
+    """Close pooled connections (called on shutdown)."""
+    clients = _async_clients.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        await client.close()
+    for client in _sync_clients.values():
+        client.close()
+    _sync_clients.clear()
+
+
+# --- retries and concurrency ---
 
+_limiters: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
 
-def ai_query(prompt: str) -> str:
+
+def _limiter() -> asyncio.Semaphore:
+    """Cap concurrent upstream calls per process (AI_MAX_CONCURRENCY, default 8)."""
+    loop = asyncio.get_running_loop()
+    if loop not in _limiters:
+        _limiters[loop] = asyncio.Semaphore(int(_setting("AI_MAX_CONCURRENCY", 8)))
+    return _limiters[loop]
+
+
+def _retryable(error: Exception) -> bool:
+    from openai import APIConnectionError, APIStatusError
+
+    if isinstance(error, APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return isinstance(error, APIConnectionError)  # includes timeouts
+
+
+def _backoff(attempt: int, error: Exception) -> float:
+    """Full-jitter exponential backoff, never shorter than a server's Retry-After."""
+    from openai import APIStatusError
+
+    ceiling = min(_setting("AI_BACKOFF_MAX", 8.0), _setting("AI_BACKOFF_BASE", 0.5) * 2 ** attempt)
+    delay = random.uniform(0, ceiling)
+    if isinstance(error, APIStatusError):
+        retry_after = error.response.headers.get("retry-after", "")
+        try:
+            delay = max(delay, min(float(retry_after), _setting("AI_BACKOFF_MAX", 8.0)))
+        except ValueError:
+            pass
+    return delay
+
+
+async def _complete(client: "AsyncOpenAI", **kwargs):
+    """chat.completions.create behind the concurrency limiter, retrying 429/5xx.
+
+    For streams only the request itself is retried and limited; the body is
+    consumed after the slot is released.
+    """
+    retries = int(_setting("AI_MAX_RETRIES", 3))
+    kind = "stream" if kwargs.get("stream") else "complete"
+    async with _limiter():
+        for attempt in range(retries + 1):
+            started = time.perf_counter()
+            try:
+                response = await client.chat.completions.create(**kwargs)
+            except Exception as e:
+                metrics.ai_request_seconds.observe(
+                    time.perf_counter() - started, kind=kind, outcome=type(e).__name__
+                )
+                if attempt == retries or not _retryable(e):
+                    raise
+                metrics.ai_retries.inc()
+                await asyncio.sleep(_backoff(attempt, e))
+            else:
+                metrics.ai_request_seconds.observe(
+                    time.perf_counter() - started, kind=kind, outcome="ok"
+                )
+                _count_usage(getattr(response, "usage", None))
+                return response
+
+
+def _count_usage(usage) -> None:
+    if usage is None:
+        return
+    for kind in ("prompt", "completion"):
+        tokens = getattr(usage, f"{kind}_tokens", None)
+        if isinstance(tokens, int):
+            metrics.ai_tokens.inc(tokens, type=kind)
+
+
+async def ai_query(prompt: str, use_cache: bool = True, store: bool = True) -> str:
+    messages = [{"role": "user", "content": prompt}]
+    key = cache_key(MODEL, messages)
+    if use_cache and (cached := await response_cache.get(key)) is not None:
+        return cached
     client = get_client()
-    response = client.chat.completions.create(
+    response = await _complete(
+        client,
         model=MODEL,
-        messages=[{"role": "user", "content": prompt}],
+        messages=messages,
     )
-    return response.choices[0].message.content
+    result = response.choices[0].message.content
+    if store:
+        await response_cache.put(key, result)
+    return result
 
 
 _SYSTEM_PROMPT = """\
 You are a Kanban board assistant. Help the user understand and manage their board.
 
+Always reply with valid JSON — no markdown, no code fences — in exactly this shape:
+{"response": "<plain-text reply>", "operations": []}
+
+If the user asks you to change the board, list the edits as operations:
+{"response": "<plain-text explanation>", "operations": [{"op": "move_card", "id": "card-1", "column": "col-done"}]}
+
+Operations (applied in order; "index" is optional, 0-based, and appends when omitted):
+- {"op": "add_card", "column": "<column id>", "title": "...", "details": "...", "index": 0}
+- {"op": "update_card", "id": "<card id>", "title": "...", "details": "..."}  (either field may be omitted)
+- {"op": "move_card", "id": "<card id>", "column": "<column id>", "index": 0}
+- {"op": "delete_card", "id": "<card id>"}
+- {"op": "add_column", "title": "...", "index": 0}
+- {"op": "update_column", "id": "<column id>", "title": "..."}
+- {"op": "move_column", "id": "<column id>", "index": 0}
+- {"op": "delete_column", "id": "<column id>"}  (also deletes its cards)
+
+Rules:
+- "response" is short, friendly plain text (no markdown).
+- "operations" is an empty list unless you are making changes.
+- Only list what changes; never repeat unchanged cards or columns.
+- Refer to existing cards and columns by the IDs shown in the board.
+"""
+
+# Used when the model's operations cannot be applied: ask once more for a whole board.
+_FULL_BOARD_PROMPT = """\
+You are a Kanban board assistant. Help the user understand and manage their board.
+
 Always reply with valid JSON — no markdown, no code fences — in exactly this shape:
 {"response": "<plain-text reply>", "board": null}
 
@@ -42,27 +247,225 @@ Rules:
 """
 
 
-def ai_chat(board: dict, message: str, history: list[dict]) -> dict:
-    client = get_client()
-
-    board_context = (
-        f"Current board:\n{json.dumps(board, indent=2)}"
-    )
-    system = _SYSTEM_PROMPT + f"\n\n{board_context}"
+def _apply_reply(raw: str, board: dict, prompt: ChatPrompt) -> dict:
+    """Parse an operations reply and apply it to board; raise ValueError if unusable."""
+    result = json.loads(raw)
+    if not isinstance(result, dict):
+        raise OperationError("reply is not a JSON object")
+    operations = result.get("operations") or []
+    return {
+        "response": result.get("response", ""),
+        "board": apply_operations(board, operations) if operations else None,
+        "operations": operations,
+        "promptTokens": prompt.tokens,
+    }
 
-    messages: list[dict] = [{"role": "system", "content": system}]
-    for msg in history:
-        messages.append({"role": msg["role"], "content": msg["content"]})
-    messages.append({"role": "user", "content": message})
 
-    response = client.chat.completions.create(
+async def _full_board_fallback(
+    client: "AsyncOpenAI", board: dict, message: str, history: list[dict]
+) -> dict:
+    """Re-ask in the legacy whole-board format after a malformed operations reply."""
+    prompt = build_chat_prompt(_FULL_BOARD_PROMPT, board, message, history)
+    response = await _complete(
+        client,
         model=MODEL,
-        messages=messages,
+        messages=prompt.messages,
         response_format={"type": "json_object"},
     )
-    raw = response.choices[0].message.content
-    result = json.loads(raw)
+    result = json.loads(response.choices[0].message.content)
+    updated = result.get("board")
+    if isinstance(updated, dict) and prompt.cards_omitted:
+        updated = restore_omitted(board, prompt.board, updated)
     return {
         "response": result.get("response", ""),
-        "board": result.get("board"),
+        "board": updated,
+        "operations": None,
+        "promptTokens": prompt.tokens,
     }
+
+
+async def _chat_result(
+    client: "AsyncOpenAI", raw: str, board: dict, message: str, history: list[dict], prompt: ChatPrompt
+) -> dict:
+    try:
+        return _apply_reply(raw, board, prompt)
+    except ValueError:
+        return await _full_board_fallback(client, board, message, history)
+
+
+async def ai_chat(
+    board: dict, message: str, history: list[dict], use_cache: bool = True, store: bool = True
+) -> dict:
+    """Answer a chat message; board edits come back as operations applied server-side.
+
+    The result carries the full resulting board (or None when nothing changed)
+    so callers never apply operations themselves. Identical requests against
+    an identical board are served from the response cache unless use_cache is
+    False, and the reply is cached for them unless store is False.
+    """
+    prompt = build_chat_prompt(_SYSTEM_PROMPT, board, message, history)
+    metrics.ai_prompt_tokens.observe(prompt.tokens)
+    key = cache_key(MODEL, prompt.messages, board)
+    if use_cache and (cached := await response_cache.get(key)) is not None:
+        return cached
+    client = get_client()
+    response = await _complete(
+        client,
+        model=MODEL,
+        messages=prompt.messages,
+        response_format={"type": "json_object"},
+    )
+    result = await _chat_result(
+        client, response.choices[0].message.content, board, message, history, prompt
+    )
+    if store:
+        await response_cache.put(key, result)
+    return result
+
+
+# --- streaming ---
+
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+class ResponseTextParser:
+    """Incrementally extracts the top-level "response" string from streamed JSON.
+
+    feed() takes raw chunks exactly as the model emits them (which may split
+    keys, escapes or \\u sequences anywhere) and returns only the newly
+    decoded characters of the "response" value.
+    """
+
+    def __init__(self):
+        self._depth = 0
+        self._in_string = False       # inside any string other than the response value
+        self._escape = False
+        self._string: list[str] = []
+        self._last_string: str | None = None
+        self._key: str | None = None  # key whose value is expected next at depth 1
+        self._streaming = False       # inside the response value
+        self._unicode: str | None = None
+        self._high_surrogate: int | None = None
+
+    def feed(self, chunk: str) -> str:
+        out: list[str] = []
+        for ch in chunk:
+            if self._streaming:
+                self._feed_value(ch, out)
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                    self._string.append(ch)
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._last_string = "".join(self._string)
+                else:
+                    self._string.append(ch)
+            elif ch == '"':
+                if self._depth == 1 and self._key == "response":
+                    self._streaming = True
+                else:
+                    self._in_string = True
+                    self._string = []
+                self._key = None
+            elif ch in "{[":
+                self._depth += 1
+                self._key = None
+            elif ch in "}]":
+                self._depth -= 1
+            elif ch == ":" and self._depth == 1:
+                self._key = self._last_string
+            elif not ch.isspace():
+                self._key = None
+        return "".join(out)
+
+    def _feed_value(self, ch: str, out: list[str]) -> None:
+        if self._unicode is not None:
+            self._unicode += ch
+            if len(self._unicode) < 4:
+                return
+            code, self._unicode = int(self._unicode, 16), None
+            if 0xD800 <= code < 0xDC00:
+                self._high_surrogate = code
+                return
+            if 0xDC00 <= code < 0xE000 and self._high_surrogate is not None:
+                code = 0x10000 + ((self._high_surrogate - 0xD800) << 10) + (code - 0xDC00)
+            self._high_surrogate = None
+            out.append(chr(code))
+        elif self._escape:
+            self._escape = False
+            if ch == "u":
+                self._unicode = ""
+            else:
+                out.append(_ESCAPES.get(ch, ch))
+        elif ch == "\\":
+            self._escape = True
+        elif ch == '"':
+            self._streaming = False
+            self._last_string = None
+        else:
+            out.append(ch)
+
+
+async def ai_chat_stream(
+    board: dict, message: str, history: list[dict], use_cache: bool = True, store: bool = True
+) -> AsyncIterator[dict]:
+    """Start a streamed chat completion and return its events.
+
+    The upstream request is made before this returns, so configuration and
+    connection errors surface here rather than mid-stream. The iterator yields
+    {"event": "token", "data": {"text": ...}} for each piece of the reply and
+    finishes with {"event": "board", "data": {"response": ..., "board": ..., "promptTokens": ...}}.
+    """
+    prompt = build_chat_prompt(_SYSTEM_PROMPT, board, message, history)
+    metrics.ai_prompt_tokens.observe(prompt.tokens)
+    key = cache_key(MODEL, prompt.messages, board)
+    if use_cache and (cached := await response_cache.get(key)) is not None:
+        return _cached_events(cached)
+    client = get_client()
+    stream = await _complete(
+        client,
+        model=MODEL,
+        messages=prompt.messages,
+        response_format={"type": "json_object"},
+        stream=True,
+    )
+    return _chat_events(client, stream, board, message, history, prompt, key if store else None)
+
+
+async def _cached_events(result: dict) -> AsyncIterator[dict]:
+    if result["response"]:
+        yield {"event": "token", "data": {"text": result["response"]}}
+    yield {"event": "board", "data": result}
+
+
+async def _chat_events(
+    client: "AsyncOpenAI",
+    stream,
+    board: dict,
+    message: str,
+    history: list[dict],
+    prompt: ChatPrompt,
+    key: str | None,
+) -> AsyncIterator[dict]:
+    parser = ResponseTextParser()
+    parts: list[str] = []
+    started = time.perf_counter()
+    async for chunk in stream:
+        _count_usage(getattr(chunk, "usage", None))
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if not delta:
+            continue
+        parts.append(delta)
+        text = parser.feed(delta)
+        if text:
+            yield {"event": "token", "data": {"text": text}}
+    metrics.ai_stream_seconds.observe(time.perf_counter() - started)
+    result = await _chat_result(client, "".join(parts), board, message, history, prompt)
+    if key is not None:   # None when the client sent Cache-Control: no-store
+        await response_cache.put(key, result)
+    yield {"event": "board", "data": result}
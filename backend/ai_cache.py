@@ -0,0 +1,152 @@
+"""LRU + TTL cache of AI replies, optionally persisted to SQLite.
+
+Keys hash the model, the normalized messages and the board, so a repeated
+question about an unchanged board is answered without an LLM round-trip,
+while any board edit or new chat turn misses. With AI_CACHE_PERSIST=1 entries
+are also written to the ai_cache table and survive restarts.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import jsonio
+from db import get_connection, run_db
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_TTL_SECONDS = 3600.0
+
+
+def board_hash(board: dict | None) -> str | None:
+    if board is None:
+        return None
+    return hashlib.sha256(jsonio.dumps(board, sort_keys=True)).hexdigest()
+
+
+def cache_key(model: str, messages: list[dict], board: dict | None = None) -> str:
+    """Stable key for a request; whitespace-only differences in messages do not matter."""
+    normalized = [
+        {"role": m["role"].strip().lower(), "content": " ".join(m["content"].split())}
+        for m in messages
+    ]
+    material = json.dumps(
+        {"model": model, "messages": normalized, "board": board_hash(board)},
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+class ResponseCache:
+    """In-memory LRU with per-entry expiry, backed by an optional SQLite table."""
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl: float = DEFAULT_TTL_SECONDS,
+        persist: bool = False,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.persist = persist
+        self._entries: OrderedDict[str, tuple[float, object]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._persisted_hits = 0
+
+    async def get(self, key: str):
+        """Return the cached value for key, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created, value = entry
+                if now - created <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return value
+                del self._entries[key]
+                self._expirations += 1
+        if self.persist:
+            row = await run_db(self._load, key)
+            if row is not None and now - row[0] <= self.ttl:
+                with self._lock:
+                    self._store(key, row[0], row[1])
+                    self._hits += 1
+                    self._persisted_hits += 1
+                return row[1]
+        with self._lock:
+            self._misses += 1
+        return None
+
+    async def put(self, key: str, value) -> None:
+        created = time.time()
+        with self._lock:
+            self._store(key, created, value)
+        if self.persist:
+            await run_db(self._save, key, created, value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "persist": self.persist,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "persisted_hits": self._persisted_hits,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+            }
+
+    def _store(self, key: str, created: float, value) -> None:
+        self._entries[key] = (created, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    # --- SQLite persistence (run on the DB executor) ---
+
+    def _load(self, key: str) -> tuple[float, object] | None:
+        with get_connection() as conn:
+            row = conn.execute(
+                "SELECT created_at, value FROM ai_cache WHERE key = ?", (key,)
+            ).fetchone()
+        return (row["created_at"], json.loads(row["value"])) if row else None
+
+    def _save(self, key: str, created: float, value) -> None:
+        with get_connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO ai_cache (key, created_at, value) VALUES (?, ?, ?)",
+                (key, created, json.dumps(value)),
+            )
+            # Same bound as memory: keep the newest max_entries rows, drop expired ones.
+            conn.execute(
+                """
+                DELETE FROM ai_cache
+                WHERE created_at < ?
+                   OR key NOT IN (SELECT key FROM ai_cache ORDER BY created_at DESC LIMIT ?)
+                """,
+                (created - self.ttl, self.max_entries),
+            )
+
+
+response_cache = ResponseCache(
+    max_entries=int(os.environ.get("AI_CACHE_SIZE", DEFAULT_MAX_ENTRIES)),
+    ttl=float(os.environ.get("AI_CACHE_TTL", DEFAULT_TTL_SECONDS)),
+    persist=os.environ.get("AI_CACHE_PERSIST", "") == "1",
+)
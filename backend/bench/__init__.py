@@ -0,0 +1,81 @@
+"""Benchmarks for the backend. Run from backend/, e.g. ``python -m bench.search``.
+
+Each benchmark prints one JSON document so results can be diffed or graphed.
+Documents carry the git commit they were measured at; ``python -m bench.compare
+old.json new.json`` flags latencies that got slower between two runs.
+"""
+
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from collections.abc import Callable
+from pathlib import Path
+
+
+def summarize(samples: list[float]) -> dict:
+    """Mean and percentiles of latencies given in milliseconds."""
+    samples = sorted(samples)
+    if not samples:
+        return {"runs": 0}
+
+    def percentile(p: float) -> float:
+        return round(samples[min(len(samples) - 1, int(len(samples) * p))], 4)
+
+    return {
+        "runs": len(samples),
+        "mean_ms": round(statistics.fmean(samples), 4),
+        "p50_ms": percentile(0.5),
+        "p90_ms": percentile(0.9),
+        "p99_ms": percentile(0.99),
+    }
+
+
+def measure(fn: Callable[[], object], repeat: int) -> dict:
+    """Call fn repeat times and summarize the latencies in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples)
+
+
+def allocations(fn: Callable[[], object]) -> dict:
+    """Peak Python memory allocated during one call of fn, as traced by tracemalloc."""
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"peak_kib": round(peak / 1024, 1)}
+
+
+def _commit() -> str | None:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5
+        )
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+
+def environment() -> dict:
+    return {
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "system": platform.system(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+
+
+def report(name: str, results: dict, output: Path | None = None) -> None:
+    document = json.dumps({"benchmark": name, "environment": environment(), **results}, indent=2)
+    print(document)
+    if output is not None:
+        output.write_text(document + "\n")
@@ -0,0 +1,85 @@
+"""Board lookups as the boards table grows to 100k rows.
+
+Seeds N boards spread over N / BOARDS_PER_USER users, then times reading a
+random user's first board and a board by id. With the boards_by_user index
+both stay flat as N grows (O(log n) B-tree searches); the "no_index" run drops
+the index to show the table scan it replaces. Usage:
+
+    python -m bench.boards --boards 1000 10000 100000 --output boards.json
+"""
+
+import argparse
+import random
+import tempfile
+from pathlib import Path
+
+import db
+from bench import measure, report
+
+BOARDS_PER_USER = 10
+
+
+def _seed(path: Path, boards: int) -> None:
+    db.init_db(path)
+    users = max(1, boards // BOARDS_PER_USER)
+    with db.get_connection(path) as conn:
+        conn.executemany(
+            "INSERT INTO users (username) VALUES (?)", ((f"user-{n}",) for n in range(users))
+        )
+        conn.execute(
+            """
+            INSERT INTO boards (user_id, title)
+            SELECT u.id, 'Board ' || n.value
+            FROM users u, json_each(?) n
+            WHERE u.username LIKE 'user-%'
+            """,
+            (str(list(range(BOARDS_PER_USER))),),
+        )
+        conn.execute("ANALYZE")
+
+
+def _lookups(path: Path, users: int, repeat: int, rng: random.Random) -> dict:
+    def first_board():
+        db.get_versioned_board(f"user-{rng.randrange(users)}", path)
+
+    with db.get_connection(path) as conn:
+        owners = dict(conn.execute(
+            "SELECT b.id, u.username FROM boards b JOIN users u ON u.id = b.user_id"
+        ).fetchall())
+    ids = list(owners)
+
+    def by_id():
+        board_id = rng.choice(ids)
+        db.get_versioned_board(owners[board_id], path, board_id)
+
+    return {"first_board": measure(first_board, repeat), "by_id": measure(by_id, repeat)}
+
+
+def run(sizes: list[int], repeat: int) -> dict:
+    rng = random.Random(7)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            path = Path(tmp) / f"boards-{size}.db"
+            _seed(path, size)
+            users = max(1, size // BOARDS_PER_USER)
+            row = {"boards": size, "users": users, **_lookups(path, users, repeat, rng)}
+            with db.get_connection(path) as conn:
+                conn.execute("DROP INDEX boards_by_user")
+            row["no_index"] = _lookups(path, users, repeat, rng)
+            rows.append(row)
+        db.close_pools()
+    return {"repeat": repeat, "results": rows}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--boards", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+    report("boards", run(args.boards, args.repeat), args.output)
+
+
+if __name__ == "__main__":
+    main()
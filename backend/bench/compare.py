@@ -0,0 +1,83 @@
+"""Compare two benchmark result files and flag regressions.
+
+Walks both documents, pairs up every latency summary (by its path, with list
+entries keyed by their "cards"/"boards"/"rows" size) and every throughput
+figure, and prints the relative change. Exits with status 1 when any metric
+got worse by more than --threshold, so it can gate CI. Usage:
+
+    python -m bench.compare baseline.json candidate.json --metric p50_ms --threshold 0.1
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+SIZE_KEYS = ("cards", "boards", "rows")
+
+
+def _entry_key(entry, index: int) -> str:
+    if isinstance(entry, dict):
+        for key in SIZE_KEYS:
+            if key in entry:
+                return f"{key}={entry[key]}"
+    return str(index)
+
+
+def flatten(document, metric: str, path: str = "") -> dict[str, tuple[float, bool]]:
+    """Map path -> (value, higher_is_better) for every comparable figure."""
+    found: dict[str, tuple[float, bool]] = {}
+    if isinstance(document, dict):
+        if isinstance(document.get(metric), (int, float)):
+            found[path] = (document[metric], False)
+        for key, value in document.items():
+            if key == "environment":
+                continue
+            child = f"{path}.{key}" if path else key
+            if key == "throughput_rps" and isinstance(value, (int, float)):
+                found[child] = (value, True)
+            else:
+                found.update(flatten(value, metric, child))
+    elif isinstance(document, list):
+        for index, entry in enumerate(document):
+            found.update(flatten(entry, metric, f"{path}[{_entry_key(entry, index)}]"))
+    return found
+
+
+def compare(baseline: dict, candidate: dict, metric: str, threshold: float) -> list[dict]:
+    old, new = flatten(baseline, metric), flatten(candidate, metric)
+    rows = []
+    for path in [path for path in old if path in new]:
+        (before, higher_is_better), (after, _) = old[path], new[path]
+        change = (after - before) / before if before else 0.0
+        worse = -change if higher_is_better else change
+        rows.append({
+            "path": path,
+            "before": before,
+            "after": after,
+            "change": round(change, 4),
+            "regression": worse > threshold,
+        })
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("candidate", type=Path)
+    parser.add_argument("--metric", default="p50_ms", help="latency field to compare")
+    parser.add_argument("--threshold", type=float, default=0.1, help="allowed relative slowdown")
+    args = parser.parse_args()
+    baseline = json.loads(args.baseline.read_text())
+    candidate = json.loads(args.candidate.read_text())
+    rows = compare(baseline, candidate, args.metric, args.threshold)
+    commits = [doc.get("environment", {}).get("commit") for doc in (baseline, candidate)]
+    print(f"{commits[0]} -> {commits[1]} ({args.metric}, threshold {args.threshold:.0%})")
+    for row in rows:
+        flag = "  REGRESSION" if row["regression"] else ""
+        print(f"{row['path']:<60} {row['before']:>12} {row['after']:>12} {row['change']:>+8.1%}{flag}")
+    sys.exit(1 if any(row["regression"] for row in rows) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""A local stand-in for the OpenAI-compatible chat completions API.
+
+Answers POST .../chat/completions after a fixed latency with a valid chat
+reply ({"response": ..., "operations": []}), either in one body or streamed
+as SSE chunks with a delay between tokens, so the AI endpoints can be load
+tested without network access or token costs. Written on asyncio streams
+(HTTP/1.1 with keep-alive) so it needs nothing beyond the standard library.
+
+Point the app at it with AI_BASE_URL=http://127.0.0.1:<port>/v1 and any
+OPENROUTER_API_KEY. Usage:
+
+    python -m bench.fake_llm --port 8001 --latency 0.3 --tokens 40 --token-delay 0.01
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+REPLY_WORDS = "Here is a short summary of the board you asked about".split()
+
+
+class FakeLLM:
+    def __init__(self, latency: float = 0.2, tokens: int = 40, token_delay: float = 0.0):
+        self.latency = latency
+        self.tokens = tokens
+        self.token_delay = token_delay
+        self.requests = 0
+        self.server: asyncio.Server | None = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start listening; return the base URL to use as AI_BASE_URL."""
+        self.server = await asyncio.start_server(self._serve, host, port)
+        port = self.server.sockets[0].getsockname()[1]
+        return f"http://{host}:{port}/v1"
+
+    async def close(self) -> None:
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+    def _reply_tokens(self) -> list[str]:
+        words = [REPLY_WORDS[n % len(REPLY_WORDS)] for n in range(self.tokens)]
+        text = json.dumps({"response": " ".join(words), "operations": []})
+        # Split the JSON text into roughly one chunk per word, as a model would.
+        size = max(1, len(text) // max(self.tokens, 1))
+        return [text[n:n + size] for n in range(0, len(text), size)]
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    return
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b""):
+                    name, _, value = line.decode().partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                method, path, _ = request_line.decode().split(" ", 2)
+                if method != "POST" or not path.endswith("/chat/completions"):
+                    await self._send(writer, 404, {"error": {"message": "not found"}})
+                    continue
+                self.requests += 1
+                request = json.loads(body or b"{}")
+                await asyncio.sleep(self.latency)
+                if request.get("stream"):
+                    await self._stream(writer, request)
+                else:
+                    await self._send(writer, 200, self._completion(request))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _completion(self, request: dict) -> dict:
+        return {
+            "id": "chatcmpl-bench",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "".join(self._reply_tokens())},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": 100,
+                "completion_tokens": self.tokens,
+                "total_tokens": 100 + self.tokens,
+            },
+        }
+
+    async def _send(self, writer: asyncio.StreamWriter, status: int, payload: dict) -> None:
+        body = json.dumps(payload).encode()
+        writer.write(
+            b"HTTP/1.1 %d OK\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n%s"
+            % (status, len(body), body)
+        )
+        await writer.drain()
+
+    async def _stream(self, writer: asyncio.StreamWriter, request: dict) -> None:
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+            b"Transfer-Encoding: chunked\r\n\r\n"
+        )
+        model = request.get("model", "fake")
+        for token in self._reply_tokens():
+            chunk = {
+                "id": "chatcmpl-bench",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+            }
+            self._write_chunk(writer, f"data: {json.dumps(chunk)}\n\n".encode())
+            await writer.drain()
+            if self.token_delay:
+                await asyncio.sleep(self.token_delay)
+        self._write_chunk(writer, b"data: [DONE]\n\n")
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    @staticmethod
+    def _write_chunk(writer: asyncio.StreamWriter, data: bytes) -> None:
+        writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+
+
+async def _main(args: argparse.Namespace) -> None:
+    server = FakeLLM(args.latency, args.tokens, args.token_delay)
+    url = await server.start(args.host, args.port)
+    print(f"fake LLM listening at {url}", flush=True)
+    await server.server.serve_forever()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds before replying")
+    parser.add_argument("--tokens", type=int, default=40, help="reply length in words")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="seconds between stream chunks")
+    try:
+        asyncio.run(_main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Revision log size and rebuild cost on a large board.
+
+Applies a stream of single-card edits and moves to a board of --cards cards,
+then compares the bytes stored in board_revisions with keeping one full JSON
+copy per version, and times rebuilding versions at every distance from their
+snapshot. Usage:
+
+    python -m bench.history --cards 5000 --writes 500 --output history.json
+"""
+
+import argparse
+import json
+import random
+import tempfile
+from pathlib import Path
+
+import db
+from bench import measure, report
+
+
+def _board(cards: int) -> dict:
+    columns = [{"id": f"col-{n}", "title": f"Column {n}", "cardIds": []} for n in range(5)]
+    data = {}
+    for n in range(cards):
+        data[f"card-{n}"] = {"id": f"card-{n}", "title": f"Card {n}", "details": f"Details for card {n}."}
+        columns[n % 5]["cardIds"].append(f"card-{n}")
+    return {"columns": columns, "cards": data}
+
+
+def run(cards: int, writes: int, interval: int) -> dict:
+    rng = random.Random(3)
+    db.HISTORY_SNAPSHOT_INTERVAL = interval
+    db.HISTORY_MAX_REVISIONS = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "history.db"
+        db.init_db(path)
+        db.set_board("user", _board(cards), path)
+        full_copies = 0
+        for n in range(writes):
+            card_id = f"card-{rng.randrange(cards)}"
+            if n % 2:
+                db.update_card("user", card_id, title=f"Edited {n}", path=path)
+            else:
+                db.update_card(
+                    "user", card_id, column_id=f"col-{rng.randrange(5)}",
+                    index=rng.randrange(cards // 5), path=path,
+                )
+            full_copies += len(json.dumps(db.get_board("user", path)).encode())
+
+        with db.get_connection(path) as conn:
+            stored, snapshots, deltas, newest = conn.execute(
+                """
+                SELECT sum(length(data)), sum(base = version), sum(base != version), max(version)
+                FROM board_revisions WHERE board_id = 1
+                """
+            ).fetchone()
+            # The latest snapshot followed by a full run of interval - 1 deltas.
+            snapshot = conn.execute(
+                """
+                SELECT max(version) FROM board_revisions
+                WHERE board_id = 1 AND base = version AND version + ? - 1 <= ?
+                """,
+                (interval, newest),
+            ).fetchone()[0]
+        rebuild = {
+            distance: measure(lambda: db.get_revision("user", snapshot + distance, path), 10)
+            for distance in (0, interval // 2, interval - 1)
+        }
+        db.close_pools()
+    return {
+        "cards": cards,
+        "writes": writes,
+        "snapshot_interval": interval,
+        "full_copy_bytes": full_copies,
+        "revision_log_bytes": stored,
+        "ratio": round(full_copies / stored, 1),
+        "snapshots": snapshots,
+        "deltas": deltas,
+        "rebuild_by_distance_from_snapshot": rebuild,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cards", type=int, default=5000)
+    parser.add_argument("--writes", type=int, default=500)
+    parser.add_argument("--interval", type=int, default=db.HISTORY_SNAPSHOT_INTERVAL)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+    report("history", run(args.cards, args.writes, args.interval), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""HTTP load profiles against the app running under uvicorn.
+
+Starts uvicorn on a temporary database seeded with a board of --cards cards,
+plus a FakeLLM (bench/fake_llm.py) for the AI endpoints, then drives each
+profile with --concurrency clients for --duration seconds:
+
+    read        GET /api/board
+    write       PATCH /api/board/cards/{id} renaming a random card
+    mixed       reads with --write-ratio of writes
+    ai          POST /api/ai/chat, bypassing the response cache
+    ai-stream   POST /api/ai/chat/stream, read to the end
+
+Reports throughput, errors and latency percentiles per profile. Pass --url to
+drive a server that is already running instead (AI profiles then use whatever
+LLM that server is configured for). Usage:
+
+    python -m bench.load --profiles read write mixed --concurrency 32 --duration 10
+    python -m bench.load --profiles ai ai-stream --llm-latency 0.5 --output load.json
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import socket
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+import httpx
+
+import db
+from bench import report, summarize
+from bench.fake_llm import FakeLLM
+from bench.storage import make_board
+
+PROFILES = ("read", "write", "mixed", "ai", "ai-stream")
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+AI_BOARD = make_board(20)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class Driver:
+    """Issues one profile's requests and records their latencies."""
+
+    def __init__(self, client: httpx.AsyncClient, card_ids: list[str], write_ratio: float):
+        self.client = client
+        self.card_ids = card_ids
+        self.write_ratio = write_ratio
+        self.rng = random.Random(11)
+
+    async def read(self) -> httpx.Response:
+        return await self.client.get("/api/board")
+
+    async def write(self) -> httpx.Response:
+        card_id = self.rng.choice(self.card_ids)
+        return await self.client.patch(
+            f"/api/board/cards/{card_id}", json={"title": f"Load {self.rng.random():.6f}"}
+        )
+
+    async def mixed(self) -> httpx.Response:
+        return await (self.write() if self.rng.random() < self.write_ratio else self.read())
+
+    async def ai(self) -> httpx.Response:
+        return await self.client.post(
+            "/api/ai/chat",
+            json={"board": AI_BOARD, "message": f"Summarize {self.rng.random()}", "history": []},
+            headers={"Cache-Control": "no-cache"},
+        )
+
+    async def ai_stream(self) -> httpx.Response:
+        async with self.client.stream(
+            "POST", "/api/ai/chat/stream",
+            json={"board": AI_BOARD, "message": f"Summarize {self.rng.random()}", "history": []},
+            headers={"Cache-Control": "no-cache"},
+        ) as response:
+            async for _ in response.aiter_bytes():
+                pass
+        return response
+
+
+async def run_profile(
+    driver: Driver, profile: str, concurrency: int, duration: float, warmup: float
+) -> dict:
+    request = getattr(driver, profile.replace("-", "_"))
+    latencies: list[float] = []
+    statuses: Counter[str] = Counter()
+    start = time.perf_counter()
+    measure_from = start + warmup
+    deadline = measure_from + duration
+
+    async def client_loop():
+        while (now := time.perf_counter()) < deadline:
+            try:
+                response = await request()
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            if now >= measure_from:
+                latencies.append((time.perf_counter() - now) * 1000)
+                statuses[status] += 1
+
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - measure_from
+    errors = sum(count for status, count in statuses.items() if not status.startswith(("2", "3")))
+    return {
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 3),
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed > 0 else 0.0,
+        "statuses": dict(statuses),
+        "latency": summarize(latencies),
+    }
+
+
+async def _wait_until_up(url: str, process: asyncio.subprocess.Process, timeout: float = 30) -> None:
+    async with httpx.AsyncClient(base_url=url) as client:
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            if process.returncode is not None:
+                raise RuntimeError(f"uvicorn exited with status {process.returncode}")
+            try:
+                if (await client.get("/api/test")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"server at {url} did not start within {timeout}s")
+
+
+async def _start_server(args: argparse.Namespace, tmp: Path, llm_url: str):
+    path = tmp / "load.db"
+    db.init_db(path)
+    db.set_board("user", make_board(args.cards), path)
+    db.close_pools()
+    port = _free_port()
+    env = {
+        **os.environ,
+        "DB_PATH": str(path),
+        "AI_BASE_URL": llm_url,
+        "OPENROUTER_API_KEY": os.environ.get("OPENROUTER_API_KEY", "bench"),
+    }
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "uvicorn", "main:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(args.workers), "--log-level", "warning",
+        cwd=BACKEND_DIR, env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        await _wait_until_up(url, process)
+    except BaseException:
+        await _stop(process)
+        raise
+    return url, process
+
+
+async def _stop(process: asyncio.subprocess.Process) -> None:
+    if process.returncode is None:
+        process.terminate()
+    await process.wait()
+
+
+async def run(args: argparse.Namespace) -> dict:
+    llm = FakeLLM(args.llm_latency, args.llm_tokens, args.llm_token_delay)
+    llm_url = await llm.start()
+    process = None
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            url = args.url
+            if url is None:
+                url, process = await _start_server(args, Path(tmp), llm_url)
+            limits = httpx.Limits(max_connections=args.concurrency)
+            timeout = httpx.Timeout(args.timeout)
+            async with httpx.AsyncClient(base_url=url, limits=limits, timeout=timeout) as client:
+                board = (await client.get("/api/board")).json()
+                driver = Driver(client, list(board["cards"]) or ["missing"], args.write_ratio)
+                results = {}
+                for profile in args.profiles:
+                    results[profile] = await run_profile(
+                        driver, profile, args.concurrency, args.duration, args.warmup
+                    )
+        finally:
+            if process is not None:
+                await _stop(process)
+            await llm.close()
+    return {
+        "server": {"url": args.url or "uvicorn", "workers": args.workers, "cards": args.cards},
+        "llm": None if args.url else {
+            "latency_s": args.llm_latency, "tokens": args.llm_tokens,
+            "token_delay_s": args.llm_token_delay, "requests": llm.requests,
+        },
+        "profiles": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", nargs="+", choices=PROFILES, default=["read", "write", "mixed"])
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds per profile")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unmeasured seconds per profile")
+    parser.add_argument("--write-ratio", type=float, default=0.1)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--cards", type=int, default=200, help="cards on the seeded board")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--url", help="drive this running server instead of starting one")
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--llm-tokens", type=int, default=40)
+    parser.add_argument("--llm-token-delay", type=float, default=0.005)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+    report("load", asyncio.run(run(args)), args.output)
+
+
+if __name__ == "__main__":
+    main()
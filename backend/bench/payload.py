@@ -0,0 +1,76 @@
+"""Serialization and validation cost of board payloads, before and after orjson.
+
+For each board size, compares what one request does to the board:
+
+    read   dumps_stdlib   json.dumps(...).encode(), the old GET /api/board path
+           dumps_orjson   jsonio.dumps, the current path
+    write  model_dump     json.loads + the old loose BaseModel + model_dump()
+           typed          json.loads + the typed BoardData TypedDict, the current path
+           typed_orjson   orjson parsing + the typed BoardData TypedDict
+
+Each entry reports latency and the peak memory allocated by one call, which
+tracks the number of full copies of the board a path makes. Usage:
+
+    python -m bench.payload --cards 100 10000 --output payload.json
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+from pydantic import BaseModel, TypeAdapter
+
+import jsonio
+from bench import allocations, measure, report
+from bench.storage import make_board
+from main import BoardData
+
+
+class LooseBoard(BaseModel):
+    """The board body model before Column and Card were typed: unchecked lists and dicts."""
+
+    columns: list
+    cards: dict
+
+
+def run(sizes: list[int], repeat: int) -> dict:
+    typed = TypeAdapter(BoardData)
+    rows = []
+    for size in sizes:
+        # Non-ASCII details so UTF-8 handling actually has work to do.
+        board = make_board(size, details="Détails de la carte {n} — à revoir.")
+        body = jsonio.dumps(board)
+        count = max(3, min(repeat, 500_000 // max(size, 1)))
+        paths = {
+            "read": {
+                "dumps_stdlib": lambda: json.dumps(
+                    board, ensure_ascii=False, separators=(",", ":")
+                ).encode(),
+                "dumps_orjson": lambda: jsonio.dumps(board),
+            },
+            "write": {
+                "model_dump": lambda: LooseBoard.model_validate(json.loads(body)).model_dump(),
+                "typed": lambda: typed.validate_python(json.loads(body)),
+                "typed_orjson": lambda: typed.validate_python(jsonio.loads(body)),
+            },
+        }
+        row = {"cards": size, "bytes": len(body)}
+        for direction, variants in paths.items():
+            row[direction] = {
+                name: {**measure(fn, count), **allocations(fn)} for name, fn in variants.items()
+            }
+        rows.append(row)
+    return {"repeat": repeat, "results": rows}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cards", type=int, nargs="+", default=[10, 100, 1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+    report("payload", run(args.cards, args.repeat), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Card search: FTS5 index query vs. a linear scan of the board JSON.
+
+The scan is what clients did before /api/board/search existed: load the whole
+board document and test every card's title and details. Usage:
+
+    python -m bench.search --cards 1000 10000 50000 --output search.json
+"""
+
+import argparse
+import json
+import random
+import tempfile
+from pathlib import Path
+
+import db
+from bench import measure, report
+
+WORDS = (
+    "roadmap release customer signal design review sprint metric onboarding "
+    "billing invoice report export import latency cache search index deploy "
+    "rollback migration schema dashboard alert incident feedback pricing"
+).split()
+QUERIES = ["roadmap", "dash", "billing invoice", "rollb", "incident alert"]
+FILLER = 5000   # synthetic words, so common terms match a realistic share of cards
+
+
+def _vocabulary(rng: random.Random) -> list[str]:
+    syllables = ["ka", "lo", "mi", "ra", "te", "su", "no", "vi", "de", "po", "ban", "tor"]
+    return WORDS + ["".join(rng.choices(syllables, k=3)) for _ in range(FILLER)]
+
+
+def _board(cards: int, rng: random.Random) -> dict:
+    vocabulary = _vocabulary(rng)
+    columns = [{"id": f"col-{n}", "title": f"Column {n}", "cardIds": []} for n in range(5)]
+    data = {}
+    for n in range(cards):
+        card_id = f"card-{n}"
+        data[card_id] = {
+            "id": card_id,
+            "title": " ".join(rng.choices(vocabulary, k=4)),
+            "details": " ".join(rng.choices(vocabulary, k=16)),
+        }
+        columns[n % 5]["cardIds"].append(card_id)
+    return {"columns": columns, "cards": data}
+
+
+def _scan(blob: str, query: str) -> list[str]:
+    terms = query.lower().split()
+    board = json.loads(blob)
+    return [
+        card_id for card_id, card in board["cards"].items()
+        if all(t in card["title"].lower() or t in card["details"].lower() for t in terms)
+    ]
+
+
+def run(sizes: list[int], repeat: int, limit: int) -> dict:
+    rng = random.Random(42)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            path = Path(tmp) / f"search-{size}.db"
+            db.init_db(path)
+            board = _board(size, rng)
+            db.set_board("user", board, path)
+            blob = json.dumps(board)
+            for query in QUERIES:
+                rows.append({
+                    "cards": size,
+                    "query": query,
+                    "fts": measure(lambda: db.search_cards("user", query, limit, path=path), repeat),
+                    "scan": measure(lambda: _scan(blob, query), repeat),
+                })
+        db.close_pools()
+    return {"limit": limit, "repeat": repeat, "results": rows}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cards", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=db.DEFAULT_SEARCH_LIMIT)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+    report("search", run(args.cards, args.repeat, args.limit), args.output)
+
+
+if __name__ == "__main__":
+    main()
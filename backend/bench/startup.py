@@ -0,0 +1,98 @@
+"""Cold-start cost: importing main and bringing the database up.
+
+Imports main in --repeat fresh interpreters under ``python -X importtime``
+and reports the wall time of the import. From the last run it also reports
+the packages that took longest, as self time summed per top-level package,
+and whether any module in LAZY was imported. Those should load on first use
+only. It then times init_db on a new database (cold: migrations and seed)
+and on an existing one (warm: every later boot and extra worker). Usage:
+
+    python -m bench.startup --repeat 10 --output startup.json
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+import db
+from bench import report, summarize
+
+BACKEND = Path(__file__).resolve().parent.parent
+LAZY = ("openai",)
+
+_IMPORT = (
+    "import sys, time\n"
+    "started = time.perf_counter()\n"
+    "import main\n"
+    "print((time.perf_counter() - started) * 1000)\n"
+    f"print(','.join(m for m in {LAZY!r} if m in sys.modules))\n"
+)
+
+
+def parse_importtime(stderr: str) -> Counter:
+    """Self time in microseconds per top-level package, from -X importtime output."""
+    packages: Counter = Counter()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line.removeprefix("import time:").split("|")
+        packages[name.strip().split(".")[0]] += int(self_us)
+    return packages
+
+
+def _import_main(db_path: Path) -> tuple[float, Counter, list[str]]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _IMPORT],
+        capture_output=True, text=True, cwd=BACKEND, check=True,
+        env={**os.environ, "DB_PATH": str(db_path), "PROFILER_ENABLED": "0"},
+    )
+    elapsed, loaded = result.stdout.splitlines()[-2:]
+    return float(elapsed), parse_importtime(result.stderr), [m for m in loaded.split(",") if m]
+
+
+def _timed(fn) -> float:
+    started = time.perf_counter()
+    fn()
+    return (time.perf_counter() - started) * 1000
+
+
+def run(repeat: int, top: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        samples = []
+        for _ in range(repeat):
+            elapsed, packages, loaded = _import_main(Path(tmp) / "import.db")
+            samples.append(elapsed)
+
+        cold = [_timed(lambda: db.init_db(Path(tmp) / f"cold-{n}.db")) for n in range(repeat)]
+        warm_path = Path(tmp) / "cold-0.db"
+        warm = [_timed(lambda: db.init_db(warm_path)) for _ in range(repeat)]
+        db.close_pools()
+
+    return {
+        "repeat": repeat,
+        "import_main": summarize(samples),
+        "lazy_modules_imported": loaded,
+        "packages": [
+            {"package": name, "self_ms": round(us / 1000, 2)}
+            for name, us in packages.most_common(top)
+        ],
+        "init_db": {"cold": summarize(cold), "warm": summarize(warm)},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="packages to list")
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+    report("startup", run(args.repeat, args.top), args.output)
+
+
+if __name__ == "__main__":
+    main()
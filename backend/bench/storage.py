@@ -0,0 +1,68 @@
+"""get_board / set_board cost as a board grows from 10 to 100k cards.
+
+Times a full read, a versioned read (what GET /api/board runs) and a full
+replace (PUT /api/board) of a board with each number of cards. Repeats shrink
+with board size so the largest sizes finish in reasonable time. Usage:
+
+    python -m bench.storage --cards 10 1000 100000 --output storage.json
+"""
+
+import argparse
+import tempfile
+from pathlib import Path
+
+import db
+from bench import measure, report
+
+COLUMNS = 5
+
+
+def make_board(cards: int, details: str = "Details for card {n}.") -> dict:
+    columns = [{"id": f"col-{n}", "title": f"Column {n}", "cardIds": []} for n in range(COLUMNS)]
+    data = {}
+    for n in range(cards):
+        card_id = f"card-{n}"
+        data[card_id] = {"id": card_id, "title": f"Card {n}", "details": details.format(n=n)}
+        columns[n % COLUMNS]["cardIds"].append(card_id)
+    return {"columns": columns, "cards": data}
+
+
+def _repeat(cards: int, repeat: int) -> int:
+    return max(3, min(repeat, 200_000 // max(cards, 1)))
+
+
+def run(sizes: list[int], repeat: int) -> dict:
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            path = Path(tmp) / f"storage-{size}.db"
+            db.init_db(path)
+            board = make_board(size)
+            edited = {**board, "columns": [*board["columns"][1:], board["columns"][0]]}
+            boards = [board, edited]
+            count = _repeat(size, repeat)
+            writes = iter(range(count))
+            rows.append({
+                "cards": size,
+                # Alternate two boards so every write really changes rows.
+                "set_board": measure(
+                    lambda: db.set_board("user", boards[next(writes) % 2], path), count
+                ),
+                "get_board": measure(lambda: db.get_board("user", path), count),
+                "get_versioned_board": measure(lambda: db.get_versioned_board("user", path), count),
+            })
+        db.close_pools()
+    return {"repeat": repeat, "results": rows}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cards", type=int, nargs="+", default=[10, 100, 1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+    report("storage", run(args.cards, args.repeat), args.output)
+
+
+if __name__ == "__main__":
+    main()
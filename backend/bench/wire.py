@@ -0,0 +1,79 @@
+"""Bytes on the wire for board responses and the frontend bundle, by encoding.
+
+For each board size, reports the GET /api/board body size uncompressed and
+with each encoding at the on-the-fly levels, plus the time to compress it
+once (which the board cache then reuses for that version). For the bundle,
+totals every compressible file under --frontend at the static levels that
+``python compression.py`` writes. Brotli columns appear only when the
+brotli module is installed. Usage:
+
+    python -m bench.wire --cards 100 10000 --frontend ../frontend/out --output wire.json
+"""
+
+import argparse
+import mimetypes
+from pathlib import Path
+
+import jsonio
+from bench import measure, report
+from bench.storage import make_board
+from compression import ENCODINGS, MIN_SIZE, SUFFIXES, compress, compressible
+
+
+def _saving(raw: int, encoded: int) -> float:
+    return round(1 - encoded / raw, 3) if raw else 0.0
+
+
+def boards(sizes: list[int], repeat: int) -> list[dict]:
+    rows = []
+    for size in sizes:
+        body = jsonio.dumps(make_board(size))
+        row = {"cards": size, "identity": len(body)}
+        for encoding in ENCODINGS:
+            encoded = len(compress(body, encoding))
+            count = max(3, min(repeat, 50_000 // max(size, 1)))
+            row[encoding] = {
+                "bytes": encoded,
+                "saving": _saving(len(body), encoded),
+                **measure(lambda: compress(body, encoding), count),
+            }
+        rows.append(row)
+    return rows
+
+
+def bundle(root: Path) -> dict:
+    files = [
+        path for path in sorted(root.rglob("*"))
+        if path.is_file() and path.suffix not in SUFFIXES.values()
+    ]
+    totals = {"files": len(files), "identity": 0, **{encoding: 0 for encoding in ENCODINGS}}
+    for path in files:
+        data = path.read_bytes()
+        totals["identity"] += len(data)
+        worth = len(data) >= MIN_SIZE and compressible(mimetypes.guess_type(path.name)[0])
+        for encoding in ENCODINGS:
+            totals[encoding] += min(len(data), len(compress(data, encoding, static=True))) if worth else len(data)
+    for encoding in ENCODINGS:
+        totals[f"{encoding}_saving"] = _saving(totals["identity"], totals[encoding])
+    return totals
+
+
+def run(sizes: list[int], repeat: int, frontend: Path | None) -> dict:
+    result = {"encodings": list(ENCODINGS), "repeat": repeat, "results": boards(sizes, repeat)}
+    if frontend is not None and frontend.is_dir():
+        result["bundle"] = {"root": str(frontend), **bundle(frontend)}
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cards", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--frontend", type=Path, default=Path("../frontend/out"))
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+    report("wire", run(args.cards, args.repeat, args.frontend), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Board save latency and commit rate under drag-storm traffic.
+
+Each of --boards boards has --clients clients that fire a full-board save
+every --interval milliseconds without waiting for the previous one, the way
+the frontend does while a card is dragged. Every client runs for --duration
+seconds with each --window, where window 0 is one transaction per save and
+longer windows coalesce through write_buffer.WriteBuffer.
+
+Run with DB_SYNCHRONOUS=FULL so that every commit syncs the WAL. Commits
+per second are then fsyncs per second. Usage:
+
+    DB_SYNCHRONOUS=FULL python -m bench.writes --windows 0 5 20 --output writes.json
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+import db
+from bench import report, summarize
+from bench.storage import make_board
+from write_buffer import WriteBuffer
+
+
+async def _storm(buffer: WriteBuffer, boards: list[tuple[str, dict]], clients: int,
+                 interval: float, duration: float) -> list[float]:
+    latencies: list[float] = []
+
+    async def save(username: str, board: dict) -> None:
+        started = time.perf_counter()
+        await buffer.save(username, board)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    async def client(username: str, board: dict) -> None:
+        saves = []
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            saves.append(asyncio.create_task(save(username, board)))
+            await asyncio.sleep(interval)
+        await asyncio.gather(*saves)
+
+    await asyncio.gather(*(client(u, b) for u, b in boards for _ in range(clients)))
+    await buffer.close()
+    return latencies
+
+
+def run(windows: list[float], boards: int, clients: int, cards: int,
+        interval_ms: float, duration: float) -> dict:
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "writes.db"
+        db.DB_PATH = path
+        db.init_db(path)
+        with db.get_connection(path) as conn:
+            synchronous = conn.execute("PRAGMA synchronous").fetchone()[0]
+        board = make_board(cards)
+        owners = []
+        for n in range(boards):
+            db.create_board(f"drag-{n}", "Drag storm", board, path)
+            owners.append((f"drag-{n}", board))
+        for window in windows:
+            buffer = WriteBuffer(window=window / 1000)
+            started = time.perf_counter()
+            latencies = asyncio.run(
+                _storm(buffer, owners, clients, interval_ms / 1000, duration)
+            )
+            elapsed = time.perf_counter() - started
+            stats = buffer.stats()
+            rows.append({
+                "window_ms": window,
+                "saves": stats["writes"],
+                "commits": stats["commits"],
+                "commits_per_second": round(stats["commits"] / elapsed, 1),
+                "saves_per_commit": round(stats["writes"] / max(stats["commits"], 1), 2),
+                "latency": summarize(latencies),
+            })
+        db.close_executor()
+        db.close_pools()
+    return {
+        # 0 OFF, 1 NORMAL, 2 FULL, 3 EXTRA; only FULL and EXTRA sync every commit.
+        "synchronous": synchronous,
+        "boards": boards,
+        "clients": clients,
+        "cards": cards,
+        "interval_ms": interval_ms,
+        "duration": duration,
+        "results": rows,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--windows", type=float, nargs="+", default=[0, 5, 10, 20])
+    parser.add_argument("--boards", type=int, default=8)
+    parser.add_argument("--clients", type=int, default=2)
+    parser.add_argument("--cards", type=int, default=100)
+    parser.add_argument("--interval", type=float, default=10, help="milliseconds between saves")
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+    report("writes", run(
+        args.windows, args.boards, args.clients, args.cards, args.interval, args.duration
+    ), args.output)
+
+
+if __name__ == "__main__":
+    main()
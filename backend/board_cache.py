@@ -0,0 +1,118 @@
+"""In-process read-through cache of serialized GET /api/board responses.
+
+Entries are keyed by username and hold the exact response bytes for one
+board version. Every committed board write invalidates the entries for that
+board (see db.add_write_listener), so a cached body is never older than the
+last write made by this process. Other worker processes' writes reach it
+through the shared event broker when PUBSUB_URL is set; otherwise main checks
+each hit against the board's stored version before serving it.
+
+Compressed copies of a body are made the first time a client asks for one
+and kept with the entry, so a board is compressed once per version rather
+than once per request.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from compression import compress
+
+DEFAULT_MAX_ENTRIES = 1024
+
+
+@dataclass(frozen=True)
+class CachedBoard:
+    board_id: int
+    version: int
+    body: bytes
+    encoded: dict[str, bytes] = field(default_factory=dict, compare=False, repr=False)
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.version}"'
+
+    def body_for(self, encoding: str) -> bytes:
+        """The body compressed with encoding, compressing it on first use."""
+        body = self.encoded.get(encoding)
+        if body is None:
+            body = self.encoded[encoding] = compress(self.body, encoding)
+        return body
+
+
+class BoardCache:
+    """An LRU map of username -> CachedBoard with hit/miss counters."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, CachedBoard] = OrderedDict()
+        self._by_board: dict[int, set[str]] = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    def get(self, key: str) -> CachedBoard | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry
+
+    def ticket(self) -> int:
+        """Take before reading the DB; put() drops results that raced a write."""
+        with self._lock:
+            return self._generation
+
+    def put(self, key: str, ticket: int, entry: CachedBoard) -> None:
+        with self._lock:
+            if ticket != self._generation:
+                return
+            self._drop(key)
+            self._entries[key] = entry
+            self._by_board.setdefault(entry.board_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate_board(self, board_id: int, version: int | None = None) -> None:
+        """Forget every entry for board_id. Matches the db write-listener signature."""
+        with self._lock:
+            self._generation += 1
+            self._invalidations += 1
+            for key in list(self._by_board.get(board_id, ())):
+                self._drop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._by_board.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self._invalidations,
+            }
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            keys = self._by_board.get(entry.board_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_board[entry.board_id]
+
+
+board_cache = BoardCache(int(os.environ.get("BOARD_CACHE_SIZE", DEFAULT_MAX_ENTRIES)))
@@ -0,0 +1,246 @@
+"""Streaming board import and export as NDJSON or CSV.
+
+Both directions work a slice at a time, so memory stays flat however large
+the board is. Exports read EXPORT_PAGE_SIZE cards per query
+(db.list_column_cards) and yield each page as soon as it is formatted.
+Imports parse the request body as it arrives and write every
+IMPORT_BATCH_SIZE records in their own transaction (db.import_batch).
+
+NDJSON has one record per line, in board order:
+
+    {"type": "board", "id": 1, "title": "Board", "version": 7}
+    {"type": "column", "id": "col-1", "title": "Backlog"}
+    {"type": "card", "id": "card-1", "columnId": "col-1", "title": "...", "details": "..."}
+
+CSV has one row per card, with a header row. A column with no cards gets one
+row whose card fields are empty:
+
+    columnId,columnTitle,cardId,title,details
+
+Cards in no column come last, with a null columnId in NDJSON and an empty
+one in CSV.
+
+An import that fails part-way keeps the batches that were already committed.
+The error says how far it got.
+"""
+
+import csv
+import io
+from collections.abc import AsyncIterator
+
+import jsonio
+from db import get_board_outline, import_batch, list_column_cards, run_db
+
+IMPORT_BATCH_SIZE = 1000
+MAX_LINE_BYTES = 1024 * 1024
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+CSV_FIELDS = ("columnId", "columnTitle", "cardId", "title", "details")
+
+
+class ImportFormatError(ValueError):
+    """A record in an import body is malformed."""
+
+    def __init__(self, line: int, message: str):
+        super().__init__(f"line {line}: {message}")
+        self.line = line
+        self.imported = {"columns": 0, "cards": 0}
+
+
+async def board_outline(username: str, board_id: int | None = None) -> dict | None:
+    """The board an import or export works on, or None if it does not exist."""
+    return await run_db(get_board_outline, username, board_id=board_id)
+
+
+# --- export ---
+
+
+def _csv_rows(rows: list[tuple]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows(rows)
+    return buffer.getvalue().encode()
+
+
+def _ndjson(records: list[dict]) -> bytes:
+    return b"".join(jsonio.dumps(record) + b"\n" for record in records)
+
+
+async def _column_pages(board_id: int, column_id: str | None) -> AsyncIterator[list[dict]]:
+    after = None
+    while True:
+        cards, after = await run_db(list_column_cards, board_id, column_id, after)
+        if cards:
+            yield cards
+        if after is None:
+            return
+
+
+async def export_chunks(outline: dict, fmt: str) -> AsyncIterator[bytes]:
+    """The board as fmt, one chunk per page of cards."""
+    if fmt == "ndjson":
+        yield _ndjson(
+            [{"type": "board", "id": outline["id"], "title": outline["title"],
+              "version": outline["version"]}]
+            + [{"type": "column", **column} for column in outline["columns"]]
+        )
+    else:
+        yield _csv_rows([CSV_FIELDS])
+    for column in [*outline["columns"], None]:
+        empty = True
+        async for cards in _column_pages(outline["id"], column and column["id"]):
+            empty = False
+            if fmt == "ndjson":
+                yield _ndjson([{"type": "card", **card} for card in cards])
+            else:
+                title = column["title"] if column else ""
+                yield _csv_rows(
+                    [(card["columnId"] or "", title, card["id"], card["title"], card["details"])
+                     for card in cards]
+                )
+        if empty and column is not None and fmt == "csv":
+            yield _csv_rows([(column["id"], column["title"], "", "", "")])
+
+
+# --- import ---
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, str]]:
+    """Numbered lines of a UTF-8 body, split at each \n.
+
+    A \r before the \n is kept: inside a quoted CSV field it is data, so only
+    the parsers know whether it ends a record.
+    """
+    buffer = b""
+    number = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *complete, buffer = buffer.split(b"\n")
+        for raw in complete:
+            number += 1
+            yield number, _decode(raw, number)
+        if len(buffer) > MAX_LINE_BYTES:
+            raise ImportFormatError(number + 1, f"line longer than {MAX_LINE_BYTES} bytes")
+    if buffer:
+        yield number + 1, _decode(buffer, number + 1)
+
+
+def _decode(raw: bytes, number: int) -> str:
+    try:
+        return raw.decode()
+    except UnicodeDecodeError:
+        raise ImportFormatError(number, "not valid UTF-8")
+
+
+def _text(record: dict, key: str, line: int, allow_empty: bool = False) -> str:
+    value = record.get(key, "" if allow_empty else None)
+    if not isinstance(value, str) or not (value or allow_empty):
+        raise ImportFormatError(line, f"{key!r} must be a non-empty string")
+    return value
+
+
+def _column_ref(record: dict, line: int) -> str | None:
+    value = record.get("columnId")
+    if value is None or value == "":
+        return None   # a card in no column
+    if not isinstance(value, str):
+        raise ImportFormatError(line, "'columnId' must be a string or null")
+    return value
+
+
+async def _ndjson_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, str, dict]]:
+    async for line, text in _lines(chunks):
+        if not text.strip():
+            continue
+        try:
+            record = jsonio.loads(text)
+        except ValueError:
+            raise ImportFormatError(line, "not valid JSON")
+        kind = record.get("type") if isinstance(record, dict) else None
+        if kind == "column":
+            yield line, kind, {
+                "id": _text(record, "id", line),
+                "title": _text(record, "title", line, allow_empty=True),
+            }
+        elif kind == "card":
+            yield line, kind, {
+                "id": _text(record, "id", line),
+                "columnId": _column_ref(record, line),
+                "title": _text(record, "title", line, allow_empty=True),
+                "details": _text(record, "details", line, allow_empty=True),
+            }
+        elif kind != "board":
+            raise ImportFormatError(line, 'expected a "board", "column" or "card" record')
+
+
+async def _csv_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, str, dict]]:
+    header = None
+    columns: set[str] = set()
+    pending, first = "", 0
+    async for line, text in _lines(chunks):
+        pending = f"{pending}\n{text}" if pending else text
+        first = first or line
+        if pending.count('"') % 2:
+            if len(pending) > MAX_LINE_BYTES:
+                raise ImportFormatError(first, f"record longer than {MAX_LINE_BYTES} bytes")
+            continue   # a quoted field spans lines
+        row = next(csv.reader([pending.removesuffix("\r")]), [])
+        start, pending, first = first, "", 0
+        if not any(row):
+            continue
+        if header is None:
+            header = row
+            missing = {"columnId", "cardId", "title"} - set(header)
+            if missing:
+                raise ImportFormatError(start, f"header lacks {', '.join(sorted(missing))}")
+            continue
+        record = dict(zip(header, row))
+        column_id = record.get("columnId") or None
+        if column_id is None and not record.get("cardId"):
+            raise ImportFormatError(start, "columnId is empty")
+        if column_id is not None and column_id not in columns:
+            columns.add(column_id)
+            yield start, "column", {"id": column_id, "title": record.get("columnTitle") or column_id}
+        if record.get("cardId"):
+            yield start, "card", {
+                "id": record["cardId"],
+                "columnId": column_id,
+                "title": record.get("title", ""),
+                "details": record.get("details", ""),
+            }
+    if pending:
+        raise ImportFormatError(first, "unterminated quoted field")
+
+
+async def import_chunks(
+    outline: dict, chunks: AsyncIterator[bytes], fmt: str, replace: bool = False
+) -> dict:
+    """Import a streamed body into the board; return counts and the final version."""
+    records = _ndjson_records(chunks) if fmt == "ndjson" else _csv_records(chunks)
+    known = set() if replace else {column["id"] for column in outline["columns"]}
+    counts = {"columns": 0, "cards": 0}
+    batch: dict[str, list[dict]] = {"column": [], "card": []}
+    version = outline["version"]
+
+    async def flush():
+        nonlocal version, replace
+        version = await run_db(
+            import_batch, outline["id"], batch["column"], batch["card"], replace
+        )
+        counts["columns"] += len(batch["column"])
+        counts["cards"] += len(batch["card"])
+        batch["column"], batch["card"], replace = [], [], False
+
+    try:
+        async for line, kind, record in records:
+            if kind == "column":
+                known.add(record["id"])
+            elif record["columnId"] is not None and record["columnId"] not in known:
+                raise ImportFormatError(line, f"card is in unknown column {record['columnId']!r}")
+            batch[kind].append(record)
+            if len(batch["column"]) + len(batch["card"]) >= IMPORT_BATCH_SIZE:
+                await flush()
+        if batch["column"] or batch["card"] or replace:
+            await flush()
+    except ImportFormatError as e:
+        e.imported = counts
+        raise
+    return {**counts, "version": version}
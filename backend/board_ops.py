@@ -0,0 +1,130 @@
+"""Validated, compact board edit operations (the format the AI assistant replies in).
+
+An operation list is much smaller than a regenerated board: moving one card
+is one short object instead of every column and card. Operations are checked
+against the current board and applied to a copy, all or nothing.
+
+    {"op": "add_card",      "column": "col-id", "title": "...", "details": "...", "index": 0}
+    {"op": "update_card",   "id": "card-id", "title": "...", "details": "..."}
+    {"op": "move_card",     "id": "card-id", "column": "col-id", "index": 0}
+    {"op": "delete_card",   "id": "card-id"}
+    {"op": "add_column",    "title": "...", "index": 0}
+    {"op": "update_column", "id": "col-id", "title": "..."}
+    {"op": "move_column",   "id": "col-id", "index": 0}
+    {"op": "delete_column", "id": "col-id"}          (its cards are deleted too)
+
+"index" is optional everywhere and means "append" when omitted. New cards and
+columns may carry an "id"; otherwise one is generated.
+"""
+
+import copy
+import uuid
+
+
+class OperationError(ValueError):
+    """An operation is malformed or does not fit the current board."""
+
+
+def _new_id(prefix: str) -> str:
+    return f"{prefix}-{uuid.uuid4().hex[:12]}"
+
+
+def _text(op: dict, key: str, required: bool = False) -> str | None:
+    value = op.get(key)
+    if value is None:
+        if required:
+            raise OperationError(f"{op.get('op')} requires {key!r}")
+        return None
+    if not isinstance(value, str):
+        raise OperationError(f"{key!r} must be a string")
+    return value
+
+
+def _index(op: dict, length: int) -> int:
+    index = op.get("index")
+    if index is None:
+        return length
+    if not isinstance(index, int) or isinstance(index, bool) or index < 0:
+        raise OperationError(f"index must be a non-negative integer, got {index!r}")
+    return min(index, length)
+
+
+def apply_operations(board: dict, operations: list) -> dict:
+    """Return a copy of board with operations applied; raise OperationError on any bad op."""
+    if not isinstance(operations, list):
+        raise OperationError("operations must be a list")
+    board = copy.deepcopy(board)
+    columns: list[dict] = board.setdefault("columns", [])
+    cards: dict[str, dict] = board.setdefault("cards", {})
+
+    def column(column_id) -> dict:
+        for col in columns:
+            if col.get("id") == column_id:
+                col.setdefault("cardIds", [])
+                return col
+        raise OperationError(f"unknown column {column_id!r}")
+
+    def card(card_id) -> dict:
+        if not isinstance(card_id, str) or card_id not in cards:
+            raise OperationError(f"unknown card {card_id!r}")
+        return cards[card_id]
+
+    def unlink(card_id: str) -> None:
+        for col in columns:
+            if card_id in col.get("cardIds", []):
+                col["cardIds"].remove(card_id)
+
+    for op in operations:
+        if not isinstance(op, dict):
+            raise OperationError(f"operation must be an object, got {op!r}")
+        name = op.get("op")
+        if name == "add_card":
+            target = column(_text(op, "column", required=True))
+            card_id = _text(op, "id") or _new_id("card")
+            if card_id in cards:
+                raise OperationError(f"card {card_id!r} already exists")
+            cards[card_id] = {
+                "id": card_id,
+                "title": _text(op, "title", required=True),
+                "details": _text(op, "details") or "",
+            }
+            target["cardIds"].insert(_index(op, len(target["cardIds"])), card_id)
+        elif name == "update_card":
+            existing = card(op.get("id"))
+            for key in ("title", "details"):
+                value = _text(op, key)
+                if value is not None:
+                    existing[key] = value
+        elif name == "move_card":
+            card_id = op.get("id")
+            card(card_id)
+            target = column(_text(op, "column", required=True))
+            unlink(card_id)
+            target["cardIds"].insert(_index(op, len(target["cardIds"])), card_id)
+        elif name == "delete_card":
+            card_id = op.get("id")
+            card(card_id)
+            unlink(card_id)
+            del cards[card_id]
+        elif name == "add_column":
+            column_id = _text(op, "id") or _new_id("col")
+            if any(col.get("id") == column_id for col in columns):
+                raise OperationError(f"column {column_id!r} already exists")
+            columns.insert(
+                _index(op, len(columns)),
+                {"id": column_id, "title": _text(op, "title", required=True), "cardIds": []},
+            )
+        elif name == "update_column":
+            column(op.get("id"))["title"] = _text(op, "title", required=True)
+        elif name == "move_column":
+            target = column(op.get("id"))
+            columns.remove(target)
+            columns.insert(_index(op, len(columns)), target)
+        elif name == "delete_column":
+            target = column(op.get("id"))
+            columns.remove(target)
+            for card_id in target.get("cardIds", []):
+                cards.pop(card_id, None)
+        else:
+            raise OperationError(f"unknown operation {name!r}")
+    return board
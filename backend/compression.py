@@ -0,0 +1,265 @@
+"""Compressed responses: negotiated gzip/brotli for the API, precompressed static files.
+
+API responses of MIN_SIZE bytes or more are compressed on the way out by
+CompressionMiddleware, using the best encoding the client's Accept-Encoding
+allows. Brotli is offered only when the brotli module is installed; gzip
+always is. Event streams are left alone so each event is delivered as soon
+as it is sent.
+
+The static frontend is compressed once, ahead of time, at the best levels
+(``python backend/compression.py frontend_out``, run by the Dockerfile).
+PrecompressedStaticFiles then serves the .br or .gz file next to each asset
+directly, and marks the content-hashed assets under /_next/static/ as
+immutable.
+"""
+
+import gzip
+import mimetypes
+import os
+import stat
+import sys
+import zlib
+from pathlib import Path
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import FileResponse, Response
+from starlette.routing import get_route_path
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MIN_SIZE = 1024   # below this, headers and CPU cost more than compression saves
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4   # on-the-fly; higher levels cost far more CPU for a few % less
+STATIC_GZIP_LEVEL = 9
+STATIC_BROTLI_QUALITY = 11
+
+# In order of preference.
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+HASHED_PREFIX = "_next/static/"
+
+_COMPRESSIBLE = {
+    "application/javascript",
+    "application/json",
+    "application/manifest+json",
+    "application/x-ndjson",
+    "application/xml",
+    "image/svg+xml",
+}
+
+
+def compressible(content_type: str | None) -> bool:
+    """Whether a response of this media type is worth compressing."""
+    if not content_type:
+        return False
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type == "text/event-stream":
+        return False
+    return media_type.startswith("text/") or media_type in _COMPRESSIBLE
+
+
+def negotiate(accept_encoding: str | None, offered: tuple[str, ...] = ENCODINGS) -> str | None:
+    """The offered encoding the client prefers, or None to send the body as is."""
+    if not accept_encoding:
+        return None
+    weights: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.partition(";")
+        weight = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[name.strip().lower()] = weight
+    best, best_weight = None, 0.0
+    for name in offered:
+        weight = weights.get(name, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = name, weight
+    return best
+
+
+def compress(data: bytes, encoding: str, static: bool = False) -> bytes:
+    """data compressed with encoding; static uses the slow, best levels."""
+    if encoding == "br":
+        return brotli.compress(data, quality=STATIC_BROTLI_QUALITY if static else BROTLI_QUALITY)
+    return gzip.compress(data, STATIC_GZIP_LEVEL if static else GZIP_LEVEL, mtime=0)
+
+
+def _add_vary(headers: MutableHeaders) -> None:
+    if "accept-encoding" not in headers.get("vary", "").lower():
+        headers.add_vary_header("Accept-Encoding")
+
+
+def _compressor(encoding: str):
+    """(compress, finish) functions for compressing a stream chunk by chunk."""
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        return compressor.process, compressor.finish
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress, compressor.flush
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing responses of compressible types.
+
+    A response that fits in one body message is compressed whole, or sent
+    as is if it is under minimum_size. A streamed response is compressed
+    chunk by chunk without a Content-Length. Responses that already carry a
+    Content-Encoding (a cached board, a precompressed asset), partial
+    content and Cache-Control: no-transform pass through untouched.
+    """
+
+    def __init__(self, app, minimum_size: int = MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"))
+        start = None        # the held http.response.start of a response being compressed
+        stream = None       # (compress, finish) once compression has begun
+
+        async def send_compressed(message):
+            nonlocal start, stream
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", []))
+                headers = MutableHeaders(raw=message["headers"])
+                if not compressible(headers.get("content-type")) or "content-encoding" in headers:
+                    await send(message)
+                    return
+                _add_vary(headers)
+                if (
+                    encoding is None
+                    or "content-range" in headers
+                    or "no-transform" in headers.get("cache-control", "")
+                ):
+                    await send(message)
+                    return
+                start = message
+                return
+            if message["type"] != "http.response.body" or start is None:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if stream is None:
+                headers = MutableHeaders(raw=start["headers"])
+                if not more_body and len(body) < self.minimum_size:
+                    await send(start)
+                    start = None
+                    await send(message)
+                    return
+                stream = _compressor(encoding)
+                headers["Content-Encoding"] = encoding
+                if more_body:
+                    del headers["Content-Length"]
+                else:
+                    body = stream[0](body) + stream[1]()
+                    headers["Content-Length"] = str(len(body))
+                    await send(start)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                await send(start)
+            compressed = stream[0](body)
+            if not more_body:
+                compressed += stream[1]()
+            if compressed or not more_body:
+                await send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+
+# --- static files ---
+
+def _variant(full_path, encoding: str | None) -> tuple[str, os.stat_result] | None:
+    if encoding is None:
+        return None
+    path = f"{full_path}{SUFFIXES[encoding]}"
+    try:
+        stat_result = os.stat(path)
+    except OSError:
+        return None
+    return (path, stat_result) if stat.S_ISREG(stat_result.st_mode) else None
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles serving <file>.br or <file>.gz when the client accepts it.
+
+    Files under /_next/static/ have content hashes in their names, so they
+    are cached for a year without revalidation. Everything else (the HTML
+    pages in particular) is revalidated on every use through its ETag.
+    """
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        media_type = mimetypes.guess_type(str(full_path))[0] or "text/plain"
+        encoding = negotiate(request_headers.get("accept-encoding"))
+        variant = _variant(full_path, encoding)
+        if variant is None:
+            response = super().file_response(full_path, stat_result, scope, status_code)
+        else:
+            path, variant_stat = variant
+            response = FileResponse(
+                path, status_code=status_code, stat_result=variant_stat, media_type=media_type,
+                headers={"Content-Encoding": encoding},
+            )
+            if self.is_not_modified(response.headers, request_headers):
+                response = NotModifiedResponse(response.headers)
+        hashed = get_route_path(scope).lstrip("/").startswith(HASHED_PREFIX)
+        response.headers["Cache-Control"] = IMMUTABLE if hashed else REVALIDATE
+        if compressible(media_type):
+            _add_vary(response.headers)
+        return response
+
+
+def precompress_directory(root, minimum_size: int = MIN_SIZE) -> dict:
+    """Write .gz (and .br) next to every compressible file under root.
+
+    Variants newer than their file are kept, so rerunning is cheap. A
+    variant that would not be smaller than the file is not written. Returns
+    the total bytes of the files and of what each encoding serves for them.
+    """
+    totals = {"files": 0, "identity": 0, **{encoding: 0 for encoding in ENCODINGS}}
+    suffixes = set(SUFFIXES.values())
+    for path in sorted(Path(root).rglob("*")):
+        if path.suffix in suffixes or not path.is_file():
+            continue
+        size = path.stat().st_size
+        if size < minimum_size or not compressible(mimetypes.guess_type(path.name)[0]):
+            continue
+        totals["files"] += 1
+        totals["identity"] += size
+        data = None
+        for encoding in ENCODINGS:
+            variant = path.with_name(path.name + SUFFIXES[encoding])
+            if variant.exists() and variant.stat().st_mtime >= path.stat().st_mtime:
+                totals[encoding] += variant.stat().st_size
+                continue
+            data = data if data is not None else path.read_bytes()
+            packed = compress(data, encoding, static=True)
+            if len(packed) < size:
+                variant.write_bytes(packed)
+                totals[encoding] += len(packed)
+            else:
+                variant.unlink(missing_ok=True)
+                totals[encoding] += size
+    return totals
+
+
+if __name__ == "__main__":
+    for root in sys.argv[1:] or ["frontend_out"]:
+        print(root, precompress_directory(root))
@@ -1,8 +1,50 @@
+import asyncio
+import base64
 import json
+import os
+import queue
+import re
 import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
 from pathlib import Path
 
-DB_PATH = Path(__file__).parent / "kanban.db"
+import jsonio
+import metrics
+from board_ops import apply_operations
+from json_patch import PatchError, apply_patch
+
+DB_PATH = Path(os.environ.get("DB_PATH") or Path(__file__).parent / "kanban.db")
+
+DEFAULT_POOL_SIZE = 8
+POOL_TIMEOUT = 30.0
+
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+EXPORT_PAGE_SIZE = 1000
+
+# Revision log (see "history" below). Read from the environment once, at startup.
+HISTORY_SNAPSHOT_INTERVAL = int(os.environ.get("HISTORY_SNAPSHOT_INTERVAL", 50))
+HISTORY_MAX_REVISIONS = int(os.environ.get("HISTORY_MAX_REVISIONS", 1000))
+HISTORY_MAX_AGE_DAYS = float(os.environ.get("HISTORY_MAX_AGE_DAYS", 0))  # 0: keep forever
+
+# Applied once when a pooled connection is opened, never per request.
+_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    # NORMAL syncs the WAL only at checkpoints; FULL syncs it on every commit.
+    f"PRAGMA synchronous = {os.environ.get('DB_SYNCHRONOUS', 'NORMAL')}",
+    "PRAGMA foreign_keys = ON",
+    f"PRAGMA mmap_size = {int(os.environ.get('DB_MMAP_SIZE', 256 * 1024 * 1024))}",
+    f"PRAGMA cache_size = {int(os.environ.get('DB_CACHE_SIZE', -16000))}",
+)
 
 SEED_DATA = {
     "columns": [
@@ -30,37 +72,546 @@ def _resolve(path: Path | None) -> Path:
     return path if path is not None else DB_PATH
 
 
-def get_connection(path: Path | None = None) -> sqlite3.Connection:
-    conn = sqlite3.connect(_resolve(path))
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys = ON")
-    return conn
+class ConnectionPool:
+    """A bounded pool of SQLite connections to a single database file."""
 
+    def __init__(self, path: Path, size: int = DEFAULT_POOL_SIZE):
+        if size < 1:
+            raise ValueError("pool size must be at least 1")
+        self.path = path
+        self.size = size
+        self._idle: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+        self._acquired = 0
+        self._waits = 0
+        self._wait_seconds = 0.0
 
-def init_db(path: Path | None = None) -> None:
-    """Create tables and seed the default user + board if they don't exist."""
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        for pragma in _PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def acquire(self, timeout: float = POOL_TIMEOUT) -> sqlite3.Connection:
+        """Take an idle connection, opening a new one while under the size cap."""
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                grow = self._created < self.size
+                if grow:
+                    self._created += 1
+            if grow:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                started = time.perf_counter()
+                try:
+                    conn = self._idle.get(timeout=timeout)
+                except queue.Empty:
+                    raise TimeoutError(
+                        f"no SQLite connection available after {timeout}s"
+                    ) from None
+                with self._lock:
+                    self._waits += 1
+                    self._wait_seconds += time.perf_counter() - started
+        with self._lock:
+            self._in_use += 1
+            self._acquired += 1
+        return conn
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        with self._lock:
+            self._in_use -= 1
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a connection for one transaction (commit on success, rollback on error)."""
+        conn = self.acquire()
+        try:
+            with conn:
+                yield conn
+        finally:
+            self.release(conn)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": self.size,
+                "created": self._created,
+                "idle": self._idle.qsize(),
+                "in_use": self._in_use,
+                "acquired": self._acquired,
+                "waits": self._waits,
+                "wait_seconds": round(self._wait_seconds, 6),
+            }
+
+    def close(self) -> None:
+        """Close every idle connection. Borrowed connections are left alone."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+
+_pools: dict[Path, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path: Path | None = None) -> ConnectionPool:
+    """Return the shared pool for a database file, creating it on first use."""
+    resolved = _resolve(path)
+    with _pools_lock:
+        pool = _pools.get(resolved)
+        if pool is None:
+            size = int(os.environ.get("DB_POOL_SIZE", DEFAULT_POOL_SIZE))
+            pool = _pools[resolved] = ConnectionPool(resolved, size)
+    return pool
+
+
+@contextmanager
+def get_connection(path: Path | None = None) -> Iterator[sqlite3.Connection]:
+    with get_pool(path).connection() as conn:
+        yield conn
+
+
+def pool_stats(path: Path | None = None) -> dict:
+    """Return usage counters for the pool serving a database file."""
+    return get_pool(path).stats()
+
+
+def close_pools() -> None:
+    """Close and forget every pool (used on shutdown and between tests)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+# --- async bridge ---
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # One thread per pooled connection, so DB threads never queue on the pool.
+            workers = int(os.environ.get("DB_POOL_SIZE", DEFAULT_POOL_SIZE))
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="db")
+        return _executor
+
+
+def _timed_call(fn: Callable, queued_at: float, *args, **kwargs):
+    started = time.perf_counter()
+    metrics.db_queue_seconds.observe(started - queued_at)
+    name = getattr(fn, "__qualname__", type(fn).__name__)
+    try:
+        return fn(*args, **kwargs)
+    except Exception:
+        metrics.db_call_errors.inc(call=name)
+        raise
+    finally:
+        metrics.db_call_seconds.observe(time.perf_counter() - started, call=name)
+
+
+async def run_db(fn: Callable, *args, **kwargs):
+    """Run a blocking db function on the bounded DB executor and await its result."""
+    loop = asyncio.get_running_loop()
+    call = partial(_timed_call, fn, time.perf_counter(), *args, **kwargs)
+    return await loop.run_in_executor(_get_executor(), call)
+
+
+def close_executor() -> None:
+    """Wait for in-flight DB work to finish and stop the executor threads."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+class VersionConflict(Exception):
+    """A conditional write named a board version that is no longer current."""
+
+    def __init__(self, current: int):
+        super().__init__(f"board is at version {current}")
+        self.current = current
+
+
+@contextmanager
+def _read_transaction(path: Path | None = None) -> Iterator[sqlite3.Connection]:
+    """Borrow a connection whose reads all see one consistent snapshot."""
     with get_connection(path) as conn:
-        conn.executescript("""
-            CREATE TABLE IF NOT EXISTS users (
-                id         INTEGER PRIMARY KEY AUTOINCREMENT,
-                username   TEXT    NOT NULL UNIQUE,
-                created_at TEXT    NOT NULL DEFAULT (datetime('now'))
-            );
-
-            CREATE TABLE IF NOT EXISTS boards (
-                id         INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id    INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
-                data       TEXT    NOT NULL,
-                updated_at TEXT    NOT NULL DEFAULT (datetime('now'))
-            );
-        """)
+        conn.execute("BEGIN")
+        yield conn
+
+
+# --- write notifications ---
+
+_write_listeners: list[Callable[[int, int], None]] = []
+_pending_changes = threading.local()
+
+
+def add_write_listener(fn: Callable[[int, int], None]) -> None:
+    """Call fn(board_id, version) after every committed board change."""
+    if fn not in _write_listeners:
+        _write_listeners.append(fn)
+
+
+def remove_write_listener(fn: Callable[[int, int], None]) -> None:
+    if fn in _write_listeners:
+        _write_listeners.remove(fn)
+
+
+@contextmanager
+def _write_transaction(path: Path | None = None) -> Iterator[sqlite3.Connection]:
+    """Borrow a connection holding the write lock for the whole read-modify-write.
+
+    Board versions bumped inside the transaction are announced to the write
+    listeners only once it has committed.
+    """
+    changed: list[tuple[int, int]] = []
+    _pending_changes.value = changed
+    try:
+        with get_connection(path) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+    finally:
+        _pending_changes.value = None
+    for board_id, version in changed:
+        for listener in list(_write_listeners):
+            listener(board_id, version)
+
+
+# --- schema ---
+
+DEFAULT_USER = "user"
+
+_BASE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS users (
+        id         INTEGER PRIMARY KEY AUTOINCREMENT,
+        username   TEXT    NOT NULL UNIQUE,
+        created_at TEXT    NOT NULL DEFAULT (datetime('now'))
+    );
+
+    CREATE TABLE IF NOT EXISTS boards (
+        id         INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id    INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+        version    INTEGER NOT NULL DEFAULT 1,
+        updated_at TEXT    NOT NULL DEFAULT (datetime('now'))
+    );
+
+    CREATE TABLE IF NOT EXISTS board_columns (
+        board_id   INTEGER NOT NULL REFERENCES boards(id) ON DELETE CASCADE,
+        id         TEXT    NOT NULL,
+        title      TEXT    NOT NULL,
+        position   REAL    NOT NULL,
+        PRIMARY KEY (board_id, id)
+    );
+
+    CREATE TABLE IF NOT EXISTS ai_cache (
+        key        TEXT PRIMARY KEY,
+        created_at REAL NOT NULL,
+        value      TEXT NOT NULL
+    );
+"""
+
+_CARDS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS cards (
+        pk         INTEGER PRIMARY KEY,   -- stable rowid for the search index
+        board_id   INTEGER NOT NULL REFERENCES boards(id) ON DELETE CASCADE,
+        id         TEXT    NOT NULL,
+        column_id  TEXT,
+        title      TEXT    NOT NULL,
+        details    TEXT    NOT NULL DEFAULT '',
+        position   REAL,
+        updated_at TEXT    NOT NULL DEFAULT (datetime('now')),
+        UNIQUE (board_id, id)
+    );
+
+    CREATE INDEX IF NOT EXISTS cards_by_column
+        ON cards (board_id, column_id, position);
+"""
+
+# cards_fts indexes cards through a view so each row also carries a "b<board id>"
+# token; searches match it to stay inside one board. Triggers keep it in sync
+# with every insert, update and delete, whichever code path made them; moves
+# rewrite title and details unchanged, so the update trigger skips those.
+_SEARCH_SCHEMA = """
+    CREATE VIEW IF NOT EXISTS cards_search AS
+        SELECT pk, title, details, 'b' || board_id AS board FROM cards;
+
+    CREATE VIRTUAL TABLE IF NOT EXISTS cards_fts USING fts5(
+        title, details, board,
+        content = 'cards_search',
+        content_rowid = 'pk',
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    );
+
+    CREATE TRIGGER IF NOT EXISTS cards_fts_insert AFTER INSERT ON cards BEGIN
+        INSERT INTO cards_fts (rowid, title, details, board)
+        VALUES (new.pk, new.title, new.details, 'b' || new.board_id);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS cards_fts_delete AFTER DELETE ON cards BEGIN
+        INSERT INTO cards_fts (cards_fts, rowid, title, details, board)
+        VALUES ('delete', old.pk, old.title, old.details, 'b' || old.board_id);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS cards_fts_update AFTER UPDATE OF title, details ON cards
+    WHEN old.title IS NOT new.title OR old.details IS NOT new.details BEGIN
+        INSERT INTO cards_fts (cards_fts, rowid, title, details, board)
+        VALUES ('delete', old.pk, old.title, old.details, 'b' || old.board_id);
+        INSERT INTO cards_fts (rowid, title, details, board)
+        VALUES (new.pk, new.title, new.details, 'b' || new.board_id);
+    END;
+"""
+
+
+def _run_script(conn: sqlite3.Connection, script: str) -> None:
+    """Run a multi-statement script inside the caller's transaction.
+
+    executescript() would commit first, which breaks migrations that must
+    apply all or nothing.
+    """
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            conn.execute(statement)
+            statement = ""
+
+
+def _migrate_base_schema(conn: sqlite3.Connection) -> None:
+    """Version 1: the normalized tables and search index.
+
+    Databases from before schema versioning have user_version 0 and may still
+    hold boards as JSON blobs or cards without a pk; both are converted here.
+    """
+    _run_script(conn, _BASE_SCHEMA)
+    _run_script(conn, _CARDS_SCHEMA)
+    _migrate_card_keys(conn)
+    _create_search_index(conn)
+    _migrate_json_boards(conn)
+
+
+def _migrate_board_listing(conn: sqlite3.Connection) -> None:
+    """Version 2: board titles and an index for per-user board lookups."""
+    conn.execute("ALTER TABLE boards ADD COLUMN title TEXT NOT NULL DEFAULT 'Board'")
+    conn.execute("CREATE INDEX boards_by_user ON boards (user_id, id)")
+
+
+# board_changes collects the keys of rows written in the current transaction;
+# _touch turns them into one revision and empties it again.
+_HISTORY_SCHEMA = """
+    CREATE TABLE board_revisions (
+        board_id   INTEGER NOT NULL REFERENCES boards(id) ON DELETE CASCADE,
+        version    INTEGER NOT NULL,
+        base       INTEGER NOT NULL,   -- snapshot version this revision chains from
+        created_at REAL    NOT NULL,
+        data       BLOB    NOT NULL,   -- zlib-compressed JSON: snapshot or delta
+        PRIMARY KEY (board_id, version)
+    ) WITHOUT ROWID;
+
+    CREATE TABLE board_changes (
+        board_id   INTEGER NOT NULL,
+        kind       TEXT    NOT NULL,   -- 'column' or 'card'
+        id         TEXT    NOT NULL,
+        PRIMARY KEY (board_id, kind, id)
+    ) WITHOUT ROWID;
+
+    CREATE TRIGGER columns_history_insert AFTER INSERT ON board_columns BEGIN
+        INSERT OR IGNORE INTO board_changes VALUES (new.board_id, 'column', new.id);
+    END;
+    CREATE TRIGGER columns_history_update AFTER UPDATE ON board_columns BEGIN
+        INSERT OR IGNORE INTO board_changes VALUES (new.board_id, 'column', new.id);
+    END;
+    CREATE TRIGGER columns_history_delete AFTER DELETE ON board_columns BEGIN
+        INSERT OR IGNORE INTO board_changes VALUES (old.board_id, 'column', old.id);
+    END;
+
+    CREATE TRIGGER cards_history_insert AFTER INSERT ON cards BEGIN
+        INSERT OR IGNORE INTO board_changes VALUES (new.board_id, 'card', new.id);
+    END;
+    CREATE TRIGGER cards_history_update AFTER UPDATE ON cards BEGIN
+        INSERT OR IGNORE INTO board_changes VALUES (new.board_id, 'card', new.id);
+    END;
+    CREATE TRIGGER cards_history_delete AFTER DELETE ON cards BEGIN
+        INSERT OR IGNORE INTO board_changes VALUES (old.board_id, 'card', old.id);
+    END;
+"""
+
+
+def _migrate_board_history(conn: sqlite3.Connection) -> None:
+    """Version 3: the revision log, starting with a snapshot of every board."""
+    _run_script(conn, _HISTORY_SCHEMA)
+    for row in conn.execute("SELECT id, version FROM boards").fetchall():
+        _record_revision(conn, row["id"], row["version"])
+
+
+# Background jobs (see "jobs" below). A running job is owned by one worker
+# until lease_until; a worker that dies stops renewing and the job is re-claimed.
+_JOBS_SCHEMA = """
+    CREATE TABLE jobs (
+        id           TEXT    PRIMARY KEY,
+        user_id      INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+        board_id     INTEGER NOT NULL REFERENCES boards(id) ON DELETE CASCADE,
+        kind         TEXT    NOT NULL,
+        status       TEXT    NOT NULL,   -- queued, running, succeeded, failed, cancelled
+        request      TEXT    NOT NULL,   -- JSON
+        result       TEXT,               -- JSON
+        error        TEXT,
+        version      INTEGER,            -- board version the result was applied as
+        attempts     INTEGER NOT NULL DEFAULT 0,
+        owner        TEXT,
+        lease_until  REAL,
+        created_at   REAL    NOT NULL,
+        started_at   REAL,
+        finished_at  REAL
+    );
+
+    CREATE INDEX jobs_by_status ON jobs (status, created_at);
+    CREATE INDEX jobs_by_user ON jobs (user_id, created_at);
+"""
+
+
+def _migrate_jobs(conn: sqlite3.Connection) -> None:
+    """Version 4: the background job table."""
+    _run_script(conn, _JOBS_SCHEMA)
+
+
+# board_stats holds the number of cards per (board, column_id), '' standing
+# for cards in no column. Triggers keep it current on every card insert,
+# delete and move, whichever code path made them, so stats never scan cards.
+_STATS_SCHEMA = """
+    CREATE TABLE board_stats (
+        board_id   INTEGER NOT NULL REFERENCES boards(id) ON DELETE CASCADE,
+        column_id  TEXT    NOT NULL,
+        cards      INTEGER NOT NULL,
+        PRIMARY KEY (board_id, column_id)
+    ) WITHOUT ROWID;
+
+    CREATE TRIGGER cards_stats_insert AFTER INSERT ON cards BEGIN
+        INSERT INTO board_stats VALUES (new.board_id, coalesce(new.column_id, ''), 1)
+        ON CONFLICT DO UPDATE SET cards = cards + 1;
+    END;
+    CREATE TRIGGER cards_stats_delete AFTER DELETE ON cards BEGIN
+        UPDATE board_stats SET cards = cards - 1
+        WHERE board_id = old.board_id AND column_id = coalesce(old.column_id, '');
+    END;
+    CREATE TRIGGER cards_stats_move AFTER UPDATE OF column_id ON cards
+    WHEN old.column_id IS NOT new.column_id BEGIN
+        UPDATE board_stats SET cards = cards - 1
+        WHERE board_id = old.board_id AND column_id = coalesce(old.column_id, '');
+        INSERT INTO board_stats VALUES (new.board_id, coalesce(new.column_id, ''), 1)
+        ON CONFLICT DO UPDATE SET cards = cards + 1;
+    END;
+
+    CREATE INDEX cards_by_update ON cards (board_id, updated_at);
 
+    -- JSON: the card references the last whole-board write dropped, or NULL.
+    ALTER TABLE boards ADD COLUMN integrity TEXT;
+"""
+
+
+def _migrate_board_stats(conn: sqlite3.Connection) -> None:
+    """Version 5: per-column card counts, recent-card index and integrity reports."""
+    _run_script(conn, _STATS_SCHEMA)
+    conn.execute(
+        """
+        INSERT INTO board_stats
+        SELECT board_id, coalesce(column_id, ''), count(*) FROM cards GROUP BY 1, 2
+        """
+    )
+
+
+# Append-only: MIGRATIONS[n] upgrades a database from user_version n to n + 1.
+MIGRATIONS: tuple[Callable[[sqlite3.Connection], None], ...] = (
+    _migrate_base_schema,
+    _migrate_board_listing,
+    _migrate_board_history,
+    _migrate_jobs,
+    _migrate_board_stats,
+)
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def _schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Apply pending migrations, each in its own write transaction; return the version.
+
+    The version is re-read under the write lock, so several processes can
+    start against the same file and each migration still runs exactly once.
+    """
+    version = _schema_version(conn)
+    if version > SCHEMA_VERSION:
+        raise RuntimeError(
+            f"database schema version {version} is newer than this code ({SCHEMA_VERSION})"
+        )
+    while version < SCHEMA_VERSION:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = _schema_version(conn)
+            if version < SCHEMA_VERSION:
+                MIGRATIONS[version](conn)
+                version += 1
+                conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+    return version
+
+
+def _is_seeded(conn: sqlite3.Connection) -> bool:
+    return conn.execute(
+        """
+        SELECT 1 FROM boards
+        WHERE user_id = (SELECT id FROM users WHERE username = ?)
+        LIMIT 1
+        """,
+        (DEFAULT_USER,),
+    ).fetchone() is not None
+
+
+def init_db(path: Path | None = None) -> None:
+    """Bring the schema up to date and seed the default user + board.
+
+    A database that is already current and seeded is only read: warm boots
+    and every extra worker skip the write lock and the seed statements.
+    """
+    with get_connection(path) as conn:
+        if _schema_version(conn) == SCHEMA_VERSION and _is_seeded(conn):
+            return
+        migrate(conn)
         conn.execute(
-            "INSERT OR IGNORE INTO users (username) VALUES (?)", ("user",)
+            "INSERT OR IGNORE INTO users (username) VALUES (?)", (DEFAULT_USER,)
         )
 
         row = conn.execute(
-            "SELECT id FROM users WHERE username = ?", ("user",)
+            "SELECT id FROM users WHERE username = ?", (DEFAULT_USER,)
         ).fetchone()
         user_id = row["id"]
 
@@ -69,36 +620,1489 @@ def init_db(path: Path | None = None) -> None:
         ).fetchone()
 
         if not existing:
-            conn.execute(
-                "INSERT INTO boards (user_id, data) VALUES (?, ?)",
-                (user_id, json.dumps(SEED_DATA)),
+            board_id = conn.execute(
+                "INSERT INTO boards (user_id) VALUES (?)", (user_id,)
+            ).lastrowid
+            _write_board(conn, board_id, SEED_DATA)
+            _record_revision(conn, board_id, 1)
+
+
+def _migrate_card_keys(conn: sqlite3.Connection) -> None:
+    """Rebuild a cards table created without the pk column the search index needs."""
+    columns = {row["name"] for row in conn.execute("PRAGMA table_info(cards)")}
+    if "pk" in columns:
+        return
+    conn.execute("ALTER TABLE cards RENAME TO cards_old")
+    conn.execute("DROP INDEX IF EXISTS cards_by_column")
+    _run_script(conn, _CARDS_SCHEMA)
+    conn.execute("""
+        INSERT INTO cards (board_id, id, column_id, title, details, position, updated_at)
+        SELECT board_id, id, column_id, title, details, position, updated_at FROM cards_old
+    """)
+    conn.execute("DROP TABLE cards_old")
+
+
+def _create_search_index(conn: sqlite3.Connection) -> None:
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'cards_fts'"
+    ).fetchone()
+    _run_script(conn, _SEARCH_SCHEMA)
+    if not exists:
+        conn.execute("INSERT INTO cards_fts (cards_fts) VALUES ('rebuild')")
+
+
+def _migrate_json_boards(conn: sqlite3.Connection) -> None:
+    """Move legacy boards.data JSON blobs into board_columns/cards rows."""
+    columns = {row["name"] for row in conn.execute("PRAGMA table_info(boards)")}
+    if "version" not in columns:
+        conn.execute("ALTER TABLE boards ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+    if "data" not in columns:
+        return
+    for row in conn.execute("SELECT id, data FROM boards").fetchall():
+        # boards.integrity only arrives in version 5.
+        _write_board(conn, row["id"], json.loads(row["data"]), report=False)
+    conn.execute("ALTER TABLE boards DROP COLUMN data")
+
+
+# --- ordering ---
+
+POSITION_GAP = 1024.0
+
+
+def _longest_increasing(values: list[float | None]) -> set[int]:
+    """Indices of a longest strictly increasing subsequence, skipping None entries."""
+    tails: list[int] = []           # tails[k] = index ending the best run of length k+1
+    parents: dict[int, int | None] = {}
+    for i, value in enumerate(values):
+        if value is None:
+            continue
+        lo, hi = 0, len(tails)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if values[tails[mid]] < value:
+                lo = mid + 1
+            else:
+                hi = mid
+        parents[i] = tails[lo - 1] if lo else None
+        if lo == len(tails):
+            tails.append(i)
+        else:
+            tails[lo] = i
+    keep: set[int] = set()
+    i = tails[-1] if tails else None
+    while i is not None:
+        keep.add(i)
+        i = parents[i]
+    return keep
+
+
+def _plan_positions(ids: list[str], current: dict[str, float]) -> dict[str, float]:
+    """Fractional positions for ids in order, reusing as many current ones as possible.
+
+    Items on a longest run whose current positions are already in order keep
+    them; the rest are spread evenly into the gaps between those anchors. If
+    float precision runs out the whole list is renumbered.
+    """
+    existing = [current.get(item) for item in ids]
+    keep = _longest_increasing(existing)
+    planned: list[float] = []
+    i = 0
+    while i < len(ids):
+        if i in keep:
+            planned.append(existing[i])
+            i += 1
+            continue
+        end = i
+        while end < len(ids) and end not in keep:
+            end += 1
+        lo = planned[-1] if planned else None
+        hi = existing[end] if end < len(ids) else None
+        count = end - i
+        for step in range(1, count + 1):
+            if lo is None and hi is None:
+                planned.append(step * POSITION_GAP)
+            elif lo is None:
+                planned.append(hi - (count + 1 - step) * POSITION_GAP)
+            elif hi is None:
+                planned.append(lo + step * POSITION_GAP)
+            else:
+                planned.append(lo + (hi - lo) * step / (count + 1))
+        i = end
+    if any(a >= b for a, b in zip(planned, planned[1:])):
+        planned = [(n + 1) * POSITION_GAP for n in range(len(ids))]
+    return dict(zip(ids, planned))
+
+
+def _renumber_column(conn: sqlite3.Connection, board_id: int, column_id: str) -> None:
+    ids = [row["id"] for row in conn.execute(
+        "SELECT id FROM cards WHERE board_id = ? AND column_id = ? ORDER BY position",
+        (board_id, column_id),
+    )]
+    conn.executemany(
+        "UPDATE cards SET position = ? WHERE board_id = ? AND id = ?",
+        [((n + 1) * POSITION_GAP, board_id, card_id) for n, card_id in enumerate(ids)],
+    )
+
+
+def _position_at(
+    conn: sqlite3.Connection,
+    board_id: int,
+    column_id: str,
+    index: int | None,
+    exclude: str = "",
+) -> float:
+    """A position that slots a card in at index (append when None or past the end)."""
+    for _ in range(2):
+        query = (
+            "SELECT position FROM cards WHERE board_id = ? AND column_id = ? AND id != ? "
+            "ORDER BY position LIMIT ? OFFSET ?"
+        )
+        args = (board_id, column_id, exclude)
+        if index is not None and index <= 0:
+            row = conn.execute(query, (*args, 1, 0)).fetchone()
+            lo, hi = None, (row["position"] if row else None)
+        else:
+            rows = (
+                conn.execute(query, (*args, 2, index - 1)).fetchall()
+                if index is not None else []
             )
+            if rows:
+                lo = rows[0]["position"]
+                hi = rows[1]["position"] if len(rows) > 1 else None
+            else:
+                lo = conn.execute(
+                    "SELECT MAX(position) FROM cards "
+                    "WHERE board_id = ? AND column_id = ? AND id != ?",
+                    args,
+                ).fetchone()[0]
+                hi = None
+        if lo is None and hi is None:
+            return POSITION_GAP
+        if lo is None:
+            return hi - POSITION_GAP
+        if hi is None:
+            return lo + POSITION_GAP
+        mid = (lo + hi) / 2
+        if lo < mid < hi:
+            return mid
+        _renumber_column(conn, board_id, column_id)
+    raise RuntimeError(f"could not find a position in column {column_id!r}")
 
 
-def get_board(username: str, path: Path | None = None) -> dict | None:
-    """Return the board data dict for a user, or None if not found."""
-    with get_connection(path) as conn:
-        row = conn.execute(
+# --- boards ---
+
+def _board_row(
+    conn: sqlite3.Connection, username: str, board_id: int | None = None
+) -> sqlite3.Row | None:
+    """The user's board board_id, or their first board when board_id is None.
+
+    Both forms are index lookups (users.username, boards_by_user or the boards
+    rowid), so their cost does not grow with the number of users or boards.
+    A board owned by someone else is reported as missing.
+    """
+    if board_id is None:
+        return conn.execute(
             """
-            SELECT b.data FROM boards b
-            JOIN users u ON u.id = b.user_id
-            WHERE u.username = ?
+            SELECT b.id, b.version FROM boards b
+            WHERE b.user_id = (SELECT id FROM users WHERE username = ?)
             ORDER BY b.id
             LIMIT 1
             """,
             (username,),
         ).fetchone()
-    return json.loads(row["data"]) if row else None
+    return conn.execute(
+        """
+        SELECT b.id, b.version FROM boards b
+        JOIN users u ON u.id = b.user_id
+        WHERE b.id = ? AND u.username = ?
+        """,
+        (board_id, username),
+    ).fetchone()
+
 
+def _board_id(
+    conn: sqlite3.Connection, username: str, board_id: int | None = None
+) -> int | None:
+    row = _board_row(conn, username, board_id)
+    return row["id"] if row else None
 
-def set_board(username: str, data: dict, path: Path | None = None) -> bool:
+
+def _read_board(conn: sqlite3.Connection, board_id: int) -> dict:
+    columns = [
+        {"id": row["id"], "title": row["title"], "cardIds": []}
+        for row in conn.execute(
+            "SELECT id, title FROM board_columns WHERE board_id = ? ORDER BY position",
+            (board_id,),
+        )
+    ]
+    by_id = {column["id"]: column for column in columns}
+    cards = {}
+    for row in conn.execute(
+        """
+        SELECT id, column_id, title, details FROM cards
+        WHERE board_id = ?
+        ORDER BY column_id, position
+        """,
+        (board_id,),
+    ):
+        cards[row["id"]] = {"id": row["id"], "title": row["title"], "details": row["details"]}
+        column = by_id.get(row["column_id"])
+        if column is not None:
+            column["cardIds"].append(row["id"])
+    return {"columns": columns, "cards": cards}
+
+
+def _write_board(
+    conn: sqlite3.Connection, board_id: int, data: dict, report: bool = True
+) -> None:
+    """Make the stored rows match data, touching only rows that actually changed.
+
+    With report set, what had to be dropped is stored as the board's
+    integrity report.
+    """
+    old_columns = {
+        row["id"]: (row["title"], row["position"])
+        for row in conn.execute(
+            "SELECT id, title, position FROM board_columns WHERE board_id = ?", (board_id,)
+        )
+    }
+    old_cards = {
+        row["id"]: (row["column_id"], row["title"], row["details"], row["position"])
+        for row in conn.execute(
+            "SELECT id, column_id, title, details, position FROM cards WHERE board_id = ?",
+            (board_id,),
+        )
+    }
+    cards = data.get("cards", {})
+
+    columns: dict[str, dict] = {}
+    duplicate_columns: list[str] = []
+    for column in data.get("columns", []):
+        if column["id"] in columns:
+            duplicate_columns.append(column["id"])
+        columns.setdefault(column["id"], column)
+
+    # A card belongs to the first column that lists it; unknown ids are dropped.
+    membership: dict[str, str] = {}
+    column_cards: dict[str, list[str]] = {}
+    dangling: list[str] = []
+    duplicated: list[str] = []
+    for column_id, column in columns.items():
+        listed = column_cards[column_id] = []
+        for card_id in column.get("cardIds", []):
+            if card_id not in cards:
+                dangling.append(card_id)
+            elif card_id in membership:
+                duplicated.append(card_id)
+            else:
+                membership[card_id] = column_id
+                listed.append(card_id)
+    if report:
+        _set_integrity(conn, board_id, {
+            "danglingCardIds": dangling,
+            "duplicateCardIds": duplicated,
+            "duplicateColumnIds": duplicate_columns,
+        })
+
+    column_positions = _plan_positions(
+        list(columns), {cid: pos for cid, (_, pos) in old_columns.items()}
+    )
+    conn.executemany(
+        """
+        INSERT INTO board_columns (board_id, id, title, position) VALUES (?, ?, ?, ?)
+        ON CONFLICT (board_id, id) DO UPDATE
+        SET title = excluded.title, position = excluded.position
+        """,
+        [
+            (board_id, column_id, column.get("title", ""), column_positions[column_id])
+            for column_id, column in columns.items()
+            if old_columns.get(column_id) != (column.get("title", ""), column_positions[column_id])
+        ],
+    )
+    conn.executemany(
+        "DELETE FROM board_columns WHERE board_id = ? AND id = ?",
+        [(board_id, column_id) for column_id in old_columns if column_id not in columns],
+    )
+
+    card_positions: dict[str, float] = {}
+    for column_id, listed in column_cards.items():
+        current = {
+            card_id: old_cards[card_id][3]
+            for card_id in listed
+            if card_id in old_cards and old_cards[card_id][0] == column_id
+        }
+        card_positions.update(_plan_positions(listed, current))
+
+    changed = []
+    for card_id, card in cards.items():
+        row = (
+            membership.get(card_id),
+            card.get("title", ""),
+            card.get("details", ""),
+            card_positions.get(card_id),
+        )
+        if old_cards.get(card_id) != row:
+            changed.append((board_id, card_id, *row))
+    conn.executemany(
+        """
+        INSERT INTO cards (board_id, id, column_id, title, details, position)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (board_id, id) DO UPDATE
+        SET column_id = excluded.column_id, title = excluded.title,
+            details = excluded.details, position = excluded.position,
+            updated_at = datetime('now')
+        """,
+        changed,
+    )
+    conn.executemany(
+        "DELETE FROM cards WHERE board_id = ? AND id = ?",
+        [(board_id, card_id) for card_id in old_cards if card_id not in cards],
+    )
+
+
+INTEGRITY_SAMPLE = 20   # card ids listed per kind of problem
+
+
+def _set_integrity(conn: sqlite3.Connection, board_id: int, dropped: dict[str, list[str]]) -> None:
+    """Store what the last whole-board write had to drop, NULL if nothing.
+
+    Card-level writes keep the report: they neither drop references nor bring
+    dropped ones back, and only touch cards that exist.
+
+    dropped maps each kind of problem to the ids affected; the report keeps
+    the count and the first INTEGRITY_SAMPLE ids of each.
+    """
+    report = None
+    if any(dropped.values()):
+        report = jsonio.dumps({
+            kind: {"count": len(ids), "ids": ids[:INTEGRITY_SAMPLE]}
+            for kind, ids in dropped.items()
+        }).decode()
+    conn.execute(
+        "UPDATE boards SET integrity = ? WHERE id = ? AND integrity IS NOT ?",
+        (report, board_id, report),
+    )
+
+
+def _touch(conn: sqlite3.Connection, board_id: int, steps: int = 1) -> int:
+    """Bump a board's version after a change and return the new version.
+
+    steps > 1 gives each of several coalesced writes a version of its own;
+    only the last of them is stored.
+    """
+    version = conn.execute(
+        """
+        UPDATE boards SET version = version + ?, updated_at = datetime('now')
+        WHERE id = ?
+        RETURNING version
+        """,
+        (steps, board_id),
+    ).fetchone()["version"]
+    _record_revision(conn, board_id, version, version - steps)
+    pending = getattr(_pending_changes, "value", None)
+    if pending is not None:
+        pending.append((board_id, version))
+    return version
+
+
+def _check_version(row: sqlite3.Row, expected_version: int | None) -> None:
+    if expected_version is not None and row["version"] != expected_version:
+        raise VersionConflict(row["version"])
+
+
+def get_board(
+    username: str, path: Path | None = None, board_id: int | None = None
+) -> dict | None:
+    """Return the board data dict for a user, or None if not found."""
+    result = get_versioned_board(username, path, board_id)
+    return result[0] if result else None
+
+
+def get_versioned_board(
+    username: str, path: Path | None = None, board_id: int | None = None
+) -> tuple[dict, int, int] | None:
+    """Return (board data, version, board id) for a user, or None if not found."""
+    with _read_transaction(path) as conn:
+        row = _board_row(conn, username, board_id)
+        if row is None:
+            return None
+        return _read_board(conn, row["id"]), row["version"], row["id"]
+
+
+def get_board_version(
+    username: str, path: Path | None = None, board_id: int | None = None
+) -> tuple[int, int] | None:
+    """Return (board id, version) without reading the board, or None if not found."""
+    with get_connection(path) as conn:
+        row = _board_row(conn, username, board_id)
+    return (row["id"], row["version"]) if row else None
+
+
+def save_board(
+    username: str,
+    data: dict,
+    expected_version: int | None = None,
+    path: Path | None = None,
+    board_id: int | None = None,
+) -> int | None:
+    """Overwrite the board data for a user and return its new version.
+
+    Returns None if the user has no board. With expected_version set, raises
+    VersionConflict instead of writing when the board has moved on.
+    """
+    with _write_transaction(path) as conn:
+        row = _board_row(conn, username, board_id)
+        if row is None:
+            return None
+        _check_version(row, expected_version)
+        _write_board(conn, row["id"], data)
+        return _touch(conn, row["id"])
+
+
+def save_boards(
+    writes: list[tuple[str, int | None, list[tuple[dict, int | None]]]],
+    path: Path | None = None,
+) -> list[list[int | VersionConflict | None]]:
+    """Commit queued whole-board writes in one transaction.
+
+    writes holds (username, board_id, [(data, expected_version), ...]) per
+    board, each board's writes in arrival order. They are checked as if
+    applied one by one, and each accepted write gets its own version, but
+    only the last accepted data is stored: the earlier writes would have been
+    overwritten by it anyway. Their versions are skipped in the history, and
+    an If-Match holding one of them conflicts, as it would have unbatched.
+
+    Returns the outcome of every write, in the same shape: the version
+    assigned to it, a VersionConflict, or None if the user has no such board.
+    """
+    outcomes: list[list[int | VersionConflict | None]] = []
+    with _write_transaction(path) as conn:
+        for username, board_id, board_writes in writes:
+            row = _board_row(conn, username, board_id)
+            if row is None:
+                outcomes.append([None] * len(board_writes))
+                continue
+            # Once one write is accepted the board is past row["version"], and
+            # nobody can hold the version it will get, so later If-Matches fail.
+            accepted: list[int] = []
+            for n, (_, expected_version) in enumerate(board_writes):
+                if expected_version is None or (
+                    not accepted and expected_version == row["version"]
+                ):
+                    accepted.append(n)
+            version = row["version"]
+            if accepted:
+                _write_board(conn, row["id"], board_writes[accepted[-1]][0])
+                version = _touch(conn, row["id"], steps=len(accepted))
+            assigned = {n: row["version"] + i for i, n in enumerate(accepted, 1)}
+            outcomes.append([
+                assigned[n] if n in assigned else VersionConflict(version)
+                for n in range(len(board_writes))
+            ])
+    return outcomes
+
+
+def set_board(
+    username: str, data: dict, path: Path | None = None, board_id: int | None = None
+) -> bool:
     """Overwrite the board data for a user. Returns True on success."""
+    return save_board(username, data, path=path, board_id=board_id) is not None
+
+
+def _valid_column(column) -> bool:
+    card_ids = column.get("cardIds", []) if isinstance(column, dict) else None
+    return (
+        isinstance(column, dict)
+        and isinstance(column.get("id"), str)
+        and isinstance(column.get("title", ""), str)
+        and isinstance(card_ids, list)
+        and all(isinstance(card_id, str) for card_id in card_ids)
+    )
+
+
+def _valid_card(card) -> bool:
+    return (
+        isinstance(card, dict)
+        and isinstance(card.get("title", ""), str)
+        and isinstance(card.get("details", ""), str)
+    )
+
+
+def _valid_board(board) -> bool:
+    """Whether board has the shape and value types _write_board needs."""
+    return (
+        isinstance(board, dict)
+        and isinstance(board.get("columns"), list)
+        and isinstance(board.get("cards"), dict)
+        and all(_valid_column(c) for c in board["columns"])
+        and all(_valid_card(c) for c in board["cards"].values())
+    )
+
+
+def patch_board(
+    username: str,
+    patch: list[dict],
+    expected_version: int,
+    path: Path | None = None,
+    board_id: int | None = None,
+) -> int | None:
+    """Apply an RFC 6902 JSON Patch to the stored board and return the new version.
+
+    The read, patch and write happen under one write lock, so the patch is
+    applied to exactly expected_version or not at all. Returns None if the
+    user has no board; raises VersionConflict or PatchError otherwise.
+    """
+    with _write_transaction(path) as conn:
+        row = _board_row(conn, username, board_id)
+        if row is None:
+            return None
+        _check_version(row, expected_version)
+        board = apply_patch(_read_board(conn, row["id"]), patch)
+        if not _valid_board(board):
+            raise PatchError("patched document is not a valid board")
+        _write_board(conn, row["id"], board)
+        return _touch(conn, row["id"])
+
+
+# --- stats ---
+
+DEFAULT_RECENT_CARDS = 5
+_NO_PROBLEMS = {"count": 0, "ids": []}
+
+
+def get_board_stats(
+    username: str,
+    recent: int = DEFAULT_RECENT_CARDS,
+    path: Path | None = None,
+    board_id: int | None = None,
+) -> dict | None:
+    """Card counts, recently updated cards and integrity findings, or None if not found.
+
+    Reads the trigger-maintained board_stats counts, the columns and the first
+    rows of cards_by_update, so the cost does not grow with the number of
+    cards. Dropped references come from the last whole-board write; cards in
+    no column, or in a column that no longer exists, are counted live.
+    """
+    recent = max(0, min(recent, MAX_PAGE_SIZE))
+    with _read_transaction(path) as conn:
+        row = _board_row(conn, username, board_id)
+        if row is None:
+            return None
+        counts = {
+            r["column_id"]: r["cards"]
+            for r in conn.execute(
+                "SELECT column_id, cards FROM board_stats WHERE board_id = ? AND cards > 0",
+                (row["id"],),
+            )
+        }
+        columns = [
+            {"id": r["id"], "title": r["title"], "cards": counts.pop(r["id"], 0)}
+            for r in conn.execute(
+                "SELECT id, title FROM board_columns WHERE board_id = ? ORDER BY position",
+                (row["id"],),
+            )
+        ]
+        recent_cards = [
+            {"id": r["id"], "columnId": r["column_id"], "title": r["title"],
+             "updatedAt": r["updated_at"]}
+            for r in conn.execute(
+                """
+                SELECT id, column_id, title, updated_at FROM cards
+                WHERE board_id = ?
+                ORDER BY updated_at DESC, pk DESC
+                LIMIT ?
+                """,
+                (row["id"], recent),
+            )
+        ]
+        report = conn.execute(
+            "SELECT integrity FROM boards WHERE id = ?", (row["id"],)
+        ).fetchone()["integrity"]
+    unlisted = counts.pop("", 0)
+    missing_columns = sum(counts.values())
+    dropped = jsonio.loads(report) if report else {}
+    integrity = {
+        kind: dropped.get(kind, _NO_PROBLEMS)
+        for kind in ("danglingCardIds", "duplicateCardIds", "duplicateColumnIds")
+    }
+    return {
+        "version": row["version"],
+        "cards": sum(c["cards"] for c in columns) + unlisted + missing_columns,
+        "columns": columns,
+        "recent": recent_cards,
+        "integrity": {
+            "ok": not dropped and not unlisted and not missing_columns,
+            "unlistedCards": unlisted,
+            "cardsInMissingColumns": missing_columns,
+            **integrity,
+        },
+    }
+
+
+# --- history ---
+#
+# Every version of a board is stored in board_revisions, either as a full
+# snapshot of its rows or as a delta holding only the rows that changed since
+# the previous version (a row mapped to None was deleted). A new snapshot is
+# taken every HISTORY_SNAPSHOT_INTERVAL versions, so rebuilding any version
+# applies at most that many deltas to one snapshot. Row state is
+#
+#     {"columns": {id: [title, position]},
+#      "cards":   {id: [column_id, title, details, position]}}
+
+
+def _pack(value) -> bytes:
+    return zlib.compress(jsonio.dumps(value))
+
+
+def _unpack(data: bytes):
+    return jsonio.loads(zlib.decompress(data))
+
+
+def _row_state(conn: sqlite3.Connection, board_id: int, kind: str, ids: list[str]) -> dict:
+    """Current rows of one kind for board_id, limited to ids unless ids is empty."""
+    if kind == "column":
+        sql = "SELECT id, title, position FROM board_columns WHERE board_id = ?"
+    else:
+        sql = "SELECT id, column_id, title, details, position FROM cards WHERE board_id = ?"
+    params: list = [board_id]
+    if ids:
+        sql += f" AND id IN ({','.join('?' * len(ids))})"
+        params += ids
+    return {row[0]: list(row[1:]) for row in conn.execute(sql, params)}
+
+
+def _record_revision(
+    conn: sqlite3.Connection, board_id: int, version: int, previous: int | None = None
+) -> None:
+    """Append version to the board's revision log, inside the writing transaction.
+
+    previous is the version the change was made on, version - 1 by default.
+    """
+    changed: dict[str, list[str]] = {"column": [], "card": []}
+    for row in conn.execute(
+        "DELETE FROM board_changes WHERE board_id = ? RETURNING kind, id", (board_id,)
+    ):
+        changed[row["kind"]].append(row["id"])
+
+    last = conn.execute(
+        """
+        SELECT version, base FROM board_revisions
+        WHERE board_id = ? ORDER BY version DESC LIMIT 1
+        """,
+        (board_id,),
+    ).fetchone()
+    if (
+        last is None
+        or last["version"] != (version - 1 if previous is None else previous)
+        or version - last["base"] >= HISTORY_SNAPSHOT_INTERVAL
+    ):
+        base = version
+        state = {
+            "columns": _row_state(conn, board_id, "column", []),
+            "cards": _row_state(conn, board_id, "card", []),
+        }
+    else:
+        base = last["base"]
+        state = {}
+        for kind, key in (("column", "columns"), ("card", "cards")):
+            # Chunked to stay under SQLite's bound-parameter limit.
+            ids, rows = changed[kind], {}
+            for start in range(0, len(ids), 500):
+                rows.update(_row_state(conn, board_id, kind, ids[start:start + 500]))
+            state[key] = {row_id: rows.get(row_id) for row_id in ids}
+    conn.execute(
+        """
+        INSERT OR REPLACE INTO board_revisions (board_id, version, base, created_at, data)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        (board_id, version, base, time.time(), _pack(state)),
+    )
+    _prune_revisions(conn, board_id, version)
+
+
+def _prune_revisions(conn: sqlite3.Connection, board_id: int, version: int) -> None:
+    """Apply the retention settings, never cutting a delta off from its snapshot."""
+    keep_from = version - HISTORY_MAX_REVISIONS + 1 if HISTORY_MAX_REVISIONS > 0 else 1
+    if HISTORY_MAX_AGE_DAYS > 0:
+        cutoff = time.time() - HISTORY_MAX_AGE_DAYS * 86400
+        oldest_recent = conn.execute(
+            "SELECT min(version) FROM board_revisions WHERE board_id = ? AND created_at >= ?",
+            (board_id, cutoff),
+        ).fetchone()[0]
+        keep_from = max(keep_from, oldest_recent or version)
+    boundary = conn.execute(
+        """
+        SELECT max(version) FROM board_revisions
+        WHERE board_id = ? AND version <= ? AND base = version
+        """,
+        (board_id, keep_from),
+    ).fetchone()[0]
+    if boundary is not None:
+        conn.execute(
+            "DELETE FROM board_revisions WHERE board_id = ? AND version < ?",
+            (board_id, boundary),
+        )
+
+
+def _board_at(conn: sqlite3.Connection, board_id: int, version: int) -> dict | None:
+    """Rebuild the board as it was at version, or None if that revision is gone."""
+    target = conn.execute(
+        "SELECT base FROM board_revisions WHERE board_id = ? AND version = ?",
+        (board_id, version),
+    ).fetchone()
+    if target is None:
+        return None
+    state = {"columns": {}, "cards": {}}
+    for row in conn.execute(
+        """
+        SELECT data FROM board_revisions
+        WHERE board_id = ? AND version BETWEEN ? AND ?
+        ORDER BY version
+        """,
+        (board_id, target["base"], version),
+    ):
+        for key, rows in _unpack(row["data"]).items():
+            for row_id, value in rows.items():
+                if value is None:
+                    state[key].pop(row_id, None)
+                else:
+                    state[key][row_id] = value
+
+    columns = [
+        {"id": column_id, "title": title, "cardIds": []}
+        for column_id, (title, _) in sorted(state["columns"].items(), key=lambda item: item[1][1])
+    ]
+    by_id = {column["id"]: column for column in columns}
+    cards = {}
+    # Same order as _read_board: by column, then position.
+    for card_id, (column_id, title, details, _) in sorted(
+        state["cards"].items(), key=lambda item: (item[1][0] or "", item[1][3] or 0.0)
+    ):
+        cards[card_id] = {"id": card_id, "title": title, "details": details}
+        if column_id in by_id:
+            by_id[column_id]["cardIds"].append(card_id)
+    return {"columns": columns, "cards": cards}
+
+
+def list_revisions(
+    username: str,
+    limit: int = DEFAULT_PAGE_SIZE,
+    before: int | None = None,
+    path: Path | None = None,
+    board_id: int | None = None,
+) -> dict | None:
+    """One page of the board's revisions, newest first, or None if not found.
+
+    Pass the returned nextCursor as before for the next (older) page.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    with _read_transaction(path) as conn:
+        board_id = _board_id(conn, username, board_id)
+        if board_id is None:
+            return None
+        rows = conn.execute(
+            """
+            SELECT version, base, created_at, length(data) AS size FROM board_revisions
+            WHERE board_id = ? AND version < ?
+            ORDER BY version DESC
+            LIMIT ?
+            """,
+            (board_id, before or 2**62, limit + 1),
+        ).fetchall()
+    revisions = [
+        {
+            "version": row["version"],
+            "kind": "snapshot" if row["base"] == row["version"] else "delta",
+            "createdAt": row["created_at"],
+            "size": row["size"],
+        }
+        for row in rows[:limit]
+    ]
+    return {
+        "revisions": revisions,
+        "nextCursor": revisions[-1]["version"] if len(rows) > limit else None,
+    }
+
+
+def get_revision(
+    username: str,
+    version: int,
+    path: Path | None = None,
+    board_id: int | None = None,
+) -> dict | None:
+    """The board as it was at version, or None if the board or revision is unknown."""
+    with _read_transaction(path) as conn:
+        board_id = _board_id(conn, username, board_id)
+        if board_id is None:
+            return None
+        return _board_at(conn, board_id, version)
+
+
+def restore_revision(
+    username: str,
+    version: int,
+    expected_version: int | None = None,
+    path: Path | None = None,
+    board_id: int | None = None,
+) -> int | None:
+    """Make the board look like it did at version and return the new version.
+
+    The restore is itself a new revision, so it can be undone the same way.
+    Returns None if the board or revision is unknown; raises VersionConflict
+    like save_board.
+    """
+    with _write_transaction(path) as conn:
+        row = _board_row(conn, username, board_id)
+        if row is None:
+            return None
+        _check_version(row, expected_version)
+        board = _board_at(conn, row["id"], version)
+        if board is None:
+            return None
+        _write_board(conn, row["id"], board)
+        return _touch(conn, row["id"])
+
+
+# --- board listing ---
+
+def _board_summary(row: sqlite3.Row) -> dict:
+    return {
+        "id": row["id"],
+        "title": row["title"],
+        "version": row["version"],
+        "updatedAt": row["updated_at"],
+    }
+
+
+def list_boards(
+    username: str,
+    limit: int = DEFAULT_PAGE_SIZE,
+    after: int | None = None,
+    path: Path | None = None,
+) -> dict | None:
+    """One page of the user's boards in id order, or None for an unknown user.
+
+    Pages are keyset-paginated on the board id (boards_by_user), so a page
+    costs the same however deep into the list it is. Pass the returned
+    nextCursor as after for the next page; it is None on the last page.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    with _read_transaction(path) as conn:
+        user = conn.execute("SELECT id FROM users WHERE username = ?", (username,)).fetchone()
+        if user is None:
+            return None
+        rows = conn.execute(
+            """
+            SELECT id, title, version, updated_at FROM boards
+            WHERE user_id = ? AND id > ?
+            ORDER BY id
+            LIMIT ?
+            """,
+            (user["id"], after or 0, limit + 1),
+        ).fetchall()
+    boards = [_board_summary(row) for row in rows[:limit]]
+    return {
+        "boards": boards,
+        "nextCursor": boards[-1]["id"] if len(rows) > limit else None,
+    }
+
+
+def create_board(
+    username: str,
+    title: str,
+    data: dict | None = None,
+    path: Path | None = None,
+) -> dict:
+    """Create a board (and the user, on first use) and return its summary."""
+    with _write_transaction(path) as conn:
+        conn.execute("INSERT OR IGNORE INTO users (username) VALUES (?)", (username,))
+        row = conn.execute(
+            """
+            INSERT INTO boards (user_id, title)
+            SELECT id, ? FROM users WHERE username = ?
+            RETURNING id, title, version, updated_at
+            """,
+            (title, username),
+        ).fetchone()
+        if data:
+            _write_board(conn, row["id"], data)
+        _record_revision(conn, row["id"], row["version"])
+        return _board_summary(row)
+
+
+# --- jobs ---
+#
+# Long-running work (AI requests) is recorded in the jobs table and run by
+# jobs.JobQueue workers in any process. claim_job hands each job to one worker
+# under a lease, and finish_job writes the outcome and any board change in one
+# transaction, so a job's edits land exactly once or not at all.
+
+JOB_STATUSES = ("queued", "running", "succeeded", "failed", "cancelled")
+JOB_FINISHED = ("succeeded", "failed", "cancelled")
+
+
+class JobConflict(Exception):
+    """A job's result could not be applied to the board as it is now."""
+
+
+def _job(row: sqlite3.Row) -> dict:
+    return {
+        "id": row["id"],
+        "boardId": row["board_id"],
+        "kind": row["kind"],
+        "status": row["status"],
+        "result": jsonio.loads(row["result"]) if row["result"] else None,
+        "error": row["error"],
+        "version": row["version"],
+        "attempts": row["attempts"],
+        "createdAt": row["created_at"],
+        "startedAt": row["started_at"],
+        "finishedAt": row["finished_at"],
+    }
+
+
+def create_job(
+    username: str,
+    kind: str,
+    request: dict,
+    path: Path | None = None,
+    board_id: int | None = None,
+) -> dict | None:
+    """Queue a job against the user's board; None if the board does not exist."""
+    with _write_transaction(path) as conn:
+        board = _board_row(conn, username, board_id)
+        if board is None:
+            return None
+        row = conn.execute(
+            """
+            INSERT INTO jobs (id, user_id, board_id, kind, status, request, created_at)
+            SELECT ?, user_id, id, ?, 'queued', ?, ? FROM boards WHERE id = ?
+            RETURNING *
+            """,
+            (uuid.uuid4().hex, kind, jsonio.dumps(request), time.time(), board["id"]),
+        ).fetchone()
+        return _job(row)
+
+
+def get_job(username: str, job_id: str, path: Path | None = None) -> dict | None:
     with get_connection(path) as conn:
-        result = conn.execute(
+        row = conn.execute(
+            """
+            SELECT j.* FROM jobs j JOIN users u ON u.id = j.user_id
+            WHERE j.id = ? AND u.username = ?
+            """,
+            (job_id, username),
+        ).fetchone()
+    return _job(row) if row else None
+
+
+def list_jobs(
+    username: str, limit: int = DEFAULT_PAGE_SIZE, path: Path | None = None
+) -> list[dict]:
+    """The user's most recent jobs, newest first."""
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    with get_connection(path) as conn:
+        rows = conn.execute(
             """
-            UPDATE boards SET data = ?, updated_at = datetime('now')
-            WHERE user_id = (SELECT id FROM users WHERE username = ?)
+            SELECT j.* FROM jobs j
+            WHERE j.user_id = (SELECT id FROM users WHERE username = ?)
+            ORDER BY j.created_at DESC
+            LIMIT ?
             """,
-            (json.dumps(data), username),
+            (username, limit),
+        ).fetchall()
+    return [_job(row) for row in rows]
+
+
+def claim_job(
+    owner: str,
+    lease_seconds: float,
+    per_user_limit: int,
+    max_attempts: int,
+    path: Path | None = None,
+) -> dict | None:
+    """Take the oldest runnable job for owner, or None if there is nothing to do.
+
+    Runnable means queued, or running under a lease that has expired because
+    its worker died. A user never has more than per_user_limit jobs running at
+    once, across all workers; a job whose worker died max_attempts times fails.
+    """
+    now = time.time()
+    with _write_transaction(path) as conn:
+        conn.execute(
+            """
+            UPDATE jobs SET status = 'failed', error = 'worker lost', finished_at = ?, owner = NULL
+            WHERE status = 'running' AND lease_until < ? AND attempts >= ?
+            """,
+            (now, now, max_attempts),
+        )
+        row = conn.execute(
+            """
+            UPDATE jobs
+            SET status = 'running', owner = ?, lease_until = ?, attempts = attempts + 1,
+                started_at = coalesce(started_at, ?)
+            WHERE id = (
+                SELECT j.id FROM jobs j
+                WHERE (j.status = 'queued' OR (j.status = 'running' AND j.lease_until < ?))
+                  AND (
+                      SELECT count(*) FROM jobs r
+                      WHERE r.user_id = j.user_id AND r.status = 'running' AND r.lease_until >= ?
+                  ) < ?
+                ORDER BY j.created_at
+                LIMIT 1
+            )
+            RETURNING id, board_id, kind, request,
+                      (SELECT username FROM users WHERE id = user_id) AS username
+            """,
+            (owner, now + lease_seconds, now, now, now, per_user_limit),
+        ).fetchone()
+    if row is None:
+        return None
+    return {
+        "id": row["id"],
+        "boardId": row["board_id"],
+        "kind": row["kind"],
+        "request": jsonio.loads(row["request"]),
+        "username": row["username"],
+    }
+
+
+def renew_job(job_id: str, owner: str, lease_seconds: float, path: Path | None = None) -> bool:
+    """Extend owner's lease; False once the job was cancelled or taken over."""
+    with get_connection(path) as conn:
+        return conn.execute(
+            """
+            UPDATE jobs SET lease_until = ?
+            WHERE id = ? AND owner = ? AND status = 'running'
+            """,
+            (time.time() + lease_seconds, job_id, owner),
+        ).rowcount > 0
+
+
+def _apply_job_result(conn: sqlite3.Connection, board_id: int, result: dict, base_version: int) -> int:
+    """Write result["board"] to the board; return the new version.
+
+    If the board changed while the job ran, its operations are replayed on the
+    current board instead; a whole-board result cannot be, and conflicts.
+    """
+    current = conn.execute("SELECT version FROM boards WHERE id = ?", (board_id,)).fetchone()
+    board = result["board"]
+    if current["version"] != base_version:
+        if not result.get("operations"):
+            raise JobConflict("the board changed while the job ran")
+        try:
+            board = apply_operations(_read_board(conn, board_id), result["operations"])
+        except ValueError as e:
+            raise JobConflict(f"the edits no longer fit the board: {e}")
+    if not _valid_board(board):
+        raise JobConflict("the job produced an invalid board")
+    _write_board(conn, board_id, board)
+    return _touch(conn, board_id)
+
+
+def finish_job(
+    job_id: str,
+    owner: str,
+    result: dict | None = None,
+    base_version: int | None = None,
+    error: str | None = None,
+    path: Path | None = None,
+) -> dict | None:
+    """Record a job's outcome; None if owner no longer holds it (e.g. it was cancelled).
+
+    A result carrying a "board" is written to the job's board in the same
+    transaction that marks the job succeeded. The board itself is not kept in
+    the job's result, only the version it was saved as.
+    """
+    with _write_transaction(path) as conn:
+        job = conn.execute(
+            "SELECT board_id FROM jobs WHERE id = ? AND owner = ? AND status = 'running'",
+            (job_id, owner),
+        ).fetchone()
+        if job is None:
+            return None
+        version = None
+        if error is None and result is not None and result.get("board") is not None:
+            # A result that cannot be written fails the job rather than the worker.
+            conn.execute("SAVEPOINT job_result")
+            try:
+                version = _apply_job_result(conn, job["board_id"], result, base_version)
+            except JobConflict as e:
+                error = str(e)
+            except Exception as e:
+                conn.execute("ROLLBACK TO job_result")
+                error = f"the job's board could not be saved: {e}"
+            conn.execute("RELEASE job_result")
+        stored = None if result is None else {k: v for k, v in result.items() if k != "board"}
+        row = conn.execute(
+            """
+            UPDATE jobs
+            SET status = ?, result = ?, error = ?, version = ?, finished_at = ?,
+                owner = NULL, lease_until = NULL
+            WHERE id = ?
+            RETURNING *
+            """,
+            (
+                "failed" if error is not None else "succeeded",
+                jsonio.dumps(stored) if stored is not None else None,
+                error, version, time.time(), job_id,
+            ),
+        ).fetchone()
+        return _job(row)
+
+
+def cancel_job(username: str, job_id: str, path: Path | None = None) -> dict | None:
+    """Cancel a queued or running job and return it; finished jobs are returned unchanged."""
+    with _write_transaction(path) as conn:
+        row = conn.execute(
+            """
+            UPDATE jobs SET status = 'cancelled', finished_at = ?, owner = NULL, lease_until = NULL
+            WHERE id = ? AND status IN ('queued', 'running')
+              AND user_id = (SELECT id FROM users WHERE username = ?)
+            RETURNING *
+            """,
+            (time.time(), job_id, username),
+        ).fetchone()
+    return _job(row) if row else get_job(username, job_id, path)
+
+
+# --- bulk import / export ---
+#
+# board_io streams boards in and out a page or batch at a time, so these work
+# on slices of a board rather than whole boards.
+
+def get_board_outline(
+    username: str, path: Path | None = None, board_id: int | None = None
+) -> dict | None:
+    """The board's id, title, version and columns in order, without its cards."""
+    with _read_transaction(path) as conn:
+        row = _board_row(conn, username, board_id)
+        if row is None:
+            return None
+        title = conn.execute("SELECT title FROM boards WHERE id = ?", (row["id"],)).fetchone()[0]
+        columns = [
+            {"id": column["id"], "title": column["title"]}
+            for column in conn.execute(
+                "SELECT id, title FROM board_columns WHERE board_id = ? ORDER BY position",
+                (row["id"],),
+            )
+        ]
+    return {"id": row["id"], "title": title, "version": row["version"], "columns": columns}
+
+
+def list_column_cards(
+    board_id: int,
+    column_id: str | None,
+    after: tuple[float, int] | None = None,
+    limit: int = EXPORT_PAGE_SIZE,
+    path: Path | None = None,
+) -> tuple[list[dict], tuple[float, int] | None]:
+    """One page of a column's cards in board order, and the cursor for the next page.
+
+    Pages are keyset-paginated on (position, pk) along cards_by_column, so
+    each costs the same however deep into the column it is. The cursor is
+    None after the last page. column_id None pages through the cards that are
+    in no column.
+    """
+    with get_connection(path) as conn:
+        if column_id is None:
+            rows = conn.execute(
+                """
+                SELECT pk, id, column_id, title, details, 0 AS position FROM cards
+                WHERE board_id = ? AND column_id IS NULL AND pk > ?
+                ORDER BY pk
+                LIMIT ?
+                """,
+                (board_id, after[1] if after else 0, limit),
+            ).fetchall()
+        else:
+            rows = conn.execute(
+                """
+                SELECT pk, id, column_id, title, details, position FROM cards
+                WHERE board_id = ? AND column_id = ? AND (position, pk) > (?, ?)
+                ORDER BY position, pk
+                LIMIT ?
+                """,
+                (board_id, column_id, *(after or (float("-inf"), 0)), limit),
+            ).fetchall()
+    cards = [
+        {"id": r["id"], "columnId": r["column_id"], "title": r["title"], "details": r["details"]}
+        for r in rows
+    ]
+    cursor = (rows[-1]["position"], rows[-1]["pk"]) if len(rows) == limit else None
+    return cards, cursor
+
+
+def import_batch(
+    board_id: int,
+    columns: list[dict],
+    cards: list[dict],
+    replace: bool = False,
+    path: Path | None = None,
+) -> int:
+    """Upsert one batch of columns and cards in one transaction; return the new version.
+
+    New columns and cards are appended in the order given; ones already on
+    the board (by id) are updated and moved to the end of their column. With
+    replace=True the board is emptied first. A card whose columnId is None
+    is in no column. Raises ValueError for a card whose column is neither on
+    the board nor in the batch.
+    """
+    with _write_transaction(path) as conn:
+        if replace:
+            conn.execute("DELETE FROM cards WHERE board_id = ?", (board_id,))
+            conn.execute("DELETE FROM board_columns WHERE board_id = ?", (board_id,))
+            # The import replaces the write the report was about, and drops nothing.
+            _set_integrity(conn, board_id, {})
+        existing = {
+            row["id"]: row["position"]
+            for row in conn.execute(
+                "SELECT id, position FROM board_columns WHERE board_id = ?", (board_id,)
+            )
+        }
+        last = max(existing.values(), default=0.0)
+        for column in columns:
+            if column["id"] in existing:
+                conn.execute(
+                    "UPDATE board_columns SET title = ? WHERE board_id = ? AND id = ?",
+                    (column["title"], board_id, column["id"]),
+                )
+            else:
+                last += POSITION_GAP
+                existing[column["id"]] = last
+                conn.execute(
+                    "INSERT INTO board_columns (board_id, id, title, position) VALUES (?, ?, ?, ?)",
+                    (board_id, column["id"], column["title"], last),
+                )
+
+        ends: dict[str, float] = {}
+        rows = []
+        for card in cards:
+            column_id = card["columnId"]
+            if column_id is None:
+                rows.append((board_id, card["id"], None, card["title"], card.get("details", ""), None))
+                continue
+            if column_id not in existing:
+                raise ValueError(f"card {card['id']!r} is in unknown column {column_id!r}")
+            if column_id not in ends:
+                ends[column_id] = conn.execute(
+                    "SELECT coalesce(max(position), 0) FROM cards WHERE board_id = ? AND column_id = ?",
+                    (board_id, column_id),
+                ).fetchone()[0]
+            ends[column_id] += POSITION_GAP
+            rows.append(
+                (board_id, card["id"], column_id, card["title"], card.get("details", ""), ends[column_id])
+            )
+        conn.executemany(
+            """
+            INSERT INTO cards (board_id, id, column_id, title, details, position)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (board_id, id) DO UPDATE
+            SET column_id = excluded.column_id, title = excluded.title,
+                details = excluded.details, position = excluded.position,
+                updated_at = datetime('now')
+            """,
+            rows,
         )
-    return result.rowcount > 0
+        return _touch(conn, board_id)
+
+
+# --- card-level mutations ---
+
+def _card(row: sqlite3.Row) -> dict:
+    return {"id": row["id"], "title": row["title"], "details": row["details"]}
+
+
+def _column_exists(conn: sqlite3.Connection, board_id: int, column_id: str) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM board_columns WHERE board_id = ? AND id = ?", (board_id, column_id)
+    ).fetchone() is not None
+
+
+def create_card(
+    username: str,
+    column_id: str,
+    title: str,
+    details: str = "",
+    card_id: str | None = None,
+    index: int | None = None,
+    path: Path | None = None,
+    board_id: int | None = None,
+) -> dict | None:
+    """Insert one card into a column at index (appended by default).
+
+    Returns the new card, or None if the board or column does not exist.
+    Raises ValueError if card_id is already taken on this board.
+    """
+    card_id = card_id or f"card-{uuid.uuid4().hex[:12]}"
+    with _write_transaction(path) as conn:
+        board_id = _board_id(conn, username, board_id)
+        if board_id is None or not _column_exists(conn, board_id, column_id):
+            return None
+        taken = conn.execute(
+            "SELECT 1 FROM cards WHERE board_id = ? AND id = ?", (board_id, card_id)
+        ).fetchone()
+        if taken:
+            raise ValueError(f"card {card_id!r} already exists")
+        conn.execute(
+            """
+            INSERT INTO cards (board_id, id, column_id, title, details, position)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (board_id, card_id, column_id, title, details,
+             _position_at(conn, board_id, column_id, index)),
+        )
+        _touch(conn, board_id)
+    return {"id": card_id, "title": title, "details": details}
+
+
+def update_card(
+    username: str,
+    card_id: str,
+    title: str | None = None,
+    details: str | None = None,
+    column_id: str | None = None,
+    index: int | None = None,
+    path: Path | None = None,
+    board_id: int | None = None,
+) -> dict | None:
+    """Edit and/or move one card; only that card's row is rewritten.
+
+    A move places the card at index within column_id (appended when index is
+    None). Returns the card, or None if the board, card or target column does
+    not exist.
+    """
+    with _write_transaction(path) as conn:
+        board_id = _board_id(conn, username, board_id)
+        if board_id is None:
+            return None
+        row = conn.execute(
+            "SELECT column_id, position FROM cards WHERE board_id = ? AND id = ?",
+            (board_id, card_id),
+        ).fetchone()
+        if row is None:
+            return None
+        position = row["position"]
+        if column_id is None:
+            column_id = row["column_id"]
+        elif not _column_exists(conn, board_id, column_id):
+            return None
+        else:
+            position = _position_at(conn, board_id, column_id, index, exclude=card_id)
+        card = conn.execute(
+            """
+            UPDATE cards
+            SET title = coalesce(?, title), details = coalesce(?, details),
+                column_id = ?, position = ?, updated_at = datetime('now')
+            WHERE board_id = ? AND id = ?
+            RETURNING id, title, details
+            """,
+            (title, details, column_id, position, board_id, card_id),
+        ).fetchone()
+        _touch(conn, board_id)
+        return _card(card)
+
+
+def delete_card(
+    username: str, card_id: str, path: Path | None = None, board_id: int | None = None
+) -> bool:
+    """Delete one card. Returns False if the board or card does not exist."""
+    with _write_transaction(path) as conn:
+        board_id = _board_id(conn, username, board_id)
+        if board_id is None:
+            return False
+        deleted = conn.execute(
+            "DELETE FROM cards WHERE board_id = ? AND id = ?", (board_id, card_id)
+        ).rowcount
+        if not deleted:
+            return False
+        _touch(conn, board_id)
+    return True
+
+
+# --- search ---
+
+_SEARCH_TERM = re.compile(r"\w+")
+
+
+def _search_expression(board_id: int, query: str) -> str | None:
+    """FTS5 query matching every word of query as a prefix, within one board.
+
+    Words are quoted, so FTS5 operators and punctuation in user input are
+    treated as text instead of query syntax.
+    """
+    terms = _SEARCH_TERM.findall(query)
+    if not terms:
+        return None
+    words = " AND ".join(f'"{term}"*' for term in terms)
+    return f'board : "b{board_id}" AND ({words})'
+
+
+def _encode_cursor(rank: float, pk: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([rank, pk]).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[float, int]:
+    try:
+        rank, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(rank), int(pk)
+    except (ValueError, TypeError):
+        raise ValueError("invalid search cursor") from None
+
+
+def search_cards(
+    username: str,
+    query: str,
+    limit: int = DEFAULT_SEARCH_LIMIT,
+    cursor: str | None = None,
+    path: Path | None = None,
+    board_id: int | None = None,
+) -> dict | None:
+    """Rank the user's cards against query, best match first.
+
+    Title matches weigh twice as much as details matches (bm25). Pages are
+    keyset-paginated on (rank, pk): pass the returned nextCursor to get the
+    next page; it is None on the last page. Returns None if the user has no
+    board and raises ValueError for a malformed cursor.
+    """
+    limit = max(1, min(limit, MAX_SEARCH_LIMIT))
+    after = _decode_cursor(cursor) if cursor else None
+    with _read_transaction(path) as conn:
+        board_id = _board_id(conn, username, board_id)
+        if board_id is None:
+            return None
+        expression = _search_expression(board_id, query)
+        if expression is None:
+            return {"results": [], "nextCursor": None}
+        sql = """
+            SELECT c.pk, c.id, c.column_id, c.title, c.details, m.rank
+            FROM (
+                SELECT rowid, bm25(cards_fts, 2.0, 1.0, 0.0) AS rank
+                FROM cards_fts WHERE cards_fts MATCH ?
+            ) AS m
+            JOIN cards AS c ON c.pk = m.rowid
+        """
+        params: list = [expression]
+        if after is not None:
+            sql += " WHERE m.rank > ? OR (m.rank = ? AND c.pk > ?)"
+            params += [after[0], after[0], after[1]]
+        sql += " ORDER BY m.rank, c.pk LIMIT ?"
+        rows = conn.execute(sql, (*params, limit + 1)).fetchall()
+
+    results = [
+        {
+            "id": row["id"],
+            "columnId": row["column_id"],
+            "title": row["title"],
+            "details": row["details"],
+            # bm25 is lower-is-better; flip it so clients can sort descending.
+            "score": round(-row["rank"], 6),
+        }
+        for row in rows[:limit]
+    ]
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = _encode_cursor(last["rank"], last["pk"])
+    return {"results": results, "nextCursor": next_cursor}
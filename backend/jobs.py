@@ -0,0 +1,212 @@
+"""In-process worker pool for background jobs stored in the jobs table.
+
+A job is submitted with a kind and a JSON request, and runs later on one of
+JOB_WORKERS asyncio workers, so an AI request survives the client going away
+and can take as long as it needs. Handlers are registered per kind:
+
+    async def handler(job: dict) -> tuple[dict, int | None]
+
+and return (result, board version the result was computed from).
+db.finish_job stores the result and applies its "board" in one transaction.
+
+Workers in every process share the table. db.claim_job hands each job to one
+worker under a lease that the worker renews while it runs, and enforces a
+per-user limit on running jobs. A worker that dies stops renewing, so its
+jobs are picked up again once the lease runs out.
+
+Status changes made in this process wake watch() queues right away; watchers
+re-read the job when woken, and every so often anyway to see changes made by
+other processes.
+"""
+
+import asyncio
+import logging
+import os
+import uuid
+from collections.abc import Awaitable, Callable
+
+from db import JOB_FINISHED, cancel_job, claim_job, create_job, finish_job, renew_job, run_db
+
+DEFAULT_WORKERS = 2
+DEFAULT_PER_USER_LIMIT = 1
+LEASE_SECONDS = 60.0
+POLL_INTERVAL = 1.0   # how often idle workers look for jobs queued by other processes
+MAX_ATTEMPTS = 3
+
+log = logging.getLogger(__name__)
+
+Handler = Callable[[dict], Awaitable[tuple[dict, int | None]]]
+
+
+class JobQueue:
+    def __init__(
+        self,
+        workers: int = DEFAULT_WORKERS,
+        per_user_limit: int = DEFAULT_PER_USER_LIMIT,
+        lease_seconds: float = LEASE_SECONDS,
+        poll_interval: float = POLL_INTERVAL,
+    ):
+        self.workers = workers
+        self.per_user_limit = per_user_limit
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.owner = uuid.uuid4().hex
+        self._handlers: dict[str, Handler] = {}
+        self._tasks: list[asyncio.Task] = []
+        self._running: dict[str, asyncio.Task] = {}
+        self._watchers: dict[str, set[asyncio.Queue]] = {}
+        self._wake: asyncio.Event | None = None
+        self._completed = 0
+        self._failed = 0
+        self._cancelled = 0
+
+    def add_handler(self, kind: str, handler: Handler) -> None:
+        self._handlers[kind] = handler
+
+    async def start(self) -> None:
+        self._wake = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def close(self) -> None:
+        """Stop the workers. Interrupted jobs are re-run once their lease expires."""
+        tasks = self._tasks + list(self._running.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        self._running.clear()
+        self._wake = None
+
+    async def submit(
+        self, username: str, kind: str, request: dict, board_id: int | None = None
+    ) -> dict | None:
+        """Queue a job and return it; None if the board does not exist."""
+        if kind not in self._handlers:
+            raise ValueError(f"unknown job kind {kind!r}")
+        job = await run_db(create_job, username, kind, request, board_id=board_id)
+        if job is not None and self._wake is not None:
+            self._wake.set()
+        return job
+
+    async def cancel(self, username: str, job_id: str) -> dict | None:
+        """Cancel a job, stopping it at once if a worker here is running it."""
+        job = await run_db(cancel_job, username, job_id)
+        if job is not None and job["status"] == "cancelled":
+            task = self._running.get(job_id)
+            if task is not None:
+                task.cancel()
+            self._notify(job_id)
+        return job
+
+    def watch(self, job_id: str) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._watchers.setdefault(job_id, set()).add(queue)
+        return queue
+
+    def unwatch(self, job_id: str, queue: asyncio.Queue) -> None:
+        watchers = self._watchers.get(job_id)
+        if watchers is not None:
+            watchers.discard(queue)
+            if not watchers:
+                del self._watchers[job_id]
+
+    def _notify(self, job_id: str) -> None:
+        for queue in self._watchers.get(job_id, ()):
+            queue.put_nowait(job_id)
+
+    async def _work(self) -> None:
+        while True:
+            job = None
+            try:
+                self._wake.clear()   # before claiming, so a submit during the claim is not missed
+                job = await run_db(
+                    claim_job, self.owner, self.lease_seconds, self.per_user_limit, MAX_ATTEMPTS
+                )
+                if job is None:
+                    try:
+                        await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+                    except TimeoutError:
+                        pass
+                    continue
+                self._notify(job["id"])
+                await self._run(job)
+            except Exception as e:
+                # Keep the worker alive; its job is failed here or, failing that,
+                # retried once its lease runs out.
+                log.exception("job worker error%s", f" in job {job['id']}" if job else "")
+                self._failed += 1
+                if job is not None:
+                    await self._abandon(job, e)
+                await asyncio.sleep(self.poll_interval)
+
+    async def _run(self, job: dict) -> None:
+        handler = self._handlers.get(job["kind"])
+        if handler is None:
+            await self._finish(job, error=f"unknown job kind {job['kind']!r}")
+            return
+        task = asyncio.create_task(handler(job))
+        self._running[job["id"]] = task
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=self.lease_seconds / 3)
+                if done:
+                    break
+                if not await run_db(renew_job, job["id"], self.owner, self.lease_seconds):
+                    task.cancel()   # cancelled elsewhere, or the lease was lost
+                    break
+            try:
+                result, base_version = await task
+            except asyncio.CancelledError:
+                if not task.cancelled():
+                    raise   # close() is stopping this worker
+                self._cancelled += 1
+                return
+            except Exception as e:
+                await self._finish(job, error=str(e) or type(e).__name__)
+                return
+            await self._finish(job, result=result, base_version=base_version)
+        finally:
+            self._running.pop(job["id"], None)
+
+    async def _finish(self, job: dict, **outcome) -> None:
+        finished = await run_db(finish_job, job["id"], self.owner, **outcome)
+        if finished is None:
+            self._cancelled += 1
+            return
+        if finished["status"] == "succeeded":
+            self._completed += 1
+        else:
+            self._failed += 1
+        self._notify(job["id"])
+
+    async def _abandon(self, job: dict, error: Exception) -> None:
+        try:
+            finished = await run_db(
+                finish_job, job["id"], self.owner, error=str(error) or type(error).__name__
+            )
+        except Exception:
+            log.exception("could not mark job %s failed", job["id"])
+            return
+        if finished is not None:
+            self._notify(job["id"])
+
+    def stats(self) -> dict:
+        return {
+            "workers": len(self._tasks),
+            "per_user_limit": self.per_user_limit,
+            "running": len(self._running),
+            "watchers": sum(len(w) for w in self._watchers.values()),
+            "completed": self._completed,
+            "failed": self._failed,
+            "cancelled": self._cancelled,
+        }
+
+
+def is_finished(job: dict) -> bool:
+    return job["status"] in JOB_FINISHED
+
+
+job_queue = JobQueue(
+    workers=int(os.environ.get("JOB_WORKERS", DEFAULT_WORKERS)),
+    per_user_limit=int(os.environ.get("JOB_USER_CONCURRENCY", DEFAULT_PER_USER_LIMIT)),
+)
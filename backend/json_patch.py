@@ -0,0 +1,126 @@
+"""Minimal RFC 6902 JSON Patch (with RFC 6901 JSON Pointer) for board documents."""
+
+import copy
+
+
+class PatchError(ValueError):
+    """The patch is malformed or does not fit the document."""
+
+
+class PatchTestFailed(PatchError):
+    """A "test" operation did not match the document."""
+
+
+def _tokens(pointer: str) -> list[str]:
+    if not isinstance(pointer, str):
+        raise PatchError(f"pointer must be a string, got {pointer!r}")
+    if pointer == "":
+        return []
+    if not pointer.startswith("/"):
+        raise PatchError(f"pointer must start with '/': {pointer!r}")
+    return [t.replace("~1", "/").replace("~0", "~") for t in pointer[1:].split("/")]
+
+
+def _index(container: list, token: str, *, append: bool = False) -> int:
+    if append and token == "-":
+        return len(container)
+    if not token.isdigit() or (token != "0" and token.startswith("0")):
+        raise PatchError(f"invalid array index {token!r}")
+    index = int(token)
+    limit = len(container) if append else len(container) - 1
+    if index > limit:
+        raise PatchError(f"array index {index} out of range")
+    return index
+
+
+def _get(doc, tokens: list[str]):
+    for token in tokens:
+        if isinstance(doc, dict):
+            if token not in doc:
+                raise PatchError(f"path segment {token!r} not found")
+            doc = doc[token]
+        elif isinstance(doc, list):
+            doc = doc[_index(doc, token)]
+        else:
+            raise PatchError(f"cannot descend into {type(doc).__name__} at {token!r}")
+    return doc
+
+
+def _add(doc, tokens: list[str], value):
+    if not tokens:
+        return value
+    parent = _get(doc, tokens[:-1])
+    key = tokens[-1]
+    if isinstance(parent, dict):
+        parent[key] = value
+    elif isinstance(parent, list):
+        parent.insert(_index(parent, key, append=True), value)
+    else:
+        raise PatchError(f"cannot add to {type(parent).__name__}")
+    return doc
+
+
+def _remove(doc, tokens: list[str]):
+    if not tokens:
+        raise PatchError("cannot remove the document root")
+    parent = _get(doc, tokens[:-1])
+    key = tokens[-1]
+    if isinstance(parent, dict):
+        if key not in parent:
+            raise PatchError(f"path segment {key!r} not found")
+        return parent.pop(key)
+    if isinstance(parent, list):
+        return parent.pop(_index(parent, key))
+    raise PatchError(f"cannot remove from {type(parent).__name__}")
+
+
+def _json_equal(a, b) -> bool:
+    # bool is an int subclass in Python but a distinct type in JSON.
+    if isinstance(a, bool) or isinstance(b, bool):
+        return type(a) is type(b) and a == b
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(_json_equal(a[k], b[k]) for k in a)
+    if isinstance(a, list) and isinstance(b, list):
+        return len(a) == len(b) and all(_json_equal(x, y) for x, y in zip(a, b))
+    return a == b
+
+
+def apply_patch(doc, patch: list[dict]):
+    """Return a patched copy of doc; the input is never modified.
+
+    Operations are applied in order and the whole patch fails on the first
+    bad operation, so callers either get a fully patched document or an error.
+    """
+    if not isinstance(patch, list):
+        raise PatchError("patch must be a list of operations")
+    doc = copy.deepcopy(doc)
+    for op in patch:
+        if not isinstance(op, dict):
+            raise PatchError(f"operation must be an object, got {op!r}")
+        name = op.get("op")
+        tokens = _tokens(op.get("path"))
+        if name in ("add", "replace", "test") and "value" not in op:
+            raise PatchError(f"{name!r} requires a value")
+        if name == "add":
+            doc = _add(doc, tokens, copy.deepcopy(op["value"]))
+        elif name == "remove":
+            _remove(doc, tokens)
+        elif name == "replace":
+            if tokens:
+                _remove(doc, tokens)
+            doc = _add(doc, tokens, copy.deepcopy(op["value"]))
+        elif name in ("move", "copy"):
+            source = _tokens(op.get("from"))
+            if name == "move":
+                if tokens[:len(source)] == source and len(tokens) > len(source):
+                    raise PatchError("cannot move a value into one of its children")
+                value = _remove(doc, source)
+            else:
+                value = copy.deepcopy(_get(doc, source))
+            doc = _add(doc, tokens, value)
+        elif name == "test":
+            if not _json_equal(_get(doc, tokens), op["value"]):
+                raise PatchTestFailed(f"test failed at {op['path']!r}")
+        else:
+            raise PatchError(f"unknown operation {name!r}")
+    return doc
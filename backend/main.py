@@ -1,31 +1,164 @@
+import asyncio
 import os
+import sys
 from contextlib import asynccontextmanager
+from dataclasses import dataclass
+
+if sys.version_info >= (3, 12):
+    from typing import NotRequired, TypedDict
+else:   # pydantic only accepts typing.TypedDict from 3.12 on
+    from typing_extensions import NotRequired, TypedDict
 
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
-from fastapi.staticfiles import StaticFiles
+from fastapi import (
+    APIRouter, Body, Depends, FastAPI, Header, HTTPException, Query, Response, WebSocket,
+    WebSocketDisconnect,
+)
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
+from starlette.requests import HTTPConnection, Request
 
-from ai import ai_chat, ai_query
-from db import get_board, init_db, set_board
+import jsonio
+from ai import ai_chat, ai_chat_stream, ai_query, close_clients
+from ai_cache import response_cache
+from board_cache import CachedBoard, board_cache
+from board_io import MEDIA_TYPES, ImportFormatError, board_outline, export_chunks, import_chunks
+from compression import (
+    MIN_SIZE as COMPRESS_MIN_SIZE, CompressionMiddleware, PrecompressedStaticFiles, negotiate,
+)
+from db import (
+    DEFAULT_PAGE_SIZE,
+    DEFAULT_RECENT_CARDS,
+    DEFAULT_SEARCH_LIMIT,
+    DEFAULT_USER,
+    MAX_PAGE_SIZE,
+    MAX_SEARCH_LIMIT,
+    VersionConflict,
+    add_write_listener,
+    close_executor,
+    close_pools,
+    create_board,
+    create_card,
+    delete_card,
+    get_board_stats,
+    get_board_version,
+    get_job,
+    get_revision,
+    get_versioned_board,
+    init_db,
+    list_boards,
+    list_jobs,
+    list_revisions,
+    patch_board,
+    pool_stats,
+    restore_revision,
+    run_db,
+    search_cards,
+    update_card,
+)
+from jobs import POLL_INTERVAL, is_finished, job_queue
+from json_patch import PatchError, PatchTestFailed
+from metrics import MetricsMiddleware, json_encode_seconds, payload_bytes, registry
+from profiler import profiler
+from pubsub import DEFAULT_SEND_TIMEOUT, LocalBroker, Subscription, board_events
+from write_buffer import write_buffer
 
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "..", ".env"))
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    init_db()
+    await run_db(init_db)
+    await board_events.start()
+    await job_queue.start()
     yield
+    await write_buffer.close()   # before the executor stops, so queued saves commit
+    await job_queue.close()
+    await board_events.close()
+    await close_clients()
+    close_executor()
+    close_pools()
+
+
+class JSONBytesResponse(JSONResponse):
+    """JSONResponse rendered by orjson."""
+
+    def render(self, content) -> bytes:
+        return jsonio.dumps(content)
+
 
+app = FastAPI(lifespan=lifespan, default_response_class=JSONBytesResponse)
+# Added first so it runs inside MetricsMiddleware, which records bytes as sent.
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(MetricsMiddleware)
 
-app = FastAPI(lifespan=lifespan)
+add_write_listener(board_cache.invalidate_board)
+add_write_listener(board_events.publish_threadsafe)
+# Without a shared broker, nothing tells this worker about other workers'
+# writes, so every cache hit is checked against the stored version.
+VERIFY_CACHED_BOARDS = isinstance(board_events.broker, LocalBroker)
+if not VERIFY_CACHED_BOARDS:
+    # Other workers' writes arrive only through the broker.
+    board_events.add_listener(board_cache.invalidate_board)
+
+WS_SEND_TIMEOUT = float(os.environ.get("WS_SEND_TIMEOUT", DEFAULT_SEND_TIMEOUT))
+
+registry.add_collector("pm_board_cache", board_cache.stats)
+registry.add_collector("pm_ai_cache", response_cache.stats)
+registry.add_collector("pm_db_pool", pool_stats)
+registry.add_collector("pm_board_events", board_events.stats)
+registry.add_collector("pm_jobs", job_queue.stats)
+registry.add_collector("pm_write_buffer", write_buffer.stats)
+if os.environ.get("PROFILER_ENABLED", "") == "1":
+    profiler.start()
 
 
 # --- models ---
 
-class BoardData(BaseModel):
-    columns: list
-    cards: dict
+# Board bodies are TypedDicts rather than BaseModels: validation yields plain
+# dicts that go straight to db.save_board, with no model objects to build and
+# no model_dump() copy afterwards.
+
+class Card(TypedDict):
+    id: str
+    title: str
+    details: NotRequired[str]
+
+
+class Column(TypedDict):
+    id: str
+    title: str
+    cardIds: list[str]
+
+
+class BoardData(TypedDict):
+    columns: list[Column]
+    cards: dict[str, Card]
+
+
+class NewBoard(BaseModel):
+    title: str = "Board"
+    board: BoardData | None = None
+
+
+class NewCard(BaseModel):
+    columnId: str
+    title: str
+    details: str = ""
+    id: str | None = None
+    index: int | None = None
+
+
+class CardPatch(BaseModel):
+    title: str | None = None
+    details: str | None = None
+    columnId: str | None = None
+    index: int | None = None
+
+
+class ProfilerControl(BaseModel):
+    action: str
+    interval: float | None = None
 
 
 class AITestRequest(BaseModel):
@@ -43,6 +176,11 @@ class ChatRequest(BaseModel):
     history: list[ChatMessage] = []
 
 
+class ChatJob(BaseModel):
+    message: str
+    history: list[ChatMessage] = []
+
+
 # --- API routes ---
 
 @app.get("/api/test")
@@ -50,27 +188,549 @@ async def test_api():
     return {"message": "API is working", "status": "success"}
 
 
-@app.get("/api/board")
-async def read_board():
-    data = get_board("user")
-    if data is None:
+def _etag(version: int) -> str:
+    return f'"{version}"'
+
+
+def _if_match_version(if_match: str | None) -> int | None:
+    """Board version named by an If-Match header; None for absent or "*"."""
+    if if_match is None or if_match.strip() == "*":
+        return None
+    tag = if_match.strip().removeprefix("W/").strip('"')
+    if not tag.isdigit():
+        raise HTTPException(status_code=400, detail="If-Match must be a board ETag")
+    return int(tag)
+
+
+def _conflict(e: VersionConflict) -> HTTPException:
+    return HTTPException(
+        status_code=409,
+        detail=f"Board has changed (now at version {e.current})",
+        headers={"ETag": _etag(e.current)},
+    )
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if if_none_match is None:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+def _cached_board_response(
+    entry: CachedBoard, if_none_match: str | None, accept_encoding: str | None = None
+) -> Response:
+    headers = {"ETag": entry.etag, "Vary": "Accept-Encoding"}
+    if _etag_matches(if_none_match, entry.etag):
+        return Response(status_code=304, headers=headers)
+    encoding = negotiate(accept_encoding) if len(entry.body) >= COMPRESS_MIN_SIZE else None
+    if encoding is None:
+        return Response(entry.body, media_type="application/json", headers=headers)
+    return Response(
+        entry.body_for(encoding), media_type="application/json",
+        headers={**headers, "Content-Encoding": encoding},
+    )
+
+
+# --- board routes ---
+#
+# Every board route is served twice: under /api/board for the user's first
+# board (what the frontend uses) and under /api/boards/{board_id} for any
+# board the user owns.
+
+@dataclass(frozen=True)
+class BoardRef:
+    username: str
+    board_id: int | None = None   # None: the user's first board
+
+    @property
+    def cache_key(self) -> str:
+        return f"{self.username}/{self.board_id or ''}"
+
+
+def current_user(x_user: str | None = Header(default=None)) -> str:
+    """The acting username from X-User, defaulting to the MVP's single user.
+
+    This is identification, not authentication: sign-in is still handled by
+    the frontend and nothing here checks credentials.
+    """
+    return x_user.strip() if x_user and x_user.strip() else DEFAULT_USER
+
+
+def board_ref(conn: HTTPConnection, username: str = Depends(current_user)) -> BoardRef:
+    raw = conn.path_params.get("board_id")
+    if raw is None:
+        return BoardRef(username)
+    if not raw.isdigit():
+        raise HTTPException(status_code=404, detail="Board not found")
+    return BoardRef(username, int(raw))
+
+
+board_routes = APIRouter()
+
+
+@board_routes.get("")
+async def read_board(
+    ref: BoardRef = Depends(board_ref),
+    if_none_match: str | None = Header(default=None),
+    accept_encoding: str | None = Header(default=None),
+):
+    cached = board_cache.get(ref.cache_key)
+    if cached is not None and VERIFY_CACHED_BOARDS:
+        current = await run_db(get_board_version, ref.username, board_id=ref.board_id)
+        if current != (cached.board_id, cached.version):
+            board_cache.invalidate_board(cached.board_id)
+            cached = None
+    if cached is not None:
+        return _cached_board_response(cached, if_none_match, accept_encoding)
+
+    ticket = board_cache.ticket()
+    result = await run_db(get_versioned_board, ref.username, board_id=ref.board_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Board not found")
+    data, version, board_id = result
+    with json_encode_seconds.time(payload="board"):
+        body = jsonio.dumps(data)
+    payload_bytes.observe(len(body), payload="board")
+    entry = CachedBoard(board_id, version, body)
+    board_cache.put(ref.cache_key, ticket, entry)
+    return _cached_board_response(entry, if_none_match, accept_encoding)
+
+
+@board_routes.put("", status_code=204)
+async def write_board(
+    body: BoardData,
+    response: Response,
+    ref: BoardRef = Depends(board_ref),
+    if_match: str | None = Header(default=None),
+):
+    try:
+        version = await write_buffer.save(
+            ref.username, body, _if_match_version(if_match), board_id=ref.board_id
+        )
+    except VersionConflict as e:
+        raise _conflict(e)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Board not found")
+    response.headers["ETag"] = _etag(version)
+
+
+@board_routes.patch("", status_code=204)
+async def patch_board_route(
+    response: Response,
+    patch: list[dict] = Body(...),
+    ref: BoardRef = Depends(board_ref),
+    if_match: str | None = Header(default=None),
+):
+    """Apply an RFC 6902 JSON Patch against the board version named in If-Match."""
+    expected = _if_match_version(if_match)
+    if expected is None:
+        raise HTTPException(status_code=428, detail="PATCH requires an If-Match board ETag")
+    try:
+        version = await run_db(
+            patch_board, ref.username, patch, expected, board_id=ref.board_id
+        )
+    except VersionConflict as e:
+        raise _conflict(e)
+    except PatchTestFailed as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except PatchError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if version is None:
+        raise HTTPException(status_code=404, detail="Board not found")
+    response.headers["ETag"] = _etag(version)
+
+
+@board_routes.get("/search")
+async def search_board(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(DEFAULT_SEARCH_LIMIT, ge=1, le=MAX_SEARCH_LIMIT),
+    cursor: str | None = None,
+    ref: BoardRef = Depends(board_ref),
+):
+    """Full-text search over card titles and details, best match first."""
+    try:
+        result = await run_db(
+            search_cards, ref.username, q, limit, cursor, board_id=ref.board_id
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=404, detail="Board not found")
+    return result
+
+
+@board_routes.get("/stats")
+async def read_board_stats(
+    response: Response,
+    recent: int = Query(DEFAULT_RECENT_CARDS, ge=0, le=MAX_PAGE_SIZE),
+    ref: BoardRef = Depends(board_ref),
+    if_none_match: str | None = Header(default=None),
+):
+    """Cards per column, recently updated cards and integrity findings."""
+    stats = await run_db(get_board_stats, ref.username, recent, board_id=ref.board_id)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="Board not found")
+    etag = _etag(stats["version"])
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return stats
+
+
+# --- history ---
+
+@board_routes.get("/history")
+async def read_history(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: int | None = Query(None, ge=1),
+    ref: BoardRef = Depends(board_ref),
+):
+    """Revisions newest first; pass nextCursor back as cursor for older ones."""
+    result = await run_db(list_revisions, ref.username, limit, cursor, board_id=ref.board_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Board not found")
+    return result
+
+
+@board_routes.get("/history/{version}")
+async def read_revision(version: int, ref: BoardRef = Depends(board_ref)):
+    board = await run_db(get_revision, ref.username, version, board_id=ref.board_id)
+    if board is None:
+        raise HTTPException(status_code=404, detail="Revision not found")
+    return JSONBytesResponse(board)
+
+
+@board_routes.post("/history/{version}/restore", status_code=204)
+async def restore_board(
+    version: int,
+    response: Response,
+    ref: BoardRef = Depends(board_ref),
+    if_match: str | None = Header(default=None),
+):
+    """Write the board as it was at version back as a new version."""
+    try:
+        new_version = await run_db(
+            restore_revision, ref.username, version, _if_match_version(if_match),
+            board_id=ref.board_id,
+        )
+    except VersionConflict as e:
+        raise _conflict(e)
+    if new_version is None:
+        raise HTTPException(status_code=404, detail="Revision not found")
+    response.headers["ETag"] = _etag(new_version)
+
+
+# --- bulk import / export ---
+
+@board_routes.get("/export")
+async def export_board(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    ref: BoardRef = Depends(board_ref),
+):
+    """Stream the board as NDJSON or CSV, a page of cards at a time."""
+    outline = await board_outline(ref.username, ref.board_id)
+    if outline is None:
         raise HTTPException(status_code=404, detail="Board not found")
-    return data
+    return StreamingResponse(
+        export_chunks(outline, format),
+        media_type=MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="board-{outline["id"]}.{format}"',
+            "ETag": _etag(outline["version"]),
+        },
+    )
 
 
-@app.put("/api/board", status_code=204)
-async def write_board(body: BoardData):
-    ok = set_board("user", body.model_dump())
-    if not ok:
+@board_routes.post("/import")
+async def import_board(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    mode: str = Query("append", pattern="^(append|replace)$"),
+    ref: BoardRef = Depends(board_ref),
+):
+    """Import NDJSON or CSV as it streams in, committing every IMPORT_BATCH_SIZE records.
+
+    append adds to the board and updates cards and columns with matching ids;
+    replace empties the board first. A malformed record stops the import with
+    422; batches before it stay committed and the error says how many.
+    """
+    outline = await board_outline(ref.username, ref.board_id)
+    if outline is None:
         raise HTTPException(status_code=404, detail="Board not found")
+    try:
+        result = await import_chunks(outline, request.stream(), format, mode == "replace")
+    except ImportFormatError as e:
+        raise HTTPException(
+            status_code=422, detail={"error": str(e), "line": e.line, "imported": e.imported}
+        )
+    return result
+
+
+# --- card routes (single-row mutations) ---
+
+@board_routes.post("/cards", status_code=201)
+async def add_card(body: NewCard, ref: BoardRef = Depends(board_ref)):
+    try:
+        card = await run_db(
+            create_card, ref.username, body.columnId, body.title, body.details,
+            card_id=body.id, index=body.index, board_id=ref.board_id,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if card is None:
+        raise HTTPException(status_code=404, detail="Column not found")
+    return card
+
+
+@board_routes.patch("/cards/{card_id}")
+async def edit_card(card_id: str, body: CardPatch, ref: BoardRef = Depends(board_ref)):
+    if body.index is not None and body.columnId is None:
+        raise HTTPException(status_code=422, detail="index requires columnId")
+    card = await run_db(
+        update_card, ref.username, card_id,
+        title=body.title, details=body.details, column_id=body.columnId, index=body.index,
+        board_id=ref.board_id,
+    )
+    if card is None:
+        raise HTTPException(status_code=404, detail="Card or column not found")
+    return card
+
+
+@board_routes.delete("/cards/{card_id}", status_code=204)
+async def remove_card(card_id: str, ref: BoardRef = Depends(board_ref)):
+    if not await run_db(delete_card, ref.username, card_id, board_id=ref.board_id):
+        raise HTTPException(status_code=404, detail="Card not found")
+
+
+# --- change events ---
+
+async def _send_events(websocket: WebSocket, subscription: Subscription, version: int) -> None:
+    await websocket.send_json(
+        {"type": "version", "boardId": subscription.board_id, "version": version}
+    )
+    while True:
+        event = await subscription.get()
+        if event["version"] <= version:
+            continue
+        version = event["version"]
+        try:
+            await asyncio.wait_for(websocket.send_json(event), WS_SEND_TIMEOUT)
+        except asyncio.TimeoutError:
+            await websocket.close(code=1013, reason="Client too slow")
+            return
+
+
+async def _wait_for_disconnect(websocket: WebSocket) -> None:
+    while (await websocket.receive())["type"] != "websocket.disconnect":
+        pass
+
+
+@board_routes.websocket("/events")
+async def board_events_socket(websocket: WebSocket, ref: BoardRef = Depends(board_ref)):
+    """Push {"type": "changed", "boardId", "version"} after every write to the board.
+
+    The first message is {"type": "version", ...} with the current version.
+    A client that falls behind gets one "resync" event for the newest version
+    instead of every missed one.
+    """
+    found = await run_db(get_board_version, ref.username, board_id=ref.board_id)
+    if found is None:
+        await websocket.close(code=1008, reason="Board not found")
+        return
+    subscription = board_events.subscribe(found[0])
+    try:
+        # Re-read after subscribing so no write can fall between the two.
+        current = await run_db(get_board_version, ref.username, board_id=found[0])
+        version = current[1] if current else found[1]
+        await websocket.accept()
+        tasks = {
+            asyncio.create_task(_send_events(websocket, subscription, version)),
+            asyncio.create_task(_wait_for_disconnect(websocket)),
+        }
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        for task in done:
+            error = task.exception()
+            if error is not None and not isinstance(error, WebSocketDisconnect):
+                raise error
+    finally:
+        board_events.unsubscribe(subscription)
+
+
+# --- AI jobs ---
+
+async def _chat_job(job: dict) -> tuple[dict, int]:
+    """Run a chat request against the board as stored when the job starts."""
+    result = await run_db(get_versioned_board, job["username"], board_id=job["boardId"])
+    if result is None:
+        raise ValueError("Board not found")
+    board, version, _ = result
+    request = job["request"]
+    return await ai_chat(board, request["message"], request["history"]), version
+
+
+job_queue.add_handler("chat", _chat_job)
+
+
+@board_routes.post("/jobs", status_code=202)
+async def submit_chat_job(body: ChatJob, response: Response, ref: BoardRef = Depends(board_ref)):
+    """Queue a chat request; its board edits are applied when the job finishes."""
+    job = await job_queue.submit(
+        ref.username, "chat",
+        {"message": body.message, "history": [m.model_dump() for m in body.history]},
+        board_id=ref.board_id,
+    )
+    if job is None:
+        raise HTTPException(status_code=404, detail="Board not found")
+    response.headers["Location"] = f"/api/jobs/{job['id']}"
+    return job
+
+
+app.include_router(board_routes, prefix="/api/board")
+app.include_router(board_routes, prefix="/api/boards/{board_id}")
+
+
+# --- board listing ---
+
+@app.get("/api/boards")
+async def read_boards(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: int | None = Query(None, ge=0),
+    username: str = Depends(current_user),
+):
+    """The user's boards in id order; pass nextCursor back as cursor for the next page."""
+    result = await run_db(list_boards, username, limit, cursor)
+    if result is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return result
+
+
+@app.post("/api/boards", status_code=201)
+async def add_board(body: NewBoard, username: str = Depends(current_user)):
+    return await run_db(create_board, username, body.title, body.board)
+
+
+@app.get("/api/jobs")
+async def read_jobs(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    username: str = Depends(current_user),
+):
+    return {"jobs": await run_db(list_jobs, username, limit)}
+
+
+@app.get("/api/jobs/{job_id}")
+async def read_job(job_id: str, username: str = Depends(current_user)):
+    job = await run_db(get_job, username, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.delete("/api/jobs/{job_id}")
+async def cancel_job_route(job_id: str, username: str = Depends(current_user)):
+    """Cancel a queued or running job; 409 if it already finished."""
+    job = await job_queue.cancel(username, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] != "cancelled":
+        raise HTTPException(status_code=409, detail=f"Job already {job['status']}")
+    return job
+
+
+async def _job_events(job: dict, username: str):
+    """SSE "job" events for every status change, ending once the job has finished."""
+    wake = job_queue.watch(job["id"])
+    try:
+        while True:
+            yield f"event: job\ndata: {jsonio.dumps(job).decode()}\n\n"
+            if is_finished(job):
+                return
+            status = job["status"]
+            while job["status"] == status:
+                try:
+                    await asyncio.wait_for(wake.get(), POLL_INTERVAL)
+                except TimeoutError:
+                    pass   # changes made by other worker processes are only seen by polling
+                latest = await run_db(get_job, username, job["id"])
+                if latest is None:
+                    return
+                job = latest
+    finally:
+        job_queue.unwatch(job["id"], wake)
+
+
+@app.get("/api/jobs/{job_id}/events")
+async def job_events(job_id: str, username: str = Depends(current_user)):
+    job = await run_db(get_job, username, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return StreamingResponse(
+        _job_events(job, username),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# --- monitoring ---
+
+@app.get("/api/metrics")
+async def read_metrics():
+    return {
+        "board_cache": board_cache.stats(),
+        "ai_cache": response_cache.stats(),
+        "db_pool": pool_stats(),
+        "board_events": board_events.stats(),
+        "jobs": job_queue.stats(),
+        "write_buffer": write_buffer.stats(),
+        "profiler": profiler.stats(),
+    }
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    return Response(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/api/debug/profiler")
+async def read_profile():
+    """Samples so far in collapsed-stack format, for flamegraph.pl or speedscope."""
+    return Response(profiler.collapsed(), media_type="text/plain")
+
+
+@app.post("/api/debug/profiler")
+async def control_profiler(body: ProfilerControl):
+    if body.action == "start":
+        if body.interval is not None and not 0.0005 <= body.interval <= 1:
+            raise HTTPException(status_code=422, detail="interval must be 0.0005-1 seconds")
+        profiler.start(body.interval)
+    elif body.action == "stop":
+        profiler.stop()
+    elif body.action == "reset":
+        profiler.reset()
+    else:
+        raise HTTPException(status_code=422, detail="action must be start, stop or reset")
+    return profiler.stats()
 
 
 # --- AI routes ---
 
+def _cache_options(cache_control: str | None) -> dict:
+    """How a request uses the AI response cache, from its Cache-Control header.
+
+    no-cache skips the cached reply but caches the fresh one; no-store also
+    keeps the reply out of the cache, memory and persisted alike.
+    """
+    directives = {d.strip().lower() for d in (cache_control or "").split(",")}
+    store = "no-store" not in directives
+    return {"use_cache": store and "no-cache" not in directives, "store": store}
+
+
 @app.post("/api/ai/test")
-async def ai_test(body: AITestRequest):
+async def ai_test(body: AITestRequest, cache_control: str | None = Header(default=None)):
     try:
-        result = ai_query(body.prompt)
+        result = await ai_query(body.prompt, **_cache_options(cache_control))
         return {"response": result}
     except ValueError as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -79,10 +739,12 @@ async def ai_test(body: AITestRequest):
 
 
 @app.post("/api/ai/chat")
-async def ai_chat_route(body: ChatRequest):
+async def ai_chat_route(body: ChatRequest, cache_control: str | None = Header(default=None)):
     try:
         history = [m.model_dump() for m in body.history]
-        result = ai_chat(body.board, body.message, history)
+        result = await ai_chat(
+            body.board, body.message, history, **_cache_options(cache_control)
+        )
         return result
     except ValueError as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -90,7 +752,34 @@ async def ai_chat_route(body: ChatRequest):
         raise HTTPException(status_code=502, detail="AI service unavailable")
 
 
+async def _sse(events):
+    """Format chat events as Server-Sent Events, ending with an error event on failure."""
+    try:
+        async for event in events:
+            yield f"event: {event['event']}\ndata: {jsonio.dumps(event['data']).decode()}\n\n"
+    except Exception:
+        yield 'event: error\ndata: {"detail": "AI service unavailable"}\n\n'
+
+
+@app.post("/api/ai/chat/stream")
+async def ai_chat_stream_route(body: ChatRequest, cache_control: str | None = Header(default=None)):
+    try:
+        history = [m.model_dump() for m in body.history]
+        events = await ai_chat_stream(
+            body.board, body.message, history, **_cache_options(cache_control)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    except Exception:
+        raise HTTPException(status_code=502, detail="AI service unavailable")
+    return StreamingResponse(
+        _sse(events),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # --- static files (frontend) ---
 
 if os.path.isdir("frontend_out"):
-    app.mount("/", StaticFiles(directory="frontend_out", html=True), name="static")
+    app.mount("/", PrecompressedStaticFiles(directory="frontend_out", html=True), name="static")
@@ -0,0 +1,268 @@
+"""Counters and histograms rendered in the Prometheus text format at GET /metrics.
+
+A small registry instead of prometheus_client: the app runs one process per
+container and needs only counters, histograms and a few gauges read from the
+existing stats() methods. Metric objects are module globals defined here, so
+reloading main (as the tests do) never registers a metric twice.
+"""
+
+import bisect
+import math
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.kind}"
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def render(self) -> Iterator[str]:
+        yield from super().render()
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets) + (math.inf,)
+        # label values -> [per-bucket counts, sum, count]
+        self._series: dict[tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return series[2] if series else 0
+
+    def render(self) -> Iterator[str]:
+        yield from super().render()
+        with self._lock:
+            series = sorted((key, [list(s[0]), s[1], s[2]]) for key, s in self._series.items())
+        for key, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = f'le="{_number(bound)}"'
+                yield f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.labelnames, key)} {count}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+        self._collectors: dict[str, Callable[[], dict]] = {}
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(
+        self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets=LATENCY_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def add_collector(self, prefix: str, stats: Callable[[], dict]) -> None:
+        """Export every numeric value of stats() as a gauge named <prefix>_<key>."""
+        self._collectors[prefix] = stats
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for prefix, stats in self._collectors.items():
+            for key, value in stats().items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                name = f"{prefix}_{key}"
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_request_seconds = registry.histogram(
+    "pm_http_request_seconds", "HTTP request latency by route template.",
+    ("method", "route", "status"),
+)
+http_response_bytes = registry.histogram(
+    "pm_http_response_bytes", "HTTP response body size by route template.",
+    ("method", "route"), SIZE_BUCKETS,
+)
+db_call_seconds = registry.histogram(
+    "pm_db_call_seconds", "Time spent running one db.py call on the DB executor.", ("call",),
+)
+db_queue_seconds = registry.histogram(
+    "pm_db_queue_seconds", "Time a db.py call waited for a DB executor thread.",
+)
+db_call_errors = registry.counter(
+    "pm_db_call_errors_total", "db.py calls that raised.", ("call",),
+)
+board_write_batch_seconds = registry.histogram(
+    "pm_board_write_batch_seconds", "Time to commit one batch of coalesced board saves.",
+)
+board_write_batch_size = registry.histogram(
+    "pm_board_write_batch_size", "Board saves committed together in one transaction.", (),
+    (1, 2, 4, 8, 16, 32, 64, 128),
+)
+json_encode_seconds = registry.histogram(
+    "pm_json_encode_seconds", "Time spent serializing payloads to JSON.", ("payload",),
+)
+payload_bytes = registry.histogram(
+    "pm_payload_bytes", "Size of serialized payloads.", ("payload",), SIZE_BUCKETS,
+)
+ai_request_seconds = registry.histogram(
+    "pm_ai_request_seconds", "LLM request latency; for streams, until the response starts.",
+    ("kind", "outcome"),
+)
+ai_stream_seconds = registry.histogram(
+    "pm_ai_stream_seconds", "Time from a streamed LLM response starting to its last chunk.",
+)
+ai_retries = registry.counter("pm_ai_retries_total", "LLM requests retried after 429/5xx.")
+ai_tokens = registry.counter(
+    "pm_ai_tokens_total", "Tokens reported by the LLM provider.", ("type",),
+)
+ai_prompt_tokens = registry.histogram(
+    "pm_ai_prompt_estimated_tokens", "Estimated size of each chat prompt sent.", (), TOKEN_BUCKETS,
+)
+
+
+def route_template(scope) -> str:
+    """The matched route with its path parameters put back, e.g. /api/boards/{board_id}.
+
+    Built from the request path and its path_params rather than router
+    internals, so routers mounted under several prefixes label correctly.
+    Requests that matched no route share one label.
+    """
+    if "endpoint" not in scope:
+        return "other"
+    params = list((scope.get("path_params") or {}).items())
+    segments = scope["path"].split("/")
+    # Parameters usually sit at the end, so match from the right: a literal
+    # segment that happens to equal a parameter value is left alone.
+    for n in range(len(segments) - 1, -1, -1):
+        if params and segments[n] == str(params[-1][1]):
+            segments[n] = "{" + params.pop()[0] + "}"
+    return "/".join(segments)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and response size per route template.
+
+    Routes are labelled by their template ("/api/boards/{board_id}"), not the
+    raw path, so label cardinality stays fixed however many boards exist.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def send_and_measure(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_and_measure)
+        finally:
+            route = route_template(scope)
+            method = scope["method"]
+            http_request_seconds.observe(
+                time.perf_counter() - started, method=method, route=route, status=str(status)
+            )
+            http_response_bytes.observe(size, method=method, route=route)
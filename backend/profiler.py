@@ -0,0 +1,99 @@
+"""A sampling profiler that can be switched on and off while the app runs.
+
+While running, a background thread snapshots every other thread's Python
+stack each interval and counts identical stacks. collapsed() returns them in
+the "collapsed stack" format read by flamegraph.pl and speedscope:
+
+    main.py:read_board;db.py:get_versioned_board;db.py:_read_board 42
+
+Sampling costs one sys._current_frames() call per interval and nothing at all
+while stopped, so it is safe to leave the hooks in production builds.
+"""
+
+import os
+import sys
+import threading
+import time
+
+DEFAULT_INTERVAL = 0.005
+MAX_STACKS = 20000
+MAX_DEPTH = 64
+
+
+def _stack(frame) -> str:
+    names = []
+    while frame is not None and len(names) < MAX_DEPTH:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class SamplingProfiler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._counts: dict[str, int] = {}
+        self._samples = 0
+        self._dropped = 0
+        self.interval = DEFAULT_INTERVAL
+        self.started_at: float | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval: float | None = None) -> None:
+        with self._lock:
+            if self.running:
+                return
+            self.interval = interval or DEFAULT_INTERVAL
+            self._stop.clear()
+            self.started_at = time.time()
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts.clear()
+            self._samples = 0
+            self._dropped = 0
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            stacks = [_stack(frame) for ident, frame in frames.items() if ident != me]
+            with self._lock:
+                self._samples += 1
+                for stack in stacks:
+                    if stack in self._counts or len(self._counts) < MAX_STACKS:
+                        self._counts[stack] = self._counts.get(stack, 0) + 1
+                    else:
+                        self._dropped += 1
+
+    def collapsed(self) -> str:
+        with self._lock:
+            counts = sorted(self._counts.items(), key=lambda item: -item[1])
+        return "".join(f"{stack} {count}\n" for stack, count in counts)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "running": self.running,
+                "interval": self.interval,
+                "samples": self._samples,
+                "stacks": len(self._counts),
+                "dropped": self._dropped,
+            }
+
+
+profiler = SamplingProfiler()
@@ -0,0 +1,201 @@
+"""Token-budgeted prompt construction for board chat.
+
+Token counts are estimated at ~4 characters per token, which is close enough
+for budgeting without shipping a tokenizer for every model behind OpenRouter.
+"""
+
+import json
+import math
+import os
+import re
+from dataclasses import dataclass
+
+DEFAULT_TOKEN_BUDGET = 8000
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4   # role and framing tokens added per chat message
+BOARD_SHARE = 0.6             # of the budget left after the system prompt and new message
+SUMMARY_TOKENS = 200          # cap on the summary of turns dropped from history
+SUMMARY_SNIPPET_CHARS = 80
+
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do for from how i in is it me my of on or "
+    "please the to what which with you your".split()
+)
+
+
+def token_budget() -> int:
+    return int(os.environ.get("AI_PROMPT_TOKEN_BUDGET", DEFAULT_TOKEN_BUDGET))
+
+
+def count_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def message_tokens(message: dict) -> int:
+    return count_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+def compact_json(value) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _terms(text: str) -> set[str]:
+    return {w for w in _WORD.findall(text.lower()) if w not in _STOPWORDS and len(w) > 1}
+
+
+def relevant_board(board: dict, message: str, max_tokens: int) -> tuple[dict, int]:
+    """Shrink board to fit max_tokens, keeping the cards most relevant to message.
+
+    Every column is kept (with cardIds narrowed to the included cards) so the
+    model still sees the board's structure. Cards are ranked by how many of
+    the message's words appear in their title (weighted double) and details;
+    ties keep board order. Returns the board to send and the number of cards
+    left out.
+    """
+    if count_tokens(compact_json(board)) <= max_tokens:
+        return board, 0
+
+    cards = board.get("cards", {})
+    order = list(dict.fromkeys(
+        [cid for col in board.get("columns", []) for cid in col.get("cardIds", []) if cid in cards]
+        + list(cards)
+    ))
+    rank = {cid: n for n, cid in enumerate(order)}
+    wanted = _terms(message)
+
+    def score(card_id: str) -> int:
+        card = cards[card_id]
+        return (2 * len(wanted & _terms(str(card.get("title", ""))))
+                + len(wanted & _terms(str(card.get("details", "")))))
+
+    skeleton = {
+        "columns": [{**col, "cardIds": []} for col in board.get("columns", [])],
+        "cards": {},
+    }
+    used = count_tokens(compact_json(skeleton))
+    chosen: set[str] = set()
+    for card_id in sorted(order, key=lambda cid: (-score(cid), rank[cid])):
+        # Each card costs its JSON plus its id once more in a cardIds list.
+        cost = count_tokens(compact_json({card_id: cards[card_id]}) + compact_json(card_id)) + 1
+        if used + cost > max_tokens:
+            continue
+        chosen.add(card_id)
+        used += cost
+
+    subset = {
+        "columns": [
+            {**col, "cardIds": [cid for cid in col.get("cardIds", []) if cid in chosen]}
+            for col in board.get("columns", [])
+        ],
+        "cards": {cid: cards[cid] for cid in order if cid in chosen},
+    }
+    return subset, len(cards) - len(chosen)
+
+
+def restore_omitted(original: dict, sent: dict, returned: dict) -> dict:
+    """Put cards the model never saw back into a board it returned.
+
+    Hidden cards keep their data and go back into their original column (if
+    it still exists) at their original index, so a trimmed prompt cannot
+    delete cards by leaving them out of the reply.
+    """
+    hidden = {cid: card for cid, card in original.get("cards", {}).items() if cid not in sent.get("cards", {})}
+    if not hidden:
+        return returned
+    merged = {
+        "columns": [dict(col, cardIds=list(col.get("cardIds", []))) for col in returned.get("columns", [])],
+        "cards": {**returned.get("cards", {}), **hidden},
+    }
+    targets = {col["id"]: col for col in merged["columns"] if "id" in col}
+    for col in original.get("columns", []):
+        target = targets.get(col.get("id"))
+        if target is None:
+            continue
+        for index, cid in enumerate(col.get("cardIds", [])):
+            if cid in hidden:
+                target["cardIds"].insert(min(index, len(target["cardIds"])), cid)
+    return merged
+
+
+def _summarize(turns: list[dict], max_tokens: int) -> str:
+    """One line per dropped user turn, oldest first, trimmed to max_tokens."""
+    lines = []
+    for turn in turns:
+        if turn["role"] != "user":
+            continue
+        text = " ".join(turn["content"].split())
+        if len(text) > SUMMARY_SNIPPET_CHARS:
+            text = text[:SUMMARY_SNIPPET_CHARS - 1] + "…"
+        lines.append(f"- {text}")
+    while lines and count_tokens("\n".join(lines)) > max_tokens:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+@dataclass
+class ChatPrompt:
+    messages: list[dict]
+    board: dict           # the (possibly trimmed) board the model was shown
+    tokens: int
+    cards_omitted: int
+    turns_dropped: int
+
+
+def build_chat_prompt(
+    system: str,
+    board: dict,
+    message: str,
+    history: list[dict],
+    budget: int | None = None,
+) -> ChatPrompt:
+    """Assemble system + history + message within a token budget.
+
+    The system prompt and the new message are always sent. The board (as
+    compact JSON) gets up to BOARD_SHARE of what is left, then the most recent
+    history turns fill the rest. Older turns that do not fit are replaced by a
+    short summary of what the user asked in them.
+    """
+    budget = token_budget() if budget is None else budget
+    user_message = {"role": "user", "content": message}
+    fixed = count_tokens(system) + MESSAGE_OVERHEAD_TOKENS + message_tokens(user_message)
+    available = max(budget - fixed, 0)
+
+    board_sent, cards_omitted = relevant_board(board, message, int(available * BOARD_SHARE))
+    board_context = f"\n\nCurrent board:\n{compact_json(board_sent)}"
+    if cards_omitted:
+        board_context += (
+            f"\n({cards_omitted} of {len(board.get('cards', {}))} cards are omitted to save "
+            "space. They are kept as they are; return only the cards shown here.)"
+        )
+    available -= count_tokens(board_context)
+
+    turns = [{"role": turn["role"], "content": turn["content"]} for turn in history]
+    if sum(message_tokens(turn) for turn in turns) <= available:
+        kept = turns
+    else:
+        kept = []
+        room = available - SUMMARY_TOKENS
+        for turn in reversed(turns):
+            cost = message_tokens(turn)
+            if cost > room:
+                break
+            kept.insert(0, turn)
+            room -= cost
+    available -= sum(message_tokens(turn) for turn in kept)
+    dropped = turns[:len(turns) - len(kept)]
+
+    system_content = system + board_context
+    if dropped:
+        summary = _summarize(dropped, min(SUMMARY_TOKENS, max(available, 0)))
+        if summary:
+            system_content += f"\n\nEarlier in this conversation the user asked:\n{summary}"
+
+    messages = [{"role": "system", "content": system_content}, *kept, user_message]
+    return ChatPrompt(
+        messages=messages,
+        board=board_sent,
+        tokens=sum(message_tokens(m) for m in messages),
+        cards_omitted=cards_omitted,
+        turns_dropped=len(dropped),
+    )
@@ -0,0 +1,286 @@
+"""Board change events fanned out to WebSocket subscribers.
+
+Every committed board write (db.add_write_listener) is published as
+
+    {"type": "changed", "boardId": 1, "version": 7}
+
+through a broker, and every worker delivers what the broker hands back to its
+own subscribers. LocalBroker (the default) loops events straight back inside
+one process. RedisBroker uses Redis PUBLISH/SUBSCRIBE, so writes made by one
+uvicorn worker reach clients connected to any other; it speaks RESP directly,
+so any Redis-compatible server works and no client library is needed.
+Set PUBSUB_URL=redis://host:port to use it.
+
+Each subscriber has a bounded send buffer. Events only carry versions, so a
+client that falls behind loses nothing by skipping ahead: on overflow its
+buffer is replaced by a single "resync" event for the newest version.
+"""
+
+import asyncio
+import json
+import os
+import threading
+from collections.abc import Callable
+from urllib.parse import unquote, urlparse
+
+DEFAULT_BUFFER_SIZE = 64
+DEFAULT_SEND_TIMEOUT = 5.0   # a client that cannot take one event this fast is dropped
+DEFAULT_CHANNEL = "pm:board-events"
+RECONNECT_MAX_SECONDS = 5.0
+
+Handler = Callable[[dict], None]
+
+
+class LocalBroker:
+    """In-process broker: publish() hands the event straight to the handler."""
+
+    def __init__(self):
+        self._handler: Handler | None = None
+
+    async def start(self, handler: Handler) -> None:
+        self._handler = handler
+
+    async def publish(self, event: dict) -> None:
+        if self._handler is not None:
+            self._handler(event)
+
+    async def close(self) -> None:
+        self._handler = None
+
+
+# --- Redis ---
+
+def _encode_command(*args: str | bytes) -> bytes:
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        data = arg.encode() if isinstance(arg, str) else arg
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+
+async def _read_reply(reader: asyncio.StreamReader):
+    """Read one RESP2 reply; error replies raise ConnectionError."""
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("connection closed by server")
+    kind, body = line[:1], line[1:-2]
+    if kind == b"+":
+        return body.decode()
+    if kind == b"-":
+        raise ConnectionError(body.decode())
+    if kind == b":":
+        return int(body)
+    if kind == b"$":
+        size = int(body)
+        if size < 0:
+            return None
+        data = await reader.readexactly(size + 2)
+        return data[:-2]
+    if kind == b"*":
+        size = int(body)
+        return None if size < 0 else [await _read_reply(reader) for _ in range(size)]
+    raise ConnectionError(f"unexpected reply {line!r}")
+
+
+class RedisBroker:
+    """Publishes to and subscribes on one Redis channel shared by all workers."""
+
+    def __init__(self, url: str, channel: str = DEFAULT_CHANNEL):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.ssl = parsed.scheme == "rediss"
+        self.channel = channel
+        self._publisher: tuple[asyncio.StreamReader, asyncio.StreamWriter] | None = None
+        self._publish_lock = asyncio.Lock()
+        self._listener: asyncio.Task | None = None
+        self._subscribed = asyncio.Event()
+
+    async def _connect(self) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        reader, writer = await asyncio.open_connection(self.host, self.port, ssl=self.ssl or None)
+        if self.password:
+            writer.write(_encode_command("AUTH", self.password))
+            await writer.drain()
+            await _read_reply(reader)
+        return reader, writer
+
+    async def start(self, handler: Handler) -> None:
+        self._subscribed.clear()
+        self._listener = asyncio.create_task(self._listen(handler))
+        await self._subscribed.wait()
+
+    async def _listen(self, handler: Handler) -> None:
+        """Hold the SUBSCRIBE connection open, reconnecting with backoff."""
+        delay = 0.1
+        while True:
+            writer = None
+            try:
+                reader, writer = await self._connect()
+                writer.write(_encode_command("SUBSCRIBE", self.channel))
+                await writer.drain()
+                await _read_reply(reader)  # subscribe confirmation
+                self._subscribed.set()
+                delay = 0.1
+                while True:
+                    reply = await _read_reply(reader)
+                    if isinstance(reply, list) and len(reply) == 3 and reply[0] == b"message":
+                        handler(json.loads(reply[2]))
+            except asyncio.CancelledError:
+                raise
+            except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError):
+                self._subscribed.set()  # let start() return even if Redis is down
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RECONNECT_MAX_SECONDS)
+            finally:
+                if writer is not None:
+                    writer.close()
+
+    async def publish(self, event: dict) -> None:
+        payload = json.dumps(event, separators=(",", ":"))
+        async with self._publish_lock:
+            for attempt in range(2):
+                try:
+                    if self._publisher is None:
+                        self._publisher = await self._connect()
+                    reader, writer = self._publisher
+                    writer.write(_encode_command("PUBLISH", self.channel, payload))
+                    await writer.drain()
+                    await _read_reply(reader)
+                    return
+                except (OSError, ConnectionError, asyncio.IncompleteReadError):
+                    self._drop_publisher()
+                    if attempt:
+                        raise
+
+    def _drop_publisher(self) -> None:
+        if self._publisher is not None:
+            self._publisher[1].close()
+            self._publisher = None
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        self._drop_publisher()
+
+
+def broker_from_env() -> LocalBroker | RedisBroker:
+    url = os.environ.get("PUBSUB_URL", "")
+    if url.startswith(("redis://", "rediss://")):
+        return RedisBroker(url, os.environ.get("PUBSUB_CHANNEL", DEFAULT_CHANNEL))
+    return LocalBroker()
+
+
+# --- subscribers ---
+
+class Subscription:
+    """One client's bounded send buffer for one board."""
+
+    def __init__(self, board_id: int, buffer_size: int):
+        self.board_id = board_id
+        self.queue: asyncio.Queue[dict] = asyncio.Queue(maxsize=buffer_size)
+        self.overflows = 0
+
+    def offer(self, event: dict) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Everything buffered is older than event; replace it with one resync.
+            self.overflows += 1
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({**event, "type": "resync"})
+
+    async def get(self) -> dict:
+        return await self.queue.get()
+
+
+class BoardHub:
+    """Routes broker events to the subscriptions for each board."""
+
+    def __init__(self, broker: LocalBroker | RedisBroker, buffer_size: int = DEFAULT_BUFFER_SIZE):
+        self.broker = broker
+        self.buffer_size = buffer_size
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._subscriptions: dict[int, set[Subscription]] = {}
+        self._listeners: list[Callable[[int, int], None]] = []
+        self._lock = threading.Lock()
+        self._published = 0
+        self._delivered = 0
+        self._publish_errors = 0
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        await self.broker.start(self._deliver)
+
+    async def close(self) -> None:
+        await self.broker.close()
+        self._loop = None
+
+    def add_listener(self, fn: Callable[[int, int], None]) -> None:
+        """Call fn(board_id, version) for every event, including other workers' writes."""
+        if fn not in self._listeners:
+            self._listeners.append(fn)
+
+    def subscribe(self, board_id: int) -> Subscription:
+        subscription = Subscription(board_id, self.buffer_size)
+        with self._lock:
+            self._subscriptions.setdefault(board_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.board_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.board_id]
+
+    def publish_threadsafe(self, board_id: int, version: int) -> None:
+        """db write-listener: schedule a publish from whatever thread committed."""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        event = {"type": "changed", "boardId": board_id, "version": version}
+        loop.call_soon_threadsafe(lambda: asyncio.ensure_future(self.publish(event)))
+
+    async def publish(self, event: dict) -> None:
+        self._published += 1
+        try:
+            await self.broker.publish(event)
+        except (OSError, ConnectionError):
+            self._publish_errors += 1
+
+    def _deliver(self, event: dict) -> None:
+        board_id, version = event["boardId"], event["version"]
+        for listener in list(self._listeners):
+            listener(board_id, version)
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(board_id, ()))
+        for subscription in subscriptions:
+            subscription.offer(event)
+        self._delivered += len(subscriptions)
+
+    def stats(self) -> dict:
+        with self._lock:
+            subscriptions = [s for subs in self._subscriptions.values() for s in subs]
+        return {
+            "broker": type(self.broker).__name__,
+            "boards": len({s.board_id for s in subscriptions}),
+            "subscribers": len(subscriptions),
+            "published": self._published,
+            "delivered": self._delivered,
+            "publish_errors": self._publish_errors,
+            "overflows": sum(s.overflows for s in subscriptions),
+        }
+
+
+board_events = BoardHub(
+    broker_from_env(),
+    int(os.environ.get("WS_SEND_BUFFER", DEFAULT_BUFFER_SIZE)),
+)
@@ -0,0 +1,21 @@
+import pytest
+
+import db
+
+
+@pytest.fixture(autouse=True)
+def _empty_ai_cache():
+    """AI replies cached by one test must not answer another test's request."""
+    from ai_cache import response_cache
+    response_cache.clear()
+    yield
+    response_cache.clear()
+
+
+@pytest.fixture
+def path(tmp_path, monkeypatch):
+    """A freshly initialized database, also made the default for db calls."""
+    path = tmp_path / "test.db"
+    monkeypatch.setattr(db, "DB_PATH", path)
+    db.init_db(path)
+    return path
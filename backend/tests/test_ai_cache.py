@@ -0,0 +1,111 @@
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import ai as ai_module
+from ai_cache import ResponseCache, cache_key
+
+
+def _reply(text):
+    response = MagicMock()
+    response.choices[0].message.content = text
+    return response
+
+
+def test_cache_key_normalizes_whitespace_and_tracks_board():
+    messages = [{"role": "user", "content": "summarize  my board\n"}]
+    same = [{"role": "User", "content": "summarize my board"}]
+    board = {"columns": [], "cards": {}}
+    assert cache_key("m", messages, board) == cache_key("m", same, dict(board))
+    assert cache_key("m", messages, board) != cache_key("other", messages, board)
+    assert cache_key("m", messages, board) != cache_key("m", messages, {"columns": [1], "cards": {}})
+
+
+def test_lru_eviction_and_ttl_expiry():
+    async def scenario():
+        cache = ResponseCache(max_entries=2, ttl=60)
+        await cache.put("a", 1)
+        await cache.put("b", 2)
+        await cache.get("a")
+        await cache.put("c", 3)
+        assert await cache.get("b") is None
+        assert await cache.get("a") == 1
+
+        with patch("ai_cache.time.time", return_value=time.time() + 61):
+            assert await cache.get("a") is None
+        return cache.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["evictions"] == 1
+    assert stats["expirations"] == 1
+    assert stats["hits"] == 2
+
+
+def test_persisted_entries_survive_a_new_cache(tmp_path):
+    import db as db_module
+    old_path = db_module.DB_PATH
+    db_module.DB_PATH = tmp_path / "cache.db"
+    db_module.init_db()
+    try:
+        async def scenario():
+            await ResponseCache(persist=True).put("k", {"response": "hi"})
+            fresh = ResponseCache(persist=True)
+            return await fresh.get("k"), fresh.stats()
+
+        value, stats = asyncio.run(scenario())
+    finally:
+        db_module.DB_PATH = old_path
+    assert value == {"response": "hi"}
+    assert stats["persisted_hits"] == 1
+
+
+def test_ai_query_is_cached_unless_opted_out(monkeypatch):
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test-key")
+    client = MagicMock()
+    client.chat.completions.create = AsyncMock(return_value=_reply("4"))
+
+    async def scenario():
+        first = await ai_module.ai_query("2+2")
+        second = await ai_module.ai_query("2+2")
+        third = await ai_module.ai_query("2+2", use_cache=False)
+        return first, second, third
+
+    with patch.object(ai_module, "get_client", return_value=client):
+        assert asyncio.run(scenario()) == ("4", "4", "4")
+    assert client.chat.completions.create.await_count == 2
+
+
+def test_ai_chat_cache_misses_when_board_changes(monkeypatch):
+    client = MagicMock()
+    client.chat.completions.create = AsyncMock(return_value=_reply('{"response": "ok", "operations": []}'))
+    board = {"columns": [{"id": "c", "title": "C", "cardIds": []}], "cards": {}}
+    changed = {"columns": [{"id": "c", "title": "Renamed", "cardIds": []}], "cards": {}}
+
+    async def scenario():
+        await ai_module.ai_chat(board, "summarize my board", [])
+        await ai_module.ai_chat(board, "summarize my board", [])
+        await ai_module.ai_chat(changed, "summarize my board", [])
+
+    with patch.object(ai_module, "get_client", return_value=client):
+        asyncio.run(scenario())
+    assert client.chat.completions.create.await_count == 2
+
+
+
+def test_no_store_replies_are_not_cached(monkeypatch):
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test-key")
+    client = MagicMock()
+    client.chat.completions.create = AsyncMock(return_value=_reply('{"response": "ok", "operations": []}'))
+    board = {"columns": [{"id": "c", "title": "C", "cardIds": []}], "cards": {}}
+
+    async def scenario():
+        await ai_module.ai_query("2+2", use_cache=False, store=False)
+        await ai_module.ai_chat(board, "summarize my board", [], use_cache=False, store=False)
+        hits = ai_module.response_cache.stats()["hits"]
+        await ai_module.ai_query("2+2")
+        await ai_module.ai_chat(board, "summarize my board", [])
+        return ai_module.response_cache.stats()["hits"] - hits
+
+    with patch.object(ai_module, "get_client", return_value=client):
+        assert asyncio.run(scenario()) == 0
+    assert client.chat.completions.create.await_count == 4
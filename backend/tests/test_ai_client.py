@@ -0,0 +1,157 @@
+"""ai.py's shared client, retries and concurrency limit against a local stub server."""
+
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import ai as ai_module
+
+
+class _StubLLM(ThreadingHTTPServer):
+    """Answers /chat/completions; fails the first `failures` calls with `status`."""
+
+    def __init__(self, failures=0, status=429, delay=0.0):
+        super().__init__(("127.0.0.1", 0), _StubHandler)
+        self.failures = failures
+        self.status = status
+        self.delay = delay
+        self.calls = 0
+        self.ports: set[int] = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse is observable
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        self.rfile.read(int(self.headers["Content-Length"]))
+        with server.lock:
+            server.calls += 1
+            call = server.calls
+            server.ports.add(self.client_address[1])
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        time.sleep(server.delay)
+        with server.lock:
+            server.in_flight -= 1
+        if call <= server.failures:
+            body, status = {"error": {"message": "slow down"}}, server.status
+        else:
+            body, status = {
+                "id": "x", "object": "chat.completion", "created": 0, "model": "m",
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": f"answer {call}"}}],
+            }, 200
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    servers = []
+
+    def start(**kwargs):
+        server = _StubLLM(**kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        monkeypatch.setenv("OPENROUTER_API_KEY", "test-key")
+        monkeypatch.setenv("AI_BASE_URL", server.url)
+        monkeypatch.setenv("AI_BACKOFF_BASE", "0.01")
+        monkeypatch.setenv("AI_BACKOFF_MAX", "0.05")
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def _run(coro_fn):
+    async def main():
+        try:
+            return await coro_fn()
+        finally:
+            await ai_module.close_clients()
+    return asyncio.run(main())
+
+
+def test_client_is_reused_and_keeps_connections_alive(stub):
+    server = stub()
+
+    async def scenario():
+        first = ai_module.get_client()
+        answers = [await ai_module.ai_query("hi", use_cache=False) for _ in range(3)]
+        assert ai_module.get_client() is first
+        return answers
+
+    assert _run(scenario) == ["answer 1", "answer 2", "answer 3"]
+    assert len(server.ports) == 1  # one TCP connection served every call
+
+
+def test_retries_rate_limits_then_succeeds(stub):
+    server = stub(failures=2, status=429)
+    assert _run(lambda: ai_module.ai_query("hi")) == "answer 3"
+    assert server.calls == 3
+
+
+def test_retries_server_errors_up_to_the_limit(stub, monkeypatch):
+    monkeypatch.setenv("AI_MAX_RETRIES", "2")
+    server = stub(failures=10, status=503)
+    with pytest.raises(Exception) as excinfo:
+        _run(lambda: ai_module.ai_query("hi"))
+    assert getattr(excinfo.value, "status_code", None) == 503
+    assert server.calls == 3
+
+
+def test_client_errors_are_not_retried(stub):
+    server = stub(failures=1, status=400)
+    with pytest.raises(Exception):
+        _run(lambda: ai_module.ai_query("hi"))
+    assert server.calls == 1
+
+
+def test_concurrency_limiter_caps_in_flight_requests(stub, monkeypatch):
+    monkeypatch.setenv("AI_MAX_CONCURRENCY", "2")
+    server = stub(delay=0.1)
+
+    async def burst():
+        return await asyncio.gather(*(ai_module.ai_query("hi") for _ in range(6)))
+
+    assert len(_run(burst)) == 6
+    assert server.max_in_flight == 2
+
+
+def test_backoff_is_jittered_and_capped(monkeypatch):
+    monkeypatch.setenv("AI_BACKOFF_BASE", "1")
+    monkeypatch.setenv("AI_BACKOFF_MAX", "4")
+    delays = [ai_module._backoff(10, RuntimeError()) for _ in range(50)]
+    assert all(0 <= d <= 4 for d in delays)
+    assert len(set(delays)) > 1
+
+
+def test_sync_client_is_shared(monkeypatch):
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test-key")
+    try:
+        assert ai_module.get_sync_client() is ai_module.get_sync_client()
+    finally:
+        for client in ai_module._sync_clients.values():
+            client.close()
+        ai_module._sync_clients.clear()
@@ -0,0 +1,85 @@
+"""The benchmark tooling: the fake LLM server and result comparison."""
+
+import asyncio
+
+from bench.compare import compare
+from bench.fake_llm import FakeLLM
+
+
+def test_fake_llm_serves_chat_and_streams(monkeypatch):
+    import ai
+
+    async def scenario():
+        llm = FakeLLM(latency=0, tokens=5)
+        monkeypatch.setenv("AI_BASE_URL", await llm.start())
+        monkeypatch.setenv("OPENROUTER_API_KEY", "bench")
+        board = {"columns": [], "cards": {}}
+        result = await ai.ai_chat(board, "hello", [], use_cache=False)
+        events = [e async for e in await ai.ai_chat_stream(board, "hi", [], use_cache=False)]
+        await ai.close_clients()
+        await llm.close()
+        return llm, result, events
+
+    llm, result, events = asyncio.run(scenario())
+    assert llm.requests == 2
+    assert result["response"] == "Here is a short summary"
+    assert result["board"] is None
+    assert events[-1]["event"] == "board"
+    assert "".join(e["data"]["text"] for e in events if e["event"] == "token") == "Here is a short summary"
+
+
+def test_compare_flags_slower_latency_and_lower_throughput():
+    def document(p50, rps):
+        return {
+            "environment": {"commit": "abc"},
+            "results": [{"cards": 10, "get_board": {"p50_ms": p50}}],
+            "profiles": {"read": {"throughput_rps": rps, "latency": {"p50_ms": p50}}},
+        }
+
+    rows = {row["path"]: row for row in compare(document(1.0, 100), document(1.5, 80), "p50_ms", 0.1)}
+    assert rows["results[cards=10].get_board"]["regression"]
+    assert rows["profiles.read.throughput_rps"]["regression"]
+    assert rows["profiles.read.throughput_rps"]["change"] == -0.2
+
+    rows = compare(document(1.0, 100), document(1.05, 120), "p50_ms", 0.1)
+    assert not any(row["regression"] for row in rows)
+
+
+def test_wire_reports_bytes_saved_for_boards_and_bundle(tmp_path):
+    from bench.wire import run
+
+    (tmp_path / "app.js").write_text("const card = 1;\n" * 200)
+    (tmp_path / "app.js.gz").write_bytes(b"skipped")
+    result = run([100], 3, tmp_path)
+    row = result["results"][0]
+    assert row["gzip"]["bytes"] < row["identity"] / 4
+    assert result["bundle"]["files"] == 1
+    assert result["bundle"]["gzip_saving"] > 0.9
+
+
+def test_writes_coalesces_drag_storms(monkeypatch):
+    import db
+    from bench.writes import run
+
+    monkeypatch.setattr(db, "DB_PATH", db.DB_PATH)
+    result = run([0, 20], boards=2, clients=2, cards=5, interval_ms=2, duration=0.2)
+    direct, coalesced = result["results"]
+    assert direct["saves_per_commit"] == 1
+    assert coalesced["saves_per_commit"] > 2
+    assert coalesced["latency"]["runs"] == coalesced["saves"]
+
+
+def test_startup_import_leaves_the_ai_stack_unloaded(tmp_path):
+    from bench.startup import _import_main, parse_importtime
+
+    elapsed, packages, loaded = _import_main(tmp_path / "startup.db")
+    assert elapsed > 0
+    assert loaded == []
+    assert packages["fastapi"] > 0 and "openai" not in packages
+
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       100 |        100 |     fastapi.routing\n"
+        "import time:        50 |        150 |   fastapi\n"
+    )
+    assert parse_importtime(stderr) == {"fastapi": 150}
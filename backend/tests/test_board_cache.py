@@ -0,0 +1,41 @@
+from board_cache import BoardCache, CachedBoard
+
+
+def test_get_put_and_counters():
+    cache = BoardCache()
+    assert cache.get("user") is None
+    cache.put("user", cache.ticket(), CachedBoard(1, 3, b"{}"))
+    entry = cache.get("user")
+    assert entry.body == b"{}"
+    assert entry.etag == '"3"'
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+
+
+def test_invalidate_board_drops_only_that_board():
+    cache = BoardCache()
+    cache.put("alice", cache.ticket(), CachedBoard(1, 1, b"a"))
+    cache.put("bob", cache.ticket(), CachedBoard(2, 1, b"b"))
+    cache.invalidate_board(1, 2)
+    assert cache.get("alice") is None
+    assert cache.get("bob") is not None
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_put_after_racing_write_is_dropped():
+    cache = BoardCache()
+    ticket = cache.ticket()           # reader starts its DB query...
+    cache.invalidate_board(1, 2)      # ...a write commits meanwhile...
+    cache.put("user", ticket, CachedBoard(1, 1, b"stale"))
+    assert cache.get("user") is None  # ...so the stale body is not cached
+
+
+def test_lru_eviction():
+    cache = BoardCache(max_entries=2)
+    for n, key in enumerate(["a", "b"]):
+        cache.put(key, cache.ticket(), CachedBoard(n, 1, b""))
+    cache.get("a")
+    cache.put("c", cache.ticket(), CachedBoard(9, 1, b""))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["entries"] == 2
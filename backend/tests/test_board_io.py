@@ -0,0 +1,162 @@
+"""Streaming NDJSON/CSV import and export: round trips, errors and bounded memory."""
+
+import asyncio
+import json
+import tracemalloc
+
+import pytest
+
+import board_io
+import db
+from board_io import ImportFormatError, board_outline, export_chunks, import_chunks
+
+
+@pytest.fixture
+def path(path):
+    db.create_board("user", "Copy", path=path)
+    return path
+
+
+async def _body(data: bytes, chunk_size: int = 7):
+    for start in range(0, len(data), chunk_size):
+        yield data[start:start + chunk_size]
+
+
+def _export(fmt: str, board_id: int | None = None) -> bytes:
+    async def scenario():
+        outline = await board_outline("user", board_id)
+        return b"".join([chunk async for chunk in export_chunks(outline, fmt)])
+    return asyncio.run(scenario())
+
+
+def _import(data: bytes, fmt: str, board_id: int | None = None, replace: bool = True) -> dict:
+    async def scenario():
+        outline = await board_outline("user", board_id)
+        return await import_chunks(outline, _body(data), fmt, replace)
+    return asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("fmt", ["ndjson", "csv"])
+def test_export_then_import_round_trips(path, fmt):
+    db.update_card("user", "card-1", details='Line one\nline "two", with a comma', path=path)
+    db.create_card("user", "col-review", "Café ☕", path=path)
+    result = _import(_export(fmt), fmt, board_id=2)
+    original = db.get_board("user", path)
+    assert db.get_board("user", path, 2) == original
+    assert result["cards"] == len(original["cards"])
+
+
+@pytest.mark.parametrize("fmt", ["ndjson", "csv"])
+def test_cards_in_no_column_round_trip(path, fmt):
+    db.set_board("user", {
+        "columns": [{"id": "col", "title": "Col", "cardIds": ["listed"]}],
+        "cards": {"listed": {"title": "Listed"}, "loose": {"title": "Loose", "details": "x"}},
+    }, path)
+    _import(_export(fmt), fmt, board_id=2)
+    assert db.get_board("user", path, 2) == db.get_board("user", path)
+    stats = db.get_board_stats("user", path=path, board_id=2)
+    assert stats["integrity"]["unlistedCards"] == 1
+
+
+def test_csv_keeps_crlf_inside_quoted_fields(path):
+    db.update_card("user", "card-1", details="first\r\nsecond\r\n", path=path)
+    exported = _export("csv")
+    assert b'"first\r\nsecond\r\n"' in exported
+    _import(exported, "csv", board_id=2)
+    assert db.get_board("user", path, 2)["cards"]["card-1"]["details"] == "first\r\nsecond\r\n"
+    assert db.get_board("user", path, 2) == db.get_board("user", path)
+
+
+def test_ndjson_export_starts_with_board_and_columns(path):
+    lines = [json.loads(line) for line in _export("ndjson").splitlines()]
+    assert lines[0]["type"] == "board" and lines[0]["version"] == 1
+    assert [line["type"] for line in lines[1:6]] == ["column"] * 5
+    assert {line["type"] for line in lines[6:]} == {"card"}
+
+
+def test_csv_keeps_empty_columns(path):
+    db.set_board("user", {"columns": [{"id": "empty", "title": "Empty", "cardIds": []}], "cards": {}}, path)
+    assert _export("csv").decode().splitlines() == [
+        "columnId,columnTitle,cardId,title,details", "empty,Empty,,,",
+    ]
+
+
+def test_append_updates_matching_cards_and_adds_new_ones(path):
+    body = (
+        '{"type": "card", "id": "card-1", "columnId": "col-done", "title": "Renamed"}\n'
+        '{"type": "card", "id": "new", "columnId": "col-done", "title": "New"}\n'
+    ).encode()
+    result = _import(body, "ndjson", replace=False)
+    board = db.get_board("user", path)
+    done = next(c for c in board["columns"] if c["id"] == "col-done")
+    assert done["cardIds"][-2:] == ["card-1", "new"]
+    assert board["cards"]["card-1"]["title"] == "Renamed"
+    assert (result["cards"], result["version"]) == (2, 2)
+
+
+def test_malformed_record_reports_line_and_progress(path, monkeypatch):
+    monkeypatch.setattr(board_io, "IMPORT_BATCH_SIZE", 2)
+    body = (
+        '{"type": "column", "id": "c", "title": "C"}\n'
+        '{"type": "card", "id": "a", "columnId": "c", "title": "A"}\n'
+        '{"type": "card", "id": "b", "columnId": "missing", "title": "B"}\n'
+    ).encode()
+    with pytest.raises(ImportFormatError) as error:
+        _import(body, "ndjson")
+    assert error.value.line == 3
+    assert error.value.imported == {"columns": 1, "cards": 1}
+    assert list(db.get_board("user", path)["cards"]) == ["a"]
+
+    with pytest.raises(ImportFormatError, match="line 2: not valid JSON"):
+        _import(b'{"type": "board"}\n{oops\n', "ndjson")
+    with pytest.raises(ImportFormatError, match="header lacks cardId"):
+        _import(b"columnId,title\n", "csv")
+    with pytest.raises(ImportFormatError, match="unterminated"):
+        _import(b'columnId,cardId,title\nc,a,"never closed\n', "csv")
+
+
+def _seed(path, board_id: int, cards: int) -> None:
+    with db.get_connection(path) as conn:
+        conn.execute("DELETE FROM cards WHERE board_id = ?", (board_id,))
+        conn.executemany(
+            "INSERT INTO cards (board_id, id, column_id, title, details, position) VALUES (?, ?, ?, ?, ?, ?)",
+            ((board_id, f"c{n}", "col-backlog", f"Card {n}", "x" * 100, n) for n in range(cards)),
+        )
+
+
+def _peak(fn) -> int:
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_memory_stays_flat_as_the_board_grows(path):
+    async def drain(board_id):
+        outline = await board_outline("user", board_id)
+        async for _ in export_chunks(outline, "ndjson"):
+            pass
+
+    async def generated(cards):
+        yield b'{"type": "column", "id": "col", "title": "Col"}\n'
+        for n in range(cards):
+            yield b'{"type": "card", "id": "c%d", "columnId": "col", "title": "Card", "details": "%s"}\n' % (
+                n, b"x" * 100,
+            )
+
+    async def load(cards):
+        outline = await board_outline("user", 2)
+        await import_chunks(outline, generated(cards), "ndjson", replace=True)
+
+    peaks = {}
+    for cards in (3_000, 30_000):
+        _seed(path, 1, cards)
+        peaks[("export", cards)] = _peak(lambda: asyncio.run(drain(1)))
+        peaks[("import", cards)] = _peak(lambda: asyncio.run(load(cards)))
+    assert db.get_board_outline("user", path, 2)["columns"] == [{"id": "col", "title": "Col"}]
+
+    # Ten times the cards, but the peak is set by one page or batch either way.
+    for kind in ("export", "import"):
+        assert peaks[(kind, 30_000)] < 1.5 * peaks[(kind, 3_000)], peaks
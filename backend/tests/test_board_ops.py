@@ -0,0 +1,69 @@
+import pytest
+
+from board_ops import OperationError, apply_operations
+
+
+_BOARD = {
+    "columns": [
+        {"id": "todo", "title": "Todo", "cardIds": ["a", "b"]},
+        {"id": "done", "title": "Done", "cardIds": ["c"]},
+    ],
+    "cards": {k: {"id": k, "title": k.upper(), "details": ""} for k in "abc"},
+}
+
+
+def test_input_board_is_not_modified():
+    before = repr(_BOARD)
+    apply_operations(_BOARD, [{"op": "delete_card", "id": "a"}])
+    assert repr(_BOARD) == before
+
+
+def test_card_operations():
+    board = apply_operations(_BOARD, [
+        {"op": "add_card", "column": "done", "id": "d", "title": "D", "index": 0},
+        {"op": "move_card", "id": "a", "column": "done", "index": 1},
+        {"op": "update_card", "id": "b", "details": "more"},
+        {"op": "delete_card", "id": "c"},
+    ])
+    assert board["columns"][0]["cardIds"] == ["b"]
+    assert board["columns"][1]["cardIds"] == ["d", "a"]
+    assert board["cards"]["b"] == {"id": "b", "title": "B", "details": "more"}
+    assert "c" not in board["cards"]
+
+
+def test_add_card_generates_id_and_appends():
+    board = apply_operations(_BOARD, [{"op": "add_card", "column": "todo", "title": "New"}])
+    new_id = board["columns"][0]["cardIds"][-1]
+    assert new_id.startswith("card-")
+    assert board["cards"][new_id]["title"] == "New"
+
+
+def test_column_operations():
+    board = apply_operations(_BOARD, [
+        {"op": "add_column", "id": "review", "title": "Review", "index": 1},
+        {"op": "update_column", "id": "todo", "title": "Backlog"},
+        {"op": "move_column", "id": "done", "index": 0},
+        {"op": "delete_column", "id": "review"},
+    ])
+    assert [(c["id"], c["title"]) for c in board["columns"]] == [("done", "Done"), ("todo", "Backlog")]
+
+    board = apply_operations(_BOARD, [{"op": "delete_column", "id": "todo"}])
+    assert set(board["cards"]) == {"c"}
+
+
+@pytest.mark.parametrize("operations", [
+    [{"op": "move_card", "id": "zzz", "column": "done"}],
+    [{"op": "move_card", "id": "a", "column": "nowhere"}],
+    [{"op": "add_card", "column": "todo"}],
+    [{"op": "add_card", "column": "todo", "id": "a", "title": "dup"}],
+    [{"op": "add_column", "id": "todo", "title": "dup"}],
+    [{"op": "update_card", "id": "a", "title": 5}],
+    [{"op": "move_card", "id": "a", "column": "done", "index": -1}],
+    [{"op": "delete_card", "id": ["a"]}],
+    [{"op": "explode"}],
+    ["delete everything"],
+    {"op": "delete_card", "id": "a"},
+])
+def test_invalid_operations_raise(operations):
+    with pytest.raises(OperationError):
+        apply_operations(_BOARD, operations)
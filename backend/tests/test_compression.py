@@ -0,0 +1,123 @@
+"""Accept-Encoding negotiation, the compression middleware and precompressed static files."""
+
+import gzip
+import os
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+import compression
+from compression import (
+    CompressionMiddleware, IMMUTABLE, PrecompressedStaticFiles, negotiate, precompress_directory,
+)
+
+_GZIP = {"Accept-Encoding": "gzip"}
+
+
+def test_negotiate_honours_quality_values():
+    assert negotiate(None) is None
+    assert negotiate("gzip, deflate") == "gzip"
+    assert negotiate("gzip;q=0, identity") is None
+    assert negotiate("*") == compression.ENCODINGS[0]
+    assert negotiate("br;q=0.5, gzip;q=0.8", ("br", "gzip")) == "gzip"
+    assert negotiate("br, gzip", ("br", "gzip")) == "br"
+    assert negotiate("*;q=0.1, gzip;q=0", ("br", "gzip")) == "br"
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware)
+
+    @app.get("/big")
+    def big():
+        return {"text": "card " * 1000}
+
+    @app.get("/small")
+    def small():
+        return {"text": "card"}
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse((b"line %d\n" % n for n in range(2000)), media_type="text/plain")
+
+    @app.get("/events")
+    def events():
+        return StreamingResponse(iter([b"data: x\n\n" * 200]), media_type="text/event-stream")
+
+    @app.get("/binary")
+    def binary():
+        return PlainTextResponse(b"\0" * 4096, media_type="application/octet-stream")
+
+    return app
+
+
+def test_middleware_compresses_large_compressible_responses():
+    client = TestClient(_app())
+    response = client.get("/big", headers=_GZIP)
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) < 200
+    assert response.json() == {"text": "card " * 1000}
+
+    streamed = client.get("/stream", headers=_GZIP)
+    assert streamed.headers["content-encoding"] == "gzip"
+    assert "content-length" not in streamed.headers
+    assert streamed.text.splitlines()[-1] == "line 1999"
+
+
+def test_middleware_leaves_other_responses_alone():
+    client = TestClient(_app())
+    for path in ("/small", "/events", "/binary"):
+        assert "content-encoding" not in client.get(path, headers=_GZIP).headers, path
+    response = client.get("/big", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert response.headers["vary"] == "Accept-Encoding"
+
+
+def _site(tmp_path):
+    (tmp_path / "_next" / "static" / "chunks").mkdir(parents=True)
+    (tmp_path / "index.html").write_text("<p>board</p>" * 500)
+    (tmp_path / "_next" / "static" / "chunks" / "app-1a2b.js").write_text("let x = 1;\n" * 500)
+    (tmp_path / "logo.png").write_bytes(os.urandom(4096))
+    return tmp_path
+
+
+def test_precompress_directory_writes_smaller_variants_once(tmp_path):
+    site = _site(tmp_path)
+    totals = precompress_directory(site)
+    assert totals["files"] == 2
+    assert totals["gzip"] < totals["identity"] / 10
+    js = site / "_next" / "static" / "chunks" / "app-1a2b.js"
+    assert gzip.decompress((site / "_next/static/chunks/app-1a2b.js.gz").read_bytes()) == js.read_bytes()
+    assert not (site / "logo.png.gz").exists()
+
+    mtime = (site / "index.html.gz").stat().st_mtime_ns
+    assert precompress_directory(site) == totals
+    assert (site / "index.html.gz").stat().st_mtime_ns == mtime
+
+
+def test_static_files_serve_precompressed_variants_with_cache_headers(tmp_path):
+    site = _site(tmp_path)
+    precompress_directory(site)
+    app = FastAPI()
+    app.mount("/", PrecompressedStaticFiles(directory=site, html=True), name="static")
+    client = TestClient(app)
+
+    js = client.get("/_next/static/chunks/app-1a2b.js", headers=_GZIP)
+    assert js.headers["content-encoding"] == "gzip"
+    assert js.headers["content-type"].startswith("text/javascript")
+    assert js.headers["cache-control"] == IMMUTABLE
+    assert js.headers["vary"] == "Accept-Encoding"
+    assert int(js.headers["content-length"]) == (site / "_next/static/chunks/app-1a2b.js.gz").stat().st_size
+    assert js.text == "let x = 1;\n" * 500
+
+    page = client.get("/", headers=_GZIP)
+    assert page.headers["content-encoding"] == "gzip"
+    assert page.headers["cache-control"] == "no-cache"
+    again = client.get("/", headers={**_GZIP, "If-None-Match": page.headers["etag"]})
+    assert again.status_code == 304
+
+    plain = client.get("/", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.text == "<p>board</p>" * 500
@@ -0,0 +1,172 @@
+"""Background jobs: claiming, leases and atomic results in db, and the JobQueue workers."""
+
+import asyncio
+import time
+
+import db
+import jobs
+from jobs import JobQueue
+
+_MOVE = [{"op": "move_card", "id": "card-1", "column": "col-done"}]
+
+
+def _reply(path, operations=_MOVE):
+    board, version, _ = db.get_versioned_board("user", path)
+    from board_ops import apply_operations
+    return {"response": "ok", "board": apply_operations(board, operations), "operations": operations}, version
+
+
+def _column_of(path, card_id):
+    board = db.get_board("user", path)
+    return next(c["id"] for c in board["columns"] if card_id in c["cardIds"])
+
+
+def test_claim_respects_per_user_limit(path):
+    db.create_board("bob", "Bob's board", path=path)
+    first = db.create_job("user", "chat", {}, path)
+    db.create_job("user", "chat", {}, path)
+    bobs = db.create_job("bob", "chat", {}, path)
+    assert db.claim_job("w", 60, 1, 3, path)["id"] == first["id"]
+    assert db.claim_job("w", 60, 1, 3, path)["id"] == bobs["id"]   # user is at the limit
+    assert db.claim_job("w", 60, 1, 3, path) is None
+
+
+def test_expired_lease_is_reclaimed_then_fails(path):
+    job = db.create_job("user", "chat", {}, path)
+    assert db.claim_job("dead", -1, 1, 2, path)["id"] == job["id"]   # lease already expired
+    assert db.claim_job("other", -1, 1, 2, path)["id"] == job["id"]
+    assert not db.renew_job(job["id"], "dead", 60, path)
+    assert db.claim_job("third", 60, 1, 2, path) is None
+    failed = db.get_job("user", job["id"], path)
+    assert (failed["status"], failed["error"], failed["attempts"]) == ("failed", "worker lost", 2)
+
+
+def test_finish_job_applies_result_and_drops_board_from_it(path):
+    job = db.create_job("user", "chat", {}, path)
+    db.claim_job("w", 60, 1, 3, path)
+    result, version = _reply(path)
+    finished = db.finish_job(job["id"], "w", result, version, path=path)
+    assert finished["status"] == "succeeded"
+    assert finished["version"] == version + 1
+    assert finished["result"] == {"response": "ok", "operations": _MOVE}
+    assert _column_of(path, "card-1") == "col-done"
+
+
+def test_finish_job_replays_operations_on_a_changed_board(path):
+    job = db.create_job("user", "chat", {}, path)
+    db.claim_job("w", 60, 1, 3, path)
+    result, version = _reply(path)
+    db.update_card("user", "card-2", title="Edited meanwhile", path=path)
+    assert db.finish_job(job["id"], "w", result, version, path=path)["status"] == "succeeded"
+    assert _column_of(path, "card-1") == "col-done"
+    assert db.get_board("user", path)["cards"]["card-2"]["title"] == "Edited meanwhile"
+
+
+def test_whole_board_result_conflicts_with_a_changed_board(path):
+    job = db.create_job("user", "chat", {}, path)
+    db.claim_job("w", 60, 1, 3, path)
+    result, version = _reply(path)
+    result["operations"] = None   # the legacy whole-board reply
+    db.update_card("user", "card-2", title="Edited meanwhile", path=path)
+    finished = db.finish_job(job["id"], "w", result, version, path=path)
+    assert finished["status"] == "failed"
+    assert "changed" in finished["error"]
+    assert _column_of(path, "card-1") != "col-done"
+
+
+def test_unwritable_result_fails_the_job_and_leaves_the_board(path, monkeypatch):
+    job = db.create_job("user", "chat", {}, path)
+    db.claim_job("w", 60, 1, 3, path)
+    result, version = _reply(path)
+    monkeypatch.setattr(db, "_touch", lambda conn, board_id: 1 / 0)
+    finished = db.finish_job(job["id"], "w", result, version, path=path)
+    assert finished["status"] == "failed"
+    assert "could not be saved" in finished["error"]
+    assert _column_of(path, "card-1") != "col-done"
+    assert db.get_versioned_board("user", path)[1] == version
+
+
+def test_cancelled_job_result_is_discarded(path):
+    job = db.create_job("user", "chat", {}, path)
+    db.claim_job("w", 60, 1, 3, path)
+    assert db.cancel_job("user", job["id"], path)["status"] == "cancelled"
+    result, version = _reply(path)
+    assert db.finish_job(job["id"], "w", result, version, path=path) is None
+    assert _column_of(path, "card-1") != "col-done"
+    assert db.cancel_job("user", job["id"], path)["status"] == "cancelled"
+    assert db.cancel_job("someone-else", job["id"], path) is None
+
+
+def test_queue_runs_jobs_and_cancels_running_ones(path):
+    async def scenario():
+        started = asyncio.Event()
+
+        async def chat(job):
+            if job["request"].get("slow"):
+                started.set()
+                await asyncio.sleep(30)
+            return await asyncio.to_thread(_reply, path)
+
+        queue = JobQueue(workers=2, per_user_limit=2, poll_interval=0.05)
+        queue.add_handler("chat", chat)
+        await queue.start()
+
+        slow = await queue.submit("user", "chat", {"slow": True})
+        await asyncio.wait_for(started.wait(), 5)
+        cancelled = await queue.cancel("user", slow["id"])
+        assert cancelled["status"] == "cancelled"
+
+        job = await queue.submit("user", "chat", {})
+        wake = queue.watch(job["id"])
+        deadline = time.monotonic() + 5
+        while db.get_job("user", job["id"], path)["status"] != "succeeded":
+            assert time.monotonic() < deadline
+            await asyncio.wait_for(wake.get(), 5)
+        queue.unwatch(job["id"], wake)
+        stats = queue.stats()
+        await queue.close()
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert (stats["completed"], stats["cancelled"], stats["running"]) == (1, 1, 0)
+    assert _column_of(path, "card-1") == "col-done"
+
+
+def test_worker_survives_malformed_results_and_errors(path, monkeypatch):
+    malformed = {"columns": [{"id": "c", "title": "C", "cardIds": [{"x": 1}]}], "cards": {}}
+    claims = 0
+    real_claim = jobs.claim_job
+
+    def flaky_claim(*args):
+        nonlocal claims
+        claims += 1
+        if claims == 1:
+            raise RuntimeError("database is locked")
+        return real_claim(*args)
+
+    monkeypatch.setattr(jobs, "claim_job", flaky_claim)
+
+    async def scenario():
+        async def chat(job):
+            if job["request"].get("bad"):
+                version = db.get_versioned_board("user", path)[1]
+                return {"response": "ok", "board": malformed}, version
+            return await asyncio.to_thread(_reply, path)
+
+        queue = JobQueue(workers=1, poll_interval=0.05)
+        queue.add_handler("chat", chat)
+        await queue.start()
+        bad = await queue.submit("user", "chat", {"bad": True})
+        good = await queue.submit("user", "chat", {})
+        deadline = time.monotonic() + 5
+        while db.get_job("user", good["id"], path)["status"] != "succeeded":
+            assert time.monotonic() < deadline
+            await asyncio.sleep(0.02)
+        stats = queue.stats()
+        await queue.close()
+        return bad, stats
+
+    bad, stats = asyncio.run(scenario())
+    assert db.get_job("user", bad["id"], path)["error"] == "the job produced an invalid board"
+    assert (stats["workers"], stats["completed"], stats["failed"]) == (1, 1, 2)
+    assert _column_of(path, "card-1") == "col-done"
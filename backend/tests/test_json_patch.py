@@ -0,0 +1,68 @@
+import pytest
+
+from json_patch import PatchError, PatchTestFailed, apply_patch
+
+
+_DOC = {
+    "columns": [{"id": "c1", "title": "One", "cardIds": ["a", "b"]}],
+    "cards": {"a": {"id": "a", "title": "A"}, "b": {"id": "b", "title": "B"}},
+}
+
+
+def test_apply_patch_does_not_mutate_input():
+    before = repr(_DOC)
+    apply_patch(_DOC, [{"op": "remove", "path": "/cards/a"}])
+    assert repr(_DOC) == before
+
+
+def test_add_and_append_to_array():
+    doc = apply_patch(_DOC, [
+        {"op": "add", "path": "/cards/c", "value": {"id": "c", "title": "C"}},
+        {"op": "add", "path": "/columns/0/cardIds/-", "value": "c"},
+        {"op": "add", "path": "/columns/0/cardIds/0", "value": "z"},
+    ])
+    assert doc["columns"][0]["cardIds"] == ["z", "a", "b", "c"]
+    assert doc["cards"]["c"]["title"] == "C"
+
+
+def test_replace_remove_move_copy():
+    doc = apply_patch(_DOC, [
+        {"op": "replace", "path": "/columns/0/title", "value": "Renamed"},
+        {"op": "move", "from": "/columns/0/cardIds/1", "path": "/columns/0/cardIds/0"},
+        {"op": "copy", "from": "/cards/a", "path": "/cards/a2"},
+        {"op": "remove", "path": "/cards/b"},
+    ])
+    assert doc["columns"][0] == {"id": "c1", "title": "Renamed", "cardIds": ["b", "a"]}
+    assert doc["cards"]["a2"] == {"id": "a", "title": "A"}
+    assert "b" not in doc["cards"]
+
+
+def test_pointer_escapes():
+    doc = apply_patch({"a/b": 1, "m~n": 2}, [
+        {"op": "replace", "path": "/a~1b", "value": 10},
+        {"op": "remove", "path": "/m~0n"},
+    ])
+    assert doc == {"a/b": 10}
+
+
+def test_test_operation():
+    apply_patch(_DOC, [{"op": "test", "path": "/columns/0/cardIds", "value": ["a", "b"]}])
+    with pytest.raises(PatchTestFailed):
+        apply_patch(_DOC, [{"op": "test", "path": "/cards/a/title", "value": "nope"}])
+    with pytest.raises(PatchTestFailed):
+        apply_patch({"x": 1}, [{"op": "test", "path": "/x", "value": True}])
+
+
+@pytest.mark.parametrize("patch", [
+    [{"op": "remove", "path": "/cards/missing"}],
+    [{"op": "replace", "path": "/columns/5/title", "value": "x"}],
+    [{"op": "add", "path": "/columns/01", "value": {}}],
+    [{"op": "add", "path": "cards", "value": {}}],
+    [{"op": "add", "path": "/cards/x"}],
+    [{"op": "frobnicate", "path": "/cards"}],
+    [{"op": "move", "from": "/cards", "path": "/cards/a/inner"}],
+    {"op": "remove", "path": "/cards"},
+])
+def test_invalid_patches_raise(patch):
+    with pytest.raises(PatchError):
+        apply_patch(_DOC, patch)
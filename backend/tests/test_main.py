@@ -1,5 +1,8 @@
+import json
+import sqlite3
+
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, AsyncMock, MagicMock
 from fastapi.testclient import TestClient
 
 
@@ -15,6 +18,10 @@ def make_client(tmp_db):
     db_module.DB_PATH = tmp_db
     db_module.init_db(tmp_db)
 
+    # Cached board bodies belong to the previous test's database.
+    from board_cache import board_cache
+    board_cache.clear()
+
     # Reload main so its imports and startup handler use the patched DB_PATH.
     importlib.reload(main_module)
 
@@ -94,6 +101,25 @@ def test_put_board_rejects_invalid_body(tmp_path):
     assert response.status_code == 422
 
 
+def test_put_board_validates_column_and_card_types(tmp_path):
+    client = make_client(tmp_path / "test.db")
+    bad_card = {"columns": [], "cards": {"c-1": {"id": "c-1", "title": 5}}}
+    assert client.put("/api/board", json=bad_card).status_code == 422
+    bad_column = {"columns": [{"id": "col-1", "title": "Col", "cardIds": "c-1"}], "cards": {}}
+    assert client.put("/api/board", json=bad_column).status_code == 422
+
+
+def test_board_body_is_compact_utf8(tmp_path):
+    client = make_client(tmp_path / "test.db")
+    board = {
+        "columns": [{"id": "col-1", "title": "À faire", "cardIds": ["c-1"]}],
+        "cards": {"c-1": {"id": "c-1", "title": "Café ☕", "details": ""}},
+    }
+    client.put("/api/board", json=board)
+    response = client.get("/api/board")
+    assert response.content == json.dumps(board, ensure_ascii=False, separators=(",", ":")).encode()
+
+
 def test_put_board_preserves_card_order(tmp_path):
     client = make_client(tmp_path / "test.db")
     ordered = {
@@ -109,6 +135,182 @@ def test_put_board_preserves_card_order(tmp_path):
     assert saved["columns"][0]["cardIds"] == ["c-3", "c-1", "c-2"]
 
 
+# ── versions / PATCH /api/board ───────────────────────────────────────────────
+
+def test_get_board_returns_etag_and_put_bumps_it(tmp_path):
+    client = make_client(tmp_path / "test.db")
+    etag = client.get("/api/board").headers["ETag"]
+    res = client.put("/api/board", json={"columns": [], "cards": {}})
+    assert res.status_code == 204
+    assert res.headers["ETag"] != etag
+    assert client.get("/api/board").headers["ETag"] == res.headers["ETag"]
+
+
+def test_put_board_with_stale_if_match_conflicts(tmp_path):
+    client = make_client(tmp_path / "test.db")
+    etag = client.get("/api/board").headers["ETag"]
+    first = client.put("/api/board", json={"columns": [], "cards": {}}, headers={"If-Match": etag})
+    assert first.status_code == 204
+
+    # A second tab still holding the old ETag must not overwrite the first.
+    second = client.put("/api/board", json=_SAMPLE_BOARD, headers={"If-Match": etag})
+    assert second.status_code == 409
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert client.get("/api/board").json() == {"columns": [], "cards": {}}
+
+
+def test_patch_board_applies_json_patch(tmp_path):
+    client = make_client(tmp_path / "test.db")
+    etag = client.get("/api/board").headers["ETag"]
+    res = client.patch(
+        "/api/board",
+        json=[
+            {"op": "move", "from": "/columns/0/cardIds/1", "path": "/columns/0/cardIds/0"},
+            {"op": "replace", "path": "/cards/card-3/title", "value": "Prototype v2"},
+        ],
+        headers={"If-Match": etag, "Content-Type": "application/json-patch+json"},
+    )
+    assert res.status_code == 204
+    board = client.get("/api/board").json()
+    assert board["columns"][0]["cardIds"] == ["card-2", "card-1"]
+    assert board["cards"]["card-3"]["title"] == "Prototype v2"
+
+
+def test_patch_board_requires_current_version(tmp_path):
+    client = make_client(tmp_path / "test.db")
+    op = [{"op": "remove", "path": "/cards/card-1"}]
+    assert client.patch("/api/board", json=op).status_code == 428
+    etag = client.get("/api/board").headers["ETag"]
+    client.patch("/api/board/cards/card-2", json={"title": "bump"})
+    assert client.patch("/api/board", json=op, headers={"If-Match": etag}).status_code == 409
+
+
+def test_patch_board_rejects_bad_patches(tmp_path):
+    client = make_client(tmp_path / "test.db")
+    etag = client.get("/api/board").headers["ETag"]
+    bad = client.patch("/api/board", json=[{"op": "remove", "path": "/nope"}], headers={"If-Match": etag})
+    assert bad.status_code == 422
+    not_board = client.patch("/api/board", json=[{"op": "replace", "path": "/columns", "value": 1}],
+                             headers={"If-Match": etag})
+    assert not_board.status_code == 422
+    for op in (
+        {"op": "add", "path": "/columns/0/cardIds/-", "value": {"x": 1}},
+        {"op": "replace", "path": "/columns/0/id", "value": ["col"]},
+        {"op": "replace", "path": "/columns/0/title", "value": 3},
+        {"op": "replace", "path": "/cards/card-1/title", "value": {"x": 1}},
+        {"op": "replace", "path": "/cards/card-1", "value": "card"},
+    ):
+        res = client.patch("/api/board", json=[op], headers={"If-Match": etag})
+        assert res.status_code == 422, op
+    failed_test = client.patch("/api/board", json=[{"op": "test", "path": "/cards/card-1/title", "value": "x"}],
+                               headers={"If-Match": etag})
+    assert failed_test.status_code == 409
+    assert client.get("/api/board").headers["ETag"] == etag
+
+
+# ── board read cache / conditional GET ────────────────────────────────────────
+
+def test_get_board_if_none_match_returns_304_without_reading_the_board(tmp_path):
+    client = make_client(tmp_path / "test.db")
+    first = client.get("/api/board")
+    etag = first.headers["ETag"]
+    with patch("main.get_versioned_board", side_effect=AssertionError("board was read")):
+        res = client.get("/api/board", headers={"If-None-Match": etag})
+        assert res.status_code == 304
+        assert res.headers["ETag"] == etag
+        assert res.content == b""
+        # A cached full read does not read the board either.
+        assert client.get("/api/board").json() == first.json()
+
+
+def test_cached_board_notices_writes_made_around_the_cache(tmp_path):
+    # Another worker's write: same database, but this process's listeners never hear of it.
+    client = make_client(tmp_path / "test.db")
+    etag = client.get("/api/board").headers["ETag"]
+    other = sqlite3.connect(tmp_path / "test.db")
+    with other:
+        other.execute("UPDATE cards SET title = 'Elsewhere' WHERE id = 'card-1'")
+        other.execute("UPDATE boards SET version = version + 1")
+    other.close()
+
+    res = client.get("/api/board", headers={"If-None-Match": etag})
+    assert res.status_code == 200
+    assert res.json()["cards"]["card-1"]["title"] == "Elsewhere"
+    fresh = res.headers["ETag"]
+    assert fresh != etag
+    assert client.put("/api/board", json=res.json(), headers={"If-Match": fresh}).status_code == 204
+
+
+def test_get_board_if_none_match_stale_returns_body(tmp_path):
+    client = make_client(tmp_path / "test.db")
+    res = client.get("/api/board", headers={"If-None-Match": '"0"'})
+    assert res.status_code == 200
+    assert len(res.json()["cards"]) == 8
+
+
+def test_writes_invalidate_cached_board(tmp_path):
+    client = make_client(tmp_path / "test.db")
+    etag = client.get("/api/board").headers["ETag"]
+    client.patch("/api/board/cards/card-1", json={"title": "Changed"})
+    res = client.get("/api/board", headers={"If-None-Match": etag})
+    assert res.status_code == 200
+    assert res.json()["cards"]["card-1"]["title"] == "Changed"
+
+    client.put("/api/board", json=_SAMPLE_BOARD)
+    assert client.get("/api/board").json() == _SAMPLE_BOARD
+
+
+def test_get_board_is_compressed_once_per_version(tmp_path):
+    from compression import compress
+    client = make_client(tmp_path / "test.db")
+    plain = client.get("/api/board", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.headers["Vary"] == "Accept-Encoding"
+
+    with patch("board_cache.compress", wraps=compress) as compress:
+        for _ in range(2):
+            res = client.get("/api/board", headers={"Accept-Encoding": "gzip"})
+            assert res.headers["Content-Encoding"] == "gzip"
+            assert int(res.headers["Content-Length"]) < len(plain.content)
+            assert res.json() == plain.json()
+    assert compress.call_count == 1
+
+
+def test_metrics_report_cache_hits_and_misses(tmp_path):
+    client = make_client(tmp_path / "test.db")
+    before = client.get("/api/metrics").json()["board_cache"]
+    client.get("/api/board")
+    client.get("/api/board")
+    metrics = client.get("/api/metrics").json()
+    assert metrics["board_cache"]["misses"] - before["misses"] == 1
+    assert metrics["board_cache"]["hits"] - before["hits"] == 1
+    assert metrics["db_pool"]["in_use"] == 0
+
+
+def test_prometheus_metrics_label_routes_by_template(tmp_path):
+    client = make_client(tmp_path / "test.db")
+    client.get("/api/boards/1")
+    client.get("/api/boards/1/history")
+    body = client.get("/metrics").text
+    assert 'pm_http_request_seconds_count{method="GET",route="/api/boards/{board_id}",status="200"}' in body
+    assert 'route="/api/boards/{board_id}/history"' in body
+    assert 'pm_db_call_seconds_count{call="get_versioned_board"}' in body
+    assert 'pm_payload_bytes_count{payload="board"}' in body
+    assert "pm_board_cache_misses " in body
+
+
+def test_profiler_can_be_toggled_at_runtime(tmp_path):
+    client = make_client(tmp_path / "test.db")
+    assert client.post("/api/debug/profiler", json={"action": "start", "interval": 0.001}).json()["running"]
+    client.get("/api/board")
+    stats = client.post("/api/debug/profiler", json={"action": "stop"}).json()
+    assert not stats["running"] and stats["samples"] > 0
+    assert client.get("/api/debug/profiler").text
+    client.post("/api/debug/profiler", json={"action": "reset"})
+    assert client.get("/api/debug/profiler").text == ""
+    assert client.post("/api/debug/profiler", json={"action": "pause"}).status_code == 422
+
+
 # ── db module unit tests ──────────────────────────────────────────────────────
 
 def test_init_db_is_idempotent(tmp_path):
@@ -145,20 +347,703 @@ def test_set_and_get_board_roundtrip(tmp_path):
     assert get_board("user", path) == payload
 
 
+# ── connection pool ───────────────────────────────────────────────────────────
+
+def test_pool_reuses_connections(tmp_path):
+    from db import init_db, get_board, pool_stats
+    path = tmp_path / "pool.db"
+    init_db(path)
+    for _ in range(5):
+        get_board("user", path)
+    stats = pool_stats(path)
+    assert stats["created"] == 1
+    assert stats["in_use"] == 0
+    assert stats["acquired"] >= 6
+
+
+def test_pool_applies_pragmas_once(tmp_path):
+    from db import get_connection
+    path = tmp_path / "pragmas.db"
+    with get_connection(path) as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+        assert conn.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+
+
+def test_pool_blocks_at_size_limit(tmp_path):
+    import threading
+    from db import ConnectionPool
+
+    pool = ConnectionPool(tmp_path / "small.db", size=1)
+    held = pool.acquire()
+    got = []
+    worker = threading.Thread(target=lambda: got.append(pool.acquire()))
+    worker.start()
+    worker.join(0.1)
+    assert worker.is_alive()  # waiting for the only connection
+
+    pool.release(held)
+    worker.join(1)
+    assert got == [held]
+    assert pool.stats()["waits"] == 1
+    pool.release(got[0])
+    pool.close()
+
+
+def test_pool_times_out_when_exhausted(tmp_path):
+    from db import ConnectionPool
+    pool = ConnectionPool(tmp_path / "timeout.db", size=1)
+    held = pool.acquire()
+    with pytest.raises(TimeoutError):
+        pool.acquire(timeout=0.01)
+    pool.release(held)
+    pool.close()
+
+
+def test_pool_rolls_back_failed_transaction(tmp_path):
+    from db import init_db, get_board, get_connection
+    path = tmp_path / "rollback.db"
+    init_db(path)
+    with pytest.raises(RuntimeError):
+        with get_connection(path) as conn:
+            conn.execute("DELETE FROM cards")
+            raise RuntimeError("boom")
+    assert len(get_board("user", path)["cards"]) == 8
+
+
+# ── card routes ───────────────────────────────────────────────────────────────
+
+def test_create_card_appends_to_column(tmp_path):
+    client = make_client(tmp_path / "test.db")
+    res = client.post("/api/board/cards", json={"columnId": "col-review", "title": "New", "details": "d"})
+    assert res.status_code == 201
+    card = res.json()
+    assert card["title"] == "New"
+    board = client.get("/api/board").json()
+    assert board["cards"][card["id"]]["details"] == "d"
+    assert board["columns"][3]["cardIds"] == ["card-6", card["id"]]
+
+
+def test_create_card_at_index_with_client_id(tmp_path):
+    client = make_client(tmp_path / "test.db")
+    res = client.post("/api/board/cards", json={"columnId": "col-backlog", "title": "Top", "id": "c-top", "index": 0})
+    assert res.status_code == 201
+    board = client.get("/api/board").json()
+    assert board["columns"][0]["cardIds"] == ["c-top", "card-1", "card-2"]
+
+
+def test_create_card_rejects_duplicate_id_and_unknown_column(tmp_path):
+    client = make_client(tmp_path / "test.db")
+    assert client.post("/api/board/cards", json={"columnId": "col-backlog", "title": "x", "id": "card-1"}).status_code == 409
+    assert client.post("/api/board/cards", json={"columnId": "nope", "title": "x"}).status_code == 404
+
+
+def test_patch_card_edits_fields(tmp_path):
+    client = make_client(tmp_path / "test.db")
+    res = client.patch("/api/board/cards/card-1", json={"title": "Renamed"})
+    assert res.status_code == 200
+    assert res.json() == {"id": "card-1", "title": "Renamed",
+                          "details": "Draft quarterly themes with impact statements and metrics."}
+    assert client.get("/api/board").json()["cards"]["card-1"]["title"] == "Renamed"
+
+
+def test_patch_card_moves_between_columns(tmp_path):
+    client = make_client(tmp_path / "test.db")
+    res = client.patch("/api/board/cards/card-1", json={"columnId": "col-progress", "index": 1})
+    assert res.status_code == 200
+    columns = client.get("/api/board").json()["columns"]
+    assert columns[0]["cardIds"] == ["card-2"]
+    assert columns[2]["cardIds"] == ["card-4", "card-1", "card-5"]
+
+
+def test_patch_card_moves_within_column(tmp_path):
+    client = make_client(tmp_path / "test.db")
+    client.patch("/api/board/cards/card-2", json={"columnId": "col-backlog", "index": 0})
+    assert client.get("/api/board").json()["columns"][0]["cardIds"] == ["card-2", "card-1"]
+
+
+def test_patch_card_errors(tmp_path):
+    client = make_client(tmp_path / "test.db")
+    assert client.patch("/api/board/cards/missing", json={"title": "x"}).status_code == 404
+    assert client.patch("/api/board/cards/card-1", json={"columnId": "nope"}).status_code == 404
+    assert client.patch("/api/board/cards/card-1", json={"index": 0}).status_code == 422
+
+
+def test_delete_card(tmp_path):
+    client = make_client(tmp_path / "test.db")
+    assert client.delete("/api/board/cards/card-1").status_code == 204
+    board = client.get("/api/board").json()
+    assert "card-1" not in board["cards"]
+    assert board["columns"][0]["cardIds"] == ["card-2"]
+    assert client.delete("/api/board/cards/card-1").status_code == 404
+
+
+# ── normalized storage ────────────────────────────────────────────────────────
+
+def _card_positions(path):
+    from db import get_connection
+    with get_connection(path) as conn:
+        return {r["id"]: (r["column_id"], r["position"]) for r in conn.execute("SELECT * FROM cards")}
+
+
+def test_move_rewrites_only_the_moved_card(tmp_path):
+    from db import init_db, update_card
+    path = tmp_path / "test.db"
+    init_db(path)
+    before = _card_positions(path)
+    update_card("user", "card-5", column_id="col-progress", index=0, path=path)
+    after = _card_positions(path)
+    changed = {card_id for card_id in before if before[card_id] != after[card_id]}
+    assert changed == {"card-5"}
+
+
+def test_set_board_writes_only_changed_rows(tmp_path):
+    import db
+    path = tmp_path / "test.db"
+    db.init_db(path)
+    board = db.get_board("user", path)
+    # Drag card-2 to the top of Backlog and rename card-7.
+    board["columns"][0]["cardIds"] = ["card-2", "card-1"]
+    board["cards"]["card-7"]["title"] = "Shipped"
+    with db.get_connection(path) as conn:
+        # Count table rows only, not the search index and history rows triggers add.
+        for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'").fetchall():
+            conn.execute(f"DROP TRIGGER {row['name']}")
+        before = conn.total_changes
+        db._write_board(conn, 1, board)
+        written = conn.total_changes - before
+    assert written == 2
+    assert db.get_board("user", path) == board
+
+
+def test_plan_positions_keeps_ordered_run():
+    from db import _plan_positions
+    current = {"a": 1.0, "b": 2.0, "c": 3.0, "d": 4.0}
+    planned = _plan_positions(["d", "a", "b", "c"], current)
+    assert [planned[k] for k in "abc"] == [1.0, 2.0, 3.0]
+    assert planned["d"] < planned["a"]
+
+    planned = _plan_positions(["a", "x", "y", "b"], {"a": 1.0, "b": 2.0})
+    assert 1.0 < planned["x"] < planned["y"] < 2.0
+
+
+def test_init_db_migrates_json_blob_boards(tmp_path):
+    import json
+    import sqlite3
+    from db import init_db, get_board, get_connection
+    path = tmp_path / "legacy.db"
+    legacy = sqlite3.connect(path)
+    legacy.executescript("""
+        CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT NOT NULL UNIQUE,
+                            created_at TEXT NOT NULL DEFAULT (datetime('now')));
+        CREATE TABLE boards (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                             user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+                             data TEXT NOT NULL, updated_at TEXT NOT NULL DEFAULT (datetime('now')));
+        INSERT INTO users (username) VALUES ('user');
+    """)
+    board = {
+        "columns": [{"id": "c1", "title": "One", "cardIds": ["b", "a"]}],
+        "cards": {"a": {"id": "a", "title": "A", "details": ""}, "b": {"id": "b", "title": "B", "details": "x"}},
+    }
+    legacy.execute("INSERT INTO boards (user_id, data) VALUES (1, ?)", (json.dumps(board),))
+    legacy.commit()
+    legacy.close()
+
+    init_db(path)
+    assert get_board("user", path) == board
+    with get_connection(path) as conn:
+        names = {row["name"] for row in conn.execute("PRAGMA table_info(boards)")}
+    assert "data" not in names
+
+
+def test_set_board_drops_dangling_and_duplicate_refs(tmp_path):
+    from db import init_db, get_board, set_board
+    path = tmp_path / "test.db"
+    init_db(path)
+    set_board("user", {
+        "columns": [
+            {"id": "c1", "title": "One", "cardIds": ["a", "ghost"]},
+            {"id": "c2", "title": "Two", "cardIds": ["a", "b"]},
+        ],
+        "cards": {"a": {"id": "a", "title": "A", "details": ""}, "b": {"id": "b", "title": "B", "details": ""}},
+    }, path)
+    columns = get_board("user", path)["columns"]
+    assert columns[0]["cardIds"] == ["a"]
+    assert columns[1]["cardIds"] == ["b"]
+
+
+# ── multiple boards and users ─────────────────────────────────────────────────
+
+def test_boards_are_listed_and_paginated(tmp_path):
+    client = make_client(tmp_path / "test.db")
+    for title in ("Two", "Three", "Four"):
+        assert client.post("/api/boards", json={"title": title}).status_code == 201
+    first = client.get("/api/boards", params={"limit": 2}).json()
+    assert [b["title"] for b in first["boards"]] == ["Board", "Two"]
+    rest = client.get("/api/boards", params={"limit": 2, "cursor": first["nextCursor"]}).json()
+    assert [b["title"] for b in rest["boards"]] == ["Three", "Four"]
+    assert rest["nextCursor"] is None
+    assert client.get("/api/boards", headers={"X-User": "nobody"}).status_code == 404
+
+
+def test_board_scoped_routes(tmp_path):
+    client = make_client(tmp_path / "test.db")
+    board = {"columns": [{"id": "c", "title": "C", "cardIds": ["x"]}],
+             "cards": {"x": {"id": "x", "title": "Roadmap draft", "details": ""}}}
+    board_id = client.post("/api/boards", json={"title": "Side", "board": board}).json()["id"]
+    base = f"/api/boards/{board_id}"
+
+    assert client.get(base).json() == board
+    assert client.post(f"{base}/cards", json={"columnId": "c", "id": "y", "title": "Y"}).status_code == 201
+    assert client.get(base).json()["columns"][0]["cardIds"] == ["x", "y"]
+    assert [r["id"] for r in client.get(f"{base}/search", params={"q": "roadmap"}).json()["results"]] == ["x"]
+    assert client.delete(f"{base}/cards/x").status_code == 204
+
+    # The default board is untouched.
+    assert "y" not in client.get("/api/board").json()["cards"]
+    assert client.get("/api/boards/1").json() == client.get("/api/board").json()
+
+
+def test_boards_are_private_to_their_user(tmp_path):
+    client = make_client(tmp_path / "test.db")
+    alice = {"X-User": "alice"}
+    board_id = client.post("/api/boards", json={"title": "Mine"}, headers=alice).json()["id"]
+    assert client.get(f"/api/boards/{board_id}", headers=alice).status_code == 200
+    assert client.get("/api/board", headers=alice).json() == {"columns": [], "cards": {}}
+    assert client.get(f"/api/boards/{board_id}").status_code == 404
+    assert client.put(f"/api/boards/{board_id}", json={"columns": [], "cards": {}}).status_code == 404
+    assert client.get("/api/boards/1", headers=alice).status_code == 404
+    assert client.get("/api/boards/nope").status_code == 404
+
+
+def test_init_db_records_schema_version(tmp_path):
+    import db
+    path = tmp_path / "test.db"
+    db.init_db(path)
+    db.init_db(path)
+    with db.get_connection(path) as conn:
+        assert db._schema_version(conn) == db.SCHEMA_VERSION
+        conn.execute(f"PRAGMA user_version = {db.SCHEMA_VERSION + 1}")
+    with pytest.raises(RuntimeError):
+        db.init_db(path)
+
+
+def test_init_db_on_a_current_database_only_reads(tmp_path):
+    import db
+    path = tmp_path / "test.db"
+    db.init_db(path)
+    with patch("db.migrate", side_effect=AssertionError("migrated again")):
+        db.init_db(path)
+
+    # A database missing its seed board still gets one.
+    with db.get_connection(path) as conn:
+        conn.execute("DELETE FROM boards")
+    db.init_db(path)
+    assert len(db.get_board("user", path)["cards"]) == 8
+
+
+def test_failed_migration_rolls_back(tmp_path, monkeypatch):
+    import db
+    path = tmp_path / "test.db"
+
+    def broken(conn):
+        conn.execute("CREATE TABLE half_done (id INTEGER)")
+        raise sqlite3.OperationalError("boom")
+
+    monkeypatch.setattr(db, "MIGRATIONS", (*db.MIGRATIONS, broken))
+    monkeypatch.setattr(db, "SCHEMA_VERSION", len(db.MIGRATIONS))
+    with pytest.raises(sqlite3.OperationalError):
+        db.init_db(path)
+    with db.get_connection(path) as conn:
+        assert db._schema_version(conn) == db.SCHEMA_VERSION - 1
+        assert conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'half_done'").fetchone() is None
+
+
+def test_board_lookups_use_indexes(tmp_path):
+    import db
+    path = tmp_path / "test.db"
+    db.init_db(path)
+    with db.get_connection(path) as conn:
+        plans = []
+        conn.set_trace_callback(lambda sql: plans.append(sql) if "boards b" in sql else None)
+        db._board_row(conn, "user")
+        db._board_row(conn, "user", 1)
+        conn.set_trace_callback(None)
+        assert len(plans) == 2
+        for sql in plans:
+            detail = " ".join(row["detail"] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}"))
+            assert "SCAN" not in detail, detail
+        detail = " ".join(row["detail"] for row in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM boards WHERE user_id = 1 AND id > 0 ORDER BY id"))
+        assert "boards_by_user" in detail
+
+
+# ── board change events (WebSocket) ───────────────────────────────────────────
+
+def test_board_events_push_writes(tmp_path):
+    with make_client(tmp_path / "test.db") as client:
+        with client.websocket_connect("/api/board/events") as ws:
+            assert ws.receive_json() == {"type": "version", "boardId": 1, "version": 1}
+            client.post("/api/board/cards", json={"columnId": "col-done", "title": "New"})
+            assert ws.receive_json() == {"type": "changed", "boardId": 1, "version": 2}
+            board = client.get("/api/board").json()
+            client.put("/api/board", json=board)
+            assert ws.receive_json() == {"type": "changed", "boardId": 1, "version": 3}
+
+
+def test_board_events_are_per_board(tmp_path):
+    with make_client(tmp_path / "test.db") as client:
+        other = client.post("/api/boards", json={"title": "Other"}).json()["id"]
+        with client.websocket_connect(f"/api/boards/{other}/events") as ws:
+            assert ws.receive_json()["version"] == 1
+            client.delete("/api/board/cards/card-1")   # board 1, not watched
+            client.put(f"/api/boards/{other}", json={"columns": [], "cards": {}})
+            assert ws.receive_json() == {"type": "changed", "boardId": other, "version": 2}
+
+
+def test_board_events_reject_unknown_board(tmp_path):
+    from starlette.websockets import WebSocketDisconnect
+    with make_client(tmp_path / "test.db") as client:
+        with pytest.raises(WebSocketDisconnect) as e:
+            with client.websocket_connect("/api/board/events", headers={"X-User": "nobody"}):
+                pass
+        assert e.value.code == 1008
+
+
+# ── board history ─────────────────────────────────────────────────────────────
+
+def _edit_cards(client, count):
+    """Make count rounds of card edits; return {version: board} after each round."""
+    boards = {1: client.get("/api/board").json()}
+    for n in range(count):
+        client.patch("/api/board/cards/card-1", json={"title": f"Edit {n}"})
+        if n % 3 == 2:
+            client.patch("/api/board/cards/card-2", json={"columnId": "col-done", "index": 0})
+            client.patch("/api/board/cards/card-2", json={"columnId": "col-backlog"})
+        board = client.get("/api/board")
+        boards[int(board.headers["ETag"].strip('"'))] = board.json()
+    return boards
+
+
+def test_history_lists_and_rebuilds_every_version(tmp_path):
+    client = make_client(tmp_path / "test.db")
+    boards = _edit_cards(client, 4)
+    history = client.get("/api/board/history").json()
+    versions = [r["version"] for r in history["revisions"]]
+    assert versions == sorted(range(1, max(boards) + 1), reverse=True)
+    assert history["revisions"][-1]["kind"] == "snapshot"
+    assert {r["kind"] for r in history["revisions"][:-1]} == {"delta"}
+    for version, board in boards.items():
+        assert client.get(f"/api/board/history/{version}").json() == board
+    assert client.get("/api/board/history/999").status_code == 404
+
+    page = client.get("/api/board/history", params={"limit": 2}).json()
+    older = client.get("/api/board/history", params={"limit": 2, "cursor": page["nextCursor"]}).json()
+    assert [r["version"] for r in page["revisions"] + older["revisions"]] == versions[:4]
+
+
+def test_restore_writes_old_board_as_new_version(tmp_path):
+    client = make_client(tmp_path / "test.db")
+    seed = client.get("/api/board").json()
+    client.delete("/api/board/cards/card-1")
+    client.post("/api/board/cards", json={"columnId": "col-done", "title": "Later"})
+
+    assert client.post("/api/board/history/1/restore", headers={"If-Match": '"1"'}).status_code == 409
+    restored = client.post("/api/board/history/1/restore", headers={"If-Match": '"3"'})
+    assert restored.status_code == 204
+    assert restored.headers["ETag"] == '"4"'
+    assert client.get("/api/board").json() == seed
+    assert client.get("/api/board/history/3").json() != seed   # still in the log
+    assert client.post("/api/board/history/99/restore").status_code == 404
+
+
+def test_history_snapshot_interval_bounds_rebuilds(tmp_path, monkeypatch):
+    import db
+    monkeypatch.setattr(db, "HISTORY_SNAPSHOT_INTERVAL", 4)
+    client = make_client(tmp_path / "test.db")
+    boards = _edit_cards(client, 12)
+    with db.get_connection(tmp_path / "test.db") as conn:
+        rows = conn.execute("SELECT version, base FROM board_revisions WHERE board_id = 1").fetchall()
+    assert all(row["version"] - row["base"] < 4 for row in rows)
+    assert sum(row["version"] == row["base"] for row in rows) >= len(rows) // 4
+    for version, board in boards.items():
+        assert client.get(f"/api/board/history/{version}").json() == board
+
+
+def test_history_retention_keeps_a_snapshot_first(tmp_path, monkeypatch):
+    import db
+    monkeypatch.setattr(db, "HISTORY_SNAPSHOT_INTERVAL", 3)
+    monkeypatch.setattr(db, "HISTORY_MAX_REVISIONS", 5)
+    client = make_client(tmp_path / "test.db")
+    boards = _edit_cards(client, 15)
+    revisions = client.get("/api/board/history", params={"limit": 200}).json()["revisions"]
+    assert 5 <= len(revisions) < 5 + 3
+    assert revisions[-1]["kind"] == "snapshot"
+    for revision in revisions:
+        if revision["version"] in boards:
+            assert client.get(f"/api/board/history/{revision['version']}").json() == boards[revision["version"]]
+    assert client.get("/api/board/history/1").status_code == 404
+
+
+def test_history_deltas_are_small(tmp_path):
+    client = make_client(tmp_path / "test.db")
+    board = client.get("/api/board").json()
+    for n in range(500):
+        board["cards"][f"bulk-{n}"] = {"id": f"bulk-{n}", "title": f"Card {n}", "details": "x" * 40}
+        board["columns"][n % 5]["cardIds"].append(f"bulk-{n}")
+    client.put("/api/board", json=board)
+    client.patch("/api/board/cards/bulk-7", json={"title": "Renamed"})
+    client.patch("/api/board/cards/bulk-8", json={"columnId": "col-done", "index": 0})
+    revisions = client.get("/api/board/history", params={"limit": 3}).json()["revisions"]
+    assert all(r["size"] * 20 < revisions[2]["size"] for r in revisions[:2])
+
+
+def test_history_migration_snapshots_existing_boards(tmp_path):
+    import db
+    path = tmp_path / "test.db"
+    db.init_db(path)
+    db.delete_card("user", "card-1", path)
+    with db.get_connection(path) as conn:
+        triggers = conn.execute(
+            "SELECT name FROM sqlite_master WHERE name LIKE '%history%' OR name LIKE 'cards_stats%'"
+        ).fetchall()
+        for row in triggers:
+            conn.execute(f"DROP TRIGGER {row['name']}")
+        conn.execute("DROP TABLE board_revisions")
+        conn.execute("DROP TABLE board_changes")
+        conn.execute("DROP TABLE jobs")
+        conn.execute("DROP TABLE board_stats")
+        conn.execute("DROP INDEX cards_by_update")
+        conn.execute("ALTER TABLE boards DROP COLUMN integrity")
+        conn.execute("PRAGMA user_version = 2")
+    db.init_db(path)
+    assert db.get_revision("user", 2, path) == db.get_board("user", path)
+    assert db.get_revision("user", 1, path) is None
+
+
+# ── bulk import / export ──────────────────────────────────────────────────────
+
+def test_export_and_import_routes(tmp_path):
+    client = make_client(tmp_path / "test.db")
+    res = client.get("/api/board/export", params={"format": "csv"})
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/csv")
+    assert res.headers["content-disposition"] == 'attachment; filename="board-1.csv"'
+    assert res.headers["etag"] == '"1"'
+    copy = client.post("/api/boards", json={"title": "Copy"}).json()
+
+    res = client.post(
+        f"/api/boards/{copy['id']}/import", params={"format": "csv", "mode": "replace"},
+        content=res.content,
+    )
+    assert res.status_code == 200
+    assert res.json()["cards"] == 8
+    assert client.get(f"/api/boards/{copy['id']}").json() == client.get("/api/board").json()
+
+    res = client.post("/api/board/import", content=b'{"type": "card"}\n')
+    assert res.status_code == 422
+    assert res.json()["detail"]["line"] == 1
+    assert client.get("/api/board/export", params={"format": "xml"}).status_code == 422
+
+
+# ── board stats ───────────────────────────────────────────────────────────────
+
+def test_board_stats_count_cards_and_list_recent_ones(tmp_path):
+    import db
+    client = make_client(tmp_path / "test.db")
+    with db.get_connection(tmp_path / "test.db") as conn:
+        conn.execute("UPDATE cards SET updated_at = datetime('now', '-1 hour')")
+    client.patch("/api/board/cards/card-3", json={"title": "Touched last"})
+    res = client.get("/api/board/stats", params={"recent": 2})
+    assert res.status_code == 200
+    stats = res.json()
+    assert stats["cards"] == 8
+    assert [c["cards"] for c in stats["columns"]] == [2, 1, 2, 1, 2]
+    assert stats["recent"][0]["id"] == "card-3" and len(stats["recent"]) == 2
+    assert stats["integrity"]["ok"]
+
+    again = client.get("/api/board/stats", headers={"If-None-Match": res.headers["ETag"]})
+    assert again.status_code == 304
+    assert client.get("/api/boards/99/stats").status_code == 404
+
+
+def test_board_stats_report_references_dropped_by_the_last_write(tmp_path):
+    client = make_client(tmp_path / "test.db")
+    client.put("/api/board", json={
+        "columns": [
+            {"id": "a", "title": "A", "cardIds": ["c-1", "ghost", "c-1"]},
+            {"id": "a", "title": "A again", "cardIds": []},
+        ],
+        "cards": {"c-1": {"id": "c-1", "title": "One"}, "c-2": {"id": "c-2", "title": "Unlisted"}},
+    })
+    integrity = client.get("/api/board/stats").json()["integrity"]
+    assert not integrity["ok"]
+    assert integrity["danglingCardIds"] == {"count": 1, "ids": ["ghost"]}
+    assert integrity["duplicateCardIds"] == {"count": 1, "ids": ["c-1"]}
+    assert integrity["duplicateColumnIds"] == {"count": 1, "ids": ["a"]}
+    assert integrity["unlistedCards"] == 1
+
+    client.put("/api/board", json=_SAMPLE_BOARD)
+    assert client.get("/api/board/stats").json()["integrity"]["ok"]
+
+
+def test_replace_import_clears_the_integrity_report(tmp_path):
+    client = make_client(tmp_path / "test.db")
+    client.put("/api/board", json={
+        "columns": [{"id": "a", "title": "A", "cardIds": ["ghost"]}], "cards": {},
+    })
+    assert not client.get("/api/board/stats").json()["integrity"]["ok"]
+    clean = (
+        b'{"type": "column", "id": "a", "title": "A"}\n'
+        b'{"type": "card", "id": "c-1", "columnId": "a", "title": "One"}\n'
+    )
+    res = client.post("/api/board/import", params={"mode": "replace"}, content=clean)
+    assert res.status_code == 200
+    integrity = client.get("/api/board/stats").json()["integrity"]
+    assert integrity["ok"]
+    assert integrity["danglingCardIds"] == {"count": 0, "ids": []}
+
+
+def test_board_stats_follow_every_write_path(tmp_path):
+    import db
+    path = tmp_path / "test.db"
+    client = make_client(path)
+    client.post("/api/board/cards", json={"columnId": "col-done", "title": "New"})
+    client.patch("/api/board/cards/card-1", json={"columnId": "col-review"})
+    client.delete("/api/board/cards/card-2")
+    etag = client.get("/api/board").headers["ETag"]
+    client.patch("/api/board", json=[{"op": "remove", "path": "/columns/4"}], headers={"If-Match": etag})
+    client.post("/api/board/history/1/restore")
+    client.post("/api/board/import", params={"mode": "append"},
+                content=b'{"type": "card", "id": "imp", "columnId": "col-backlog", "title": "I"}\n')
+
+    stats = client.get("/api/board/stats").json()
+    with db.get_connection(path) as conn:
+        expected = {
+            row["column_id"] or "": row["n"]
+            for row in conn.execute("SELECT column_id, count(*) AS n FROM cards GROUP BY column_id")
+        }
+        detail = " ".join(row["detail"] for row in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM cards WHERE board_id = 1 "
+            "ORDER BY updated_at DESC, pk DESC LIMIT 5"))
+    assert {c["id"]: c["cards"] for c in stats["columns"] if c["cards"]} == expected
+    assert stats["cards"] == sum(expected.values())
+    assert "cards_by_update" in detail and "TEMP B-TREE" not in detail
+
+
+# ── card search ───────────────────────────────────────────────────────────────
+
+def test_search_ranks_title_matches_first(tmp_path):
+    client = make_client(tmp_path / "test.db")
+    client.post("/api/board/cards", json={
+        "columnId": "col-backlog", "id": "notes", "title": "Planning notes",
+        "details": "Collect open questions about the roadmap before the review.",
+    })
+    results = client.get("/api/board/search", params={"q": "roadmap"}).json()["results"]
+    assert [r["id"] for r in results] == ["card-1", "notes"]   # title match first
+    assert results[0]["score"] > results[1]["score"]
+    assert results[0]["columnId"] == "col-backlog"
+
+
+def test_search_matches_prefixes_and_ignores_query_syntax(tmp_path):
+    client = make_client(tmp_path / "test.db")
+    ids = lambda q: {r["id"] for r in client.get("/api/board/search", params={"q": q}).json()["results"]}
+    assert ids("onboard") == {"card-8"}
+    assert ids("ship mark") == {"card-7"}
+    assert ids('mark* ("') == {"card-7"}
+    assert ids("Café") == set()
+    assert client.get("/api/board/search", params={"q": "!!"}).json() == {"results": [], "nextCursor": None}
+
+
+def test_search_paginates_with_cursor(tmp_path):
+    client = make_client(tmp_path / "test.db")
+    for n in range(5):
+        client.post("/api/board/cards", json={"columnId": "col-done", "title": f"Widget {n}"})
+    seen, cursor = [], None
+    while True:
+        params = {"q": "widget", "limit": 2, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/api/board/search", params=params).json()
+        assert len(page["results"]) <= 2
+        seen += [r["id"] for r in page["results"]]
+        cursor = page["nextCursor"]
+        if cursor is None:
+            break
+    assert len(seen) == len(set(seen)) == 5
+    assert client.get("/api/board/search", params={"q": "x", "cursor": "nope"}).status_code == 400
+    assert client.get("/api/board/search", params={"q": "x", "limit": 0}).status_code == 422
+
+
+def test_search_index_follows_writes(tmp_path):
+    client = make_client(tmp_path / "test.db")
+    search = lambda q: [r["id"] for r in client.get("/api/board/search", params={"q": q}).json()["results"]]
+    client.patch("/api/board/cards/card-7", json={"title": "Launch landing page"})
+    assert search("marketing") == []
+    assert search("landing") == ["card-7"]
+
+    board = client.get("/api/board").json()
+    board["cards"]["card-3"]["details"] = "Zeppelin"
+    board["columns"][1]["cardIds"].append("new")
+    board["cards"]["new"] = {"id": "new", "title": "Zebra", "details": ""}
+    client.put("/api/board", json=board)
+    assert search("ze") == ["new", "card-3"]
+
+    client.delete("/api/board/cards/new")
+    assert search("zebra") == []
+
+
+def test_search_is_scoped_to_the_users_board(tmp_path):
+    import db
+    path = tmp_path / "test.db"
+    db.init_db(path)
+    with db.get_connection(path) as conn:
+        conn.execute("INSERT INTO users (username) VALUES ('other')")
+        conn.execute("INSERT INTO boards (user_id) SELECT id FROM users WHERE username = 'other'")
+    db.set_board("other", {
+        "columns": [{"id": "c", "title": "C", "cardIds": ["x"]}],
+        "cards": {"x": {"id": "x", "title": "Roadmap", "details": ""}},
+    }, path)
+    assert [r["id"] for r in db.search_cards("user", "roadmap", path=path)["results"]] == ["card-1"]
+    assert [r["id"] for r in db.search_cards("other", "roadmap", path=path)["results"]] == ["x"]
+    assert db.search_cards("nobody", "roadmap", path=path) is None
+
+
+def test_init_db_indexes_existing_cards(tmp_path):
+    import sqlite3
+    import db
+    path = tmp_path / "legacy.db"
+    legacy = sqlite3.connect(path)
+    legacy.executescript("""
+        CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT NOT NULL UNIQUE,
+                            created_at TEXT NOT NULL DEFAULT (datetime('now')));
+        CREATE TABLE boards (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL,
+                             version INTEGER NOT NULL DEFAULT 1,
+                             updated_at TEXT NOT NULL DEFAULT (datetime('now')));
+        CREATE TABLE cards (board_id INTEGER NOT NULL, id TEXT NOT NULL, column_id TEXT,
+                            title TEXT NOT NULL, details TEXT NOT NULL DEFAULT '', position REAL,
+                            updated_at TEXT NOT NULL DEFAULT (datetime('now')), UNIQUE (board_id, id));
+        INSERT INTO users (username) VALUES ('user');
+        INSERT INTO boards (user_id) VALUES (1);
+        INSERT INTO cards (board_id, id, column_id, title, position) VALUES (1, 'a', 'c', 'Close sprint', 1);
+    """)
+    legacy.close()
+    db.init_db(path)
+    assert [r["id"] for r in db.search_cards("user", "sprint", path=path)["results"]] == ["a"]
+
+
 # ── POST /api/ai/test ─────────────────────────────────────────────────────────
 
 def test_ai_test_returns_response(tmp_path):
     client = make_client(tmp_path / "test.db")
-    with patch("main.ai_query", return_value="4") as mock_query:
+    with patch("main.ai_query", new_callable=AsyncMock, return_value="4") as mock_query:
         response = client.post("/api/ai/test", json={"prompt": "2+2"})
     assert response.status_code == 200
     assert response.json() == {"response": "4"}
-    mock_query.assert_called_once_with("2+2")
+    mock_query.assert_called_once_with("2+2", use_cache=True, store=True)
 
 
 def test_ai_test_uses_default_prompt(tmp_path):
     client = make_client(tmp_path / "test.db")
-    with patch("main.ai_query", return_value="4"):
+    with patch("main.ai_query", new_callable=AsyncMock, return_value="4"):
         response = client.post("/api/ai/test", json={})
     assert response.status_code == 200
     assert "response" in response.json()
@@ -166,15 +1051,30 @@ def test_ai_test_uses_default_prompt(tmp_path):
 
 def test_ai_test_missing_api_key_returns_500(tmp_path):
     client = make_client(tmp_path / "test.db")
-    with patch("main.ai_query", side_effect=ValueError("OPENROUTER_API_KEY environment variable is not set")):
+    with patch("main.ai_query", new_callable=AsyncMock, side_effect=ValueError("OPENROUTER_API_KEY environment variable is not set")):
         response = client.post("/api/ai/test", json={"prompt": "hello"})
     assert response.status_code == 500
     assert "OPENROUTER_API_KEY" in response.json()["detail"]
 
 
+def test_ai_test_honours_cache_control_no_cache(tmp_path):
+    client = make_client(tmp_path / "test.db")
+    with patch("main.ai_query", new_callable=AsyncMock, return_value="4") as mock_query:
+        client.post("/api/ai/test", json={"prompt": "2+2"}, headers={"Cache-Control": "no-cache"})
+    mock_query.assert_called_once_with("2+2", use_cache=False, store=True)
+    assert "hit_rate" in client.get("/api/metrics").json()["ai_cache"]
+
+
+def test_ai_test_honours_cache_control_no_store(tmp_path):
+    client = make_client(tmp_path / "test.db")
+    with patch("main.ai_query", new_callable=AsyncMock, return_value="4") as mock_query:
+        client.post("/api/ai/test", json={"prompt": "2+2"}, headers={"Cache-Control": "max-age=0, No-Store"})
+    mock_query.assert_called_once_with("2+2", use_cache=False, store=False)
+
+
 def test_ai_test_network_error_returns_502(tmp_path):
     client = make_client(tmp_path / "test.db")
-    with patch("main.ai_query", side_effect=RuntimeError("connection refused")):
+    with patch("main.ai_query", new_callable=AsyncMock, side_effect=RuntimeError("connection refused")):
         response = client.post("/api/ai/test", json={"prompt": "hello"})
     assert response.status_code == 502
     assert response.json()["detail"] == "AI service unavailable"
@@ -183,6 +1083,7 @@ def test_ai_test_network_error_returns_502(tmp_path):
 # ── ai module unit tests ──────────────────────────────────────────────────────
 
 def test_ai_query_calls_openai_client(monkeypatch):
+    import asyncio
     import ai as ai_module
 
     monkeypatch.setenv("OPENROUTER_API_KEY", "test-key")
@@ -191,10 +1092,10 @@ def test_ai_query_calls_openai_client(monkeypatch):
     mock_response.choices[0].message.content = "4"
 
     mock_client = MagicMock()
-    mock_client.chat.completions.create.return_value = mock_response
+    mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
 
     with patch.object(ai_module, "get_client", return_value=mock_client):
-        result = ai_module.ai_query("2+2")
+        result = asyncio.run(ai_module.ai_query("2+2"))
 
     assert result == "4"
     mock_client.chat.completions.create.assert_called_once_with(
@@ -227,7 +1128,7 @@ _SAMPLE_BOARD = {
 
 def test_ai_chat_returns_response(tmp_path):
     client = make_client(tmp_path / "test.db")
-    with patch("main.ai_chat", return_value={"response": "You have 1 card.", "board": None}):
+    with patch("main.ai_chat", new_callable=AsyncMock, return_value={"response": "You have 1 card.", "board": None}):
         res = client.post("/api/ai/chat", json={
             "board": _SAMPLE_BOARD,
             "message": "What's on my board?",
@@ -246,7 +1147,7 @@ def test_ai_chat_returns_board_update(tmp_path):
         },
     }
     client = make_client(tmp_path / "test.db")
-    with patch("main.ai_chat", return_value={"response": "Added a card.", "board": updated_board}):
+    with patch("main.ai_chat", new_callable=AsyncMock, return_value={"response": "Added a card.", "board": updated_board}):
         res = client.post("/api/ai/chat", json={
             "board": _SAMPLE_BOARD,
             "message": "Add a new task called 'New task'",
@@ -260,7 +1161,7 @@ def test_ai_chat_returns_board_update(tmp_path):
 
 def test_ai_chat_passes_history(tmp_path):
     client = make_client(tmp_path / "test.db")
-    with patch("main.ai_chat", return_value={"response": "ok", "board": None}) as mock:
+    with patch("main.ai_chat", new_callable=AsyncMock, return_value={"response": "ok", "board": None}) as mock:
         client.post("/api/ai/chat", json={
             "board": _SAMPLE_BOARD,
             "message": "follow-up",
@@ -277,21 +1178,75 @@ def test_ai_chat_passes_history(tmp_path):
 
 def test_ai_chat_missing_key_returns_500(tmp_path):
     client = make_client(tmp_path / "test.db")
-    with patch("main.ai_chat", side_effect=ValueError("OPENROUTER_API_KEY environment variable is not set")):
+    with patch("main.ai_chat", new_callable=AsyncMock, side_effect=ValueError("OPENROUTER_API_KEY environment variable is not set")):
         res = client.post("/api/ai/chat", json={"board": _SAMPLE_BOARD, "message": "hi"})
     assert res.status_code == 500
 
 
 def test_ai_chat_network_error_returns_502(tmp_path):
     client = make_client(tmp_path / "test.db")
-    with patch("main.ai_chat", side_effect=RuntimeError("network error")):
+    with patch("main.ai_chat", new_callable=AsyncMock, side_effect=RuntimeError("network error")):
         res = client.post("/api/ai/chat", json={"board": _SAMPLE_BOARD, "message": "hi"})
     assert res.status_code == 502
 
 
+# ── AI jobs ───────────────────────────────────────────────────────────────────
+
+def _wait_for_job(client, job_id, timeout=5.0):
+    import time
+    deadline = time.monotonic() + timeout
+    while True:
+        job = client.get(f"/api/jobs/{job_id}").json()
+        if job["status"] in ("succeeded", "failed", "cancelled") or time.monotonic() > deadline:
+            return job
+        time.sleep(0.02)
+
+
+def test_chat_job_applies_its_edits_when_it_finishes(tmp_path):
+    from board_ops import apply_operations
+    operations = [{"op": "move_card", "id": "card-1", "column": "col-done"}]
+
+    async def fake_chat(board, message, history, **kwargs):
+        return {"response": "Moved", "board": apply_operations(board, operations), "operations": operations}
+
+    with make_client(tmp_path / "test.db") as client, patch("main.ai_chat", side_effect=fake_chat):
+        before = int(client.get("/api/board").headers["etag"].strip('"'))
+        res = client.post("/api/board/jobs", json={"message": "Move card 1 to done"})
+        assert res.status_code == 202
+        assert res.headers["location"] == f"/api/jobs/{res.json()['id']}"
+        job = _wait_for_job(client, res.json()["id"])
+        assert job["status"] == "succeeded"
+        assert job["result"]["response"] == "Moved"
+        assert job["version"] == before + 1
+
+        board = client.get("/api/board").json()
+        assert "card-1" in next(c for c in board["columns"] if c["id"] == "col-done")["cardIds"]
+        events = client.get(f"/api/jobs/{job['id']}/events").text
+        assert events.startswith("event: job") and '"status":"succeeded"' in events
+        assert [j["id"] for j in client.get("/api/jobs").json()["jobs"]] == [job["id"]]
+        assert client.delete(f"/api/jobs/{job['id']}").status_code == 409
+        assert client.get(f"/api/jobs/{job['id']}", headers={"X-User": "mallory"}).status_code == 404
+
+
+def test_chat_job_can_be_cancelled(tmp_path):
+    import asyncio
+
+    async def slow_chat(board, message, history, **kwargs):
+        await asyncio.sleep(30)
+
+    with make_client(tmp_path / "test.db") as client, patch("main.ai_chat", side_effect=slow_chat):
+        job = client.post("/api/board/jobs", json={"message": "Re-triage the backlog"}).json()
+        res = client.delete(f"/api/jobs/{job['id']}")
+        assert res.status_code == 200
+        assert res.json()["status"] == "cancelled"
+        assert client.delete("/api/jobs/nope").status_code == 404
+        assert client.post("/api/boards/999/jobs", json={"message": "hi"}).status_code == 404
+
+
 # ── ai_chat unit tests ────────────────────────────────────────────────────────
 
 def test_ai_chat_builds_correct_messages(monkeypatch):
+    import asyncio
     import ai as ai_module
     import json
 
@@ -303,17 +1258,18 @@ def test_ai_chat_builds_correct_messages(monkeypatch):
         "board": None,
     })
     mock_client = MagicMock()
-    mock_client.chat.completions.create.return_value = mock_response
+    mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
 
     with patch.object(ai_module, "get_client", return_value=mock_client):
-        result = ai_module.ai_chat(
+        result = asyncio.run(ai_module.ai_chat(
             _SAMPLE_BOARD,
             "What's on my board?",
             [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "hello"}],
-        )
+        ))
 
     assert result["response"] == "You have 1 card."
     assert result["board"] is None
+    assert result["promptTokens"] > 0
 
     call_messages = mock_client.chat.completions.create.call_args[1]["messages"]
     assert call_messages[0]["role"] == "system"
@@ -322,3 +1278,219 @@ def test_ai_chat_builds_correct_messages(monkeypatch):
     assert call_messages[2]["role"] == "assistant"  # history[1]
     assert call_messages[3]["role"] == "user"       # current message
     assert call_messages[3]["content"] == "What's on my board?"
+
+
+# ── load: board reads while chats are in flight ───────────────────────────────
+
+def _p99(samples):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+
+
+def test_board_reads_keep_p99_while_chats_in_flight(tmp_path):
+    import asyncio
+    import time
+    import httpx
+
+    make_client(tmp_path / "test.db")
+    import main as main_module
+
+    chat_seconds = 1.0
+
+    async def slow_chat(board, message, history, use_cache=True, store=True):
+        await asyncio.sleep(chat_seconds)  # stands in for a slow LLM round-trip
+        return {"response": "done", "board": None}
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=main_module.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            async def timed_read():
+                started = time.perf_counter()
+                res = await client.get("/api/board")
+                assert res.status_code == 200
+                return time.perf_counter() - started
+
+            idle = [await timed_read() for _ in range(50)]
+
+            chats = [
+                asyncio.create_task(client.post("/api/ai/chat", json={"board": _SAMPLE_BOARD, "message": "hi"}))
+                for _ in range(4)
+            ]
+            await asyncio.sleep(0.05)
+            loaded = [await timed_read() for _ in range(50)]
+            in_flight = sum(not chat.done() for chat in chats)
+            responses = await asyncio.gather(*chats)
+        return idle, loaded, in_flight, responses
+
+    with patch("main.ai_chat", new=slow_chat):
+        idle, loaded, in_flight, responses = asyncio.run(scenario())
+
+    assert in_flight == 4
+    assert all(r.status_code == 200 for r in responses)
+    # A blocked event loop would push reads past the full chat latency.
+    assert _p99(loaded) < chat_seconds / 4
+    assert _p99(loaded) < max(_p99(idle) * 20, 0.1)
+
+
+# ── streaming chat ────────────────────────────────────────────────────────────
+
+def test_response_text_parser_handles_any_chunking():
+    import json
+    from ai import ResponseTextParser
+
+    text = 'Line one\nsaid "hi" \\ café 🎉 done'
+    raw = json.dumps({"board": {"columns": [{"response": "nested"}]}, "response": text})
+    for size in (1, 2, 3, 7, len(raw)):
+        parser = ResponseTextParser()
+        out = "".join(parser.feed(raw[i:i + size]) for i in range(0, len(raw), size))
+        assert out == text
+
+
+def test_response_text_parser_ignores_non_string_and_other_keys():
+    from ai import ResponseTextParser
+    parser = ResponseTextParser()
+    assert parser.feed('{"note": "response", "response": null, "board": null}') == ""
+
+
+def _stream_chunks(parts):
+    chunks = []
+    for part in parts:
+        chunk = MagicMock()
+        chunk.choices[0].delta.content = part
+        chunks.append(chunk)
+
+    async def stream():
+        for chunk in chunks:
+            yield chunk
+    return stream()
+
+
+def test_ai_chat_stream_yields_tokens_then_board(monkeypatch):
+    import asyncio
+    import ai as ai_module
+
+    parts = ['{"respo', 'nse": "Mov', 'ed it.", "opera', 'tions": [{"op": "delete_card", "id": "c-1"}]}']
+    mock_client = MagicMock()
+    mock_client.chat.completions.create = AsyncMock(return_value=_stream_chunks(parts))
+
+    async def collect():
+        events = await ai_module.ai_chat_stream(_SAMPLE_BOARD, "move it", [])
+        return [event async for event in events]
+
+    with patch.object(ai_module, "get_client", return_value=mock_client):
+        events = asyncio.run(collect())
+
+    assert [e["event"] for e in events] == ["token", "token", "board"]
+    assert "".join(e["data"]["text"] for e in events[:-1]) == "Moved it."
+    assert events[-1]["data"]["response"] == "Moved it."
+    assert events[-1]["data"]["board"] == {"columns": [{"id": "col-1", "title": "Todo", "cardIds": []}], "cards": {}}
+    assert mock_client.chat.completions.create.call_args[1]["stream"] is True
+
+
+def _parse_sse(text):
+    import json
+    events = []
+    for block in text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_ai_chat_stream_route_sends_sse(tmp_path):
+    client = make_client(tmp_path / "test.db")
+
+    async def events():
+        yield {"event": "token", "data": {"text": "Hel"}}
+        yield {"event": "token", "data": {"text": "lo"}}
+        yield {"event": "board", "data": {"response": "Hello", "board": None}}
+
+    with patch("main.ai_chat_stream", new_callable=AsyncMock, return_value=events()):
+        res = client.post("/api/ai/chat/stream", json={"board": _SAMPLE_BOARD, "message": "hi"})
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/event-stream")
+    assert _parse_sse(res.text) == [
+        ("token", {"text": "Hel"}),
+        ("token", {"text": "lo"}),
+        ("board", {"response": "Hello", "board": None}),
+    ]
+
+
+def test_ai_chat_stream_route_errors(tmp_path):
+    client = make_client(tmp_path / "test.db")
+    body = {"board": _SAMPLE_BOARD, "message": "hi"}
+    with patch("main.ai_chat_stream", new_callable=AsyncMock, side_effect=ValueError("OPENROUTER_API_KEY missing")):
+        assert client.post("/api/ai/chat/stream", json=body).status_code == 500
+
+    async def broken():
+        yield {"event": "token", "data": {"text": "Hi"}}
+        raise RuntimeError("upstream dropped")
+
+    with patch("main.ai_chat_stream", new_callable=AsyncMock, return_value=broken()):
+        res = client.post("/api/ai/chat/stream", json=body)
+    assert _parse_sse(res.text)[-1] == ("error", {"detail": "AI service unavailable"})
+
+
+# ── ai_chat operations ────────────────────────────────────────────────────────
+
+def _reply(payload):
+    import json
+    response = MagicMock()
+    response.choices[0].message.content = payload if isinstance(payload, str) else json.dumps(payload)
+    return response
+
+
+def test_ai_chat_applies_operations_to_board(monkeypatch):
+    import asyncio
+    import ai as ai_module
+
+    mock_client = MagicMock()
+    mock_client.chat.completions.create = AsyncMock(return_value=_reply({
+        "response": "Renamed and added.",
+        "operations": [
+            {"op": "update_card", "id": "c-1", "title": "Renamed"},
+            {"op": "add_card", "column": "col-1", "id": "c-2", "title": "Next", "index": 0},
+        ],
+    }))
+    with patch.object(ai_module, "get_client", return_value=mock_client):
+        result = asyncio.run(ai_module.ai_chat(_SAMPLE_BOARD, "do it", []))
+
+    assert result["board"]["columns"][0]["cardIds"] == ["c-2", "c-1"]
+    assert result["board"]["cards"]["c-1"]["title"] == "Renamed"
+    assert len(result["operations"]) == 2
+    assert mock_client.chat.completions.create.await_count == 1
+    assert "operations" in mock_client.chat.completions.create.call_args[1]["messages"][0]["content"]
+
+
+def test_ai_chat_falls_back_to_full_board_on_bad_operations(monkeypatch):
+    import asyncio
+    import ai as ai_module
+
+    full_board = {"columns": [{"id": "col-1", "title": "Todo", "cardIds": []}], "cards": {}}
+    mock_client = MagicMock()
+    mock_client.chat.completions.create = AsyncMock(side_effect=[
+        _reply({"response": "Moved.", "operations": [{"op": "move_card", "id": "ghost", "column": "col-1"}]}),
+        _reply({"response": "Cleared the board.", "board": full_board}),
+    ])
+    with patch.object(ai_module, "get_client", return_value=mock_client):
+        result = asyncio.run(ai_module.ai_chat(_SAMPLE_BOARD, "clear it", []))
+
+    assert result["response"] == "Cleared the board."
+    assert result["board"] == full_board
+    assert result["operations"] is None
+    second_prompt = mock_client.chat.completions.create.call_args_list[1][1]["messages"][0]["content"]
+    assert "COMPLETE board" in second_prompt
+
+
+def test_ai_chat_falls_back_on_unparseable_reply(monkeypatch):
+    import asyncio
+    import ai as ai_module
+
+    mock_client = MagicMock()
+    mock_client.chat.completions.create = AsyncMock(side_effect=[
+        _reply("{not json"),
+        _reply({"response": "Nothing to change.", "board": None}),
+    ])
+    with patch.object(ai_module, "get_client", return_value=mock_client):
+        result = asyncio.run(ai_module.ai_chat(_SAMPLE_BOARD, "hi", []))
+    assert result["response"] == "Nothing to change."
+    assert result["board"] is None
@@ -0,0 +1,73 @@
+import threading
+import time
+
+from metrics import Registry, route_template
+from profiler import SamplingProfiler
+
+
+def test_counter_and_histogram_render_prometheus_text():
+    registry = Registry()
+    requests = registry.counter("app_requests_total", "Requests.", ("route",))
+    latency = registry.histogram("app_seconds", "Latency.", ("route",), buckets=(0.1, 1.0))
+    requests.inc(route="/a")
+    requests.inc(2, route="/a")
+    latency.observe(0.05, route="/a")
+    latency.observe(0.5, route="/a")
+    registry.add_collector("app_cache", lambda: {"hits": 3, "persist": True, "name": "x"})
+
+    lines = registry.render().splitlines()
+    assert "# TYPE app_requests_total counter" in lines
+    assert 'app_requests_total{route="/a"} 3' in lines
+    assert 'app_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'app_seconds_bucket{route="/a",le="1.0"} 2' in lines
+    assert 'app_seconds_bucket{route="/a",le="+Inf"} 2' in lines
+    assert 'app_seconds_count{route="/a"} 2' in lines
+    assert "app_cache_hits 3" in lines
+    assert not any(line.startswith(("app_cache_persist", "app_cache_name")) for line in lines)
+
+
+def test_label_values_are_escaped():
+    registry = Registry()
+    registry.counter("c_total", "C.", ("call",)).inc(call='say "hi"\n')
+    assert 'c_total{call="say \\"hi\\"\\n"} 1' in registry.render()
+
+
+def test_route_template_restores_path_parameters():
+    scope = {
+        "path": "/api/boards/1/history/1",
+        "endpoint": object(),
+        "path_params": {"board_id": "1", "version": "1"},
+    }
+    assert route_template(scope) == "/api/boards/{board_id}/history/{version}"
+    scope = {"path": "/api/board/cards/cards", "endpoint": object(), "path_params": {"card_id": "cards"}}
+    assert route_template(scope) == "/api/board/cards/{card_id}"
+    assert route_template({"path": "/missing/42"}) == "other"
+
+
+def test_profiler_samples_other_threads_until_stopped():
+    stop = threading.Event()
+
+    def busy_worker():
+        while not stop.is_set():
+            sum(range(1000))
+
+    worker = threading.Thread(target=busy_worker)
+    worker.start()
+    profiler = SamplingProfiler()
+    profiler.start(0.001)
+    time.sleep(0.1)
+    profiler.stop()
+    stop.set()
+    worker.join()
+
+    stats = profiler.stats()
+    assert not stats["running"] and stats["samples"] > 0
+    lines = profiler.collapsed().splitlines()
+    assert any("test_metrics.py:busy_worker" in line for line in lines)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+    samples = stats["samples"]
+    time.sleep(0.02)
+    assert profiler.stats()["samples"] == samples
+    profiler.reset()
+    assert profiler.collapsed() == ""
@@ -0,0 +1,74 @@
+import json
+
+from prompt import (
+    build_chat_prompt,
+    compact_json,
+    count_tokens,
+    relevant_board,
+    restore_omitted,
+)
+
+
+def _board(n):
+    return {
+        "columns": [{"id": "col-1", "title": "Todo", "cardIds": [f"c-{i}" for i in range(n)]}],
+        "cards": {
+            f"c-{i}": {"id": f"c-{i}", "title": f"Task number {i}", "details": "Routine work " * 5}
+            for i in range(n)
+        },
+    }
+
+
+def test_board_is_sent_as_compact_json():
+    board = _board(3)
+    prompt = build_chat_prompt("SYSTEM", board, "hi", [], budget=10_000)
+    system = prompt.messages[0]["content"]
+    assert compact_json(board) in system
+    assert json.dumps(board, indent=2) not in system
+    assert prompt.cards_omitted == 0
+
+
+def test_small_board_and_history_are_kept_whole():
+    history = [{"role": "user", "content": "a"}, {"role": "assistant", "content": "b"}]
+    prompt = build_chat_prompt("SYSTEM", _board(2), "now", history, budget=10_000)
+    assert [m["content"] for m in prompt.messages[1:]] == ["a", "b", "now"]
+    assert prompt.turns_dropped == 0
+    assert prompt.tokens == sum(count_tokens(m["content"]) + 4 for m in prompt.messages)
+
+
+def test_large_board_keeps_relevant_cards_within_budget():
+    board = _board(500)
+    board["cards"]["c-250"]["title"] = "Migrate billing database"
+    sent, omitted = relevant_board(board, "what about the billing migration?", max_tokens=600)
+    assert "c-250" in sent["cards"]
+    assert omitted == 500 - len(sent["cards"])
+    assert omitted > 0
+    assert count_tokens(compact_json(sent)) <= 600
+    assert sent["columns"][0]["cardIds"] == [cid for cid in board["columns"][0]["cardIds"] if cid in sent["cards"]]
+
+
+def test_prompt_stays_within_budget_for_big_board_and_long_history():
+    history = [{"role": "user" if i % 2 == 0 else "assistant", "content": f"turn {i} " * 40} for i in range(60)]
+    prompt = build_chat_prompt("SYSTEM", _board(2000), "summarize", history, budget=3000)
+    assert prompt.tokens <= 3000
+    assert prompt.cards_omitted > 0
+    assert 0 < prompt.turns_dropped < 60
+    assert prompt.messages[-1] == {"role": "user", "content": "summarize"}
+    assert prompt.messages[-2]["content"].startswith("turn 59")
+    assert "Earlier in this conversation the user asked" in prompt.messages[0]["content"]
+
+
+def test_restore_omitted_puts_hidden_cards_back():
+    original = {
+        "columns": [{"id": "a", "title": "A", "cardIds": ["1", "2", "3"]}],
+        "cards": {k: {"id": k, "title": k, "details": ""} for k in "123"},
+    }
+    sent = {"columns": [{"id": "a", "title": "A", "cardIds": ["1", "3"]}], "cards": {"1": {}, "3": {}}}
+    returned = {
+        "columns": [{"id": "a", "title": "A", "cardIds": ["3", "1", "4"]}],
+        "cards": {"1": {}, "3": {}, "4": {"id": "4", "title": "new", "details": ""}},
+    }
+    merged = restore_omitted(original, sent, returned)
+    assert merged["columns"][0]["cardIds"] == ["3", "2", "1", "4"]
+    assert merged["cards"]["2"] == original["cards"]["2"]
+    assert set(merged["cards"]) == {"1", "2", "3", "4"}
@@ -0,0 +1,162 @@
+"""Board change fan-out: subscriptions, the hub, and RedisBroker against a stub server."""
+
+import asyncio
+import threading
+import time
+
+from pubsub import BoardHub, LocalBroker, RedisBroker, Subscription, _encode_command, _read_reply
+
+
+def _event(version, board_id=1):
+    return {"type": "changed", "boardId": board_id, "version": version}
+
+
+def test_subscription_overflow_collapses_to_resync():
+    async def scenario():
+        subscription = Subscription(1, buffer_size=3)
+        for version in range(1, 4):
+            subscription.offer(_event(version))
+        subscription.offer(_event(4))
+        assert subscription.overflows == 1
+        assert subscription.queue.qsize() == 1
+        assert await subscription.get() == {"type": "resync", "boardId": 1, "version": 4}
+
+    asyncio.run(scenario())
+
+
+def test_hub_delivers_to_subscribers_of_that_board_only():
+    async def scenario():
+        hub = BoardHub(LocalBroker())
+        await hub.start()
+        seen = []
+        hub.add_listener(lambda board_id, version: seen.append((board_id, version)))
+        one, two = hub.subscribe(1), hub.subscribe(2)
+        await hub.publish(_event(5))
+        assert await one.get() == _event(5)
+        assert two.queue.empty()
+        assert seen == [(1, 5)]
+
+        hub.unsubscribe(one)
+        await hub.publish(_event(6))
+        assert one.queue.empty()
+        assert hub.stats()["subscribers"] == 1
+        await hub.close()
+
+    asyncio.run(scenario())
+
+
+def test_publish_threadsafe_reaches_loop_within_milliseconds():
+    async def scenario():
+        hub = BoardHub(LocalBroker())
+        await hub.start()
+        subscription = hub.subscribe(1)
+        start = time.perf_counter()
+        threading.Thread(target=hub.publish_threadsafe, args=(1, 2)).start()
+        event = await asyncio.wait_for(subscription.get(), 1)
+        assert event == _event(2)
+        assert time.perf_counter() - start < 0.05
+        await hub.close()
+
+    asyncio.run(scenario())
+
+
+def test_publish_threadsafe_before_start_is_a_no_op():
+    BoardHub(LocalBroker()).publish_threadsafe(1, 2)
+
+
+# ── RedisBroker ───────────────────────────────────────────────────────────────
+
+class _StubRedis:
+    """Just enough of Redis for SUBSCRIBE and PUBLISH on one channel."""
+
+    def __init__(self):
+        self.subscribers: set[asyncio.StreamWriter] = set()
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        return f"redis://127.0.0.1:{self.server.sockets[0].getsockname()[1]}"
+
+    def drop_subscribers(self):
+        for writer in self.subscribers:
+            writer.close()
+        self.subscribers.clear()
+
+    async def _serve(self, reader, writer):
+        try:
+            while True:
+                command = await _read_reply(reader)
+                name = command[0].upper()
+                if name == b"SUBSCRIBE":
+                    self.subscribers.add(writer)
+                    writer.write(b"*3\r\n$9\r\nsubscribe\r\n" + _bulk(command[1]) + b":1\r\n")
+                elif name == b"PUBLISH":
+                    message = _encode_command(b"message", command[1], command[2])
+                    for subscriber in list(self.subscribers):
+                        subscriber.write(message)
+                    writer.write(b":%d\r\n" % len(self.subscribers))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+
+    async def close(self):
+        self.drop_subscribers()
+        self.server.close()
+        await self.server.wait_closed()
+
+
+def _bulk(data: bytes) -> bytes:
+    return b"$%d\r\n%s\r\n" % (len(data), data)
+
+
+def test_redis_broker_fans_out_across_workers():
+    async def scenario():
+        stub = _StubRedis()
+        url = await stub.start()
+        workers = [BoardHub(RedisBroker(url)), BoardHub(RedisBroker(url))]
+        for hub in workers:
+            await hub.start()
+        subscriptions = [hub.subscribe(1) for hub in workers]
+
+        await workers[0].publish(_event(3))
+        for subscription in subscriptions:
+            assert await asyncio.wait_for(subscription.get(), 1) == _event(3)
+
+        for hub in workers:
+            await hub.close()
+        await stub.close()
+
+    asyncio.run(scenario())
+
+
+def test_redis_broker_resubscribes_after_connection_loss():
+    async def scenario():
+        stub = _StubRedis()
+        url = await stub.start()
+        hub = BoardHub(RedisBroker(url))
+        await hub.start()
+        subscription = hub.subscribe(1)
+
+        stub.drop_subscribers()
+        for _ in range(100):
+            await asyncio.sleep(0.02)
+            if stub.subscribers:
+                break
+        await hub.publish(_event(9))
+        assert await asyncio.wait_for(subscription.get(), 1) == _event(9)
+
+        await hub.close()
+        await stub.close()
+
+    asyncio.run(scenario())
+
+
+def test_redis_broker_publish_failure_is_counted():
+    async def scenario():
+        hub = BoardHub(RedisBroker("redis://127.0.0.1:1"))
+        await hub.start()
+        await hub.publish(_event(1))
+        assert hub.stats()["publish_errors"] == 1
+        await hub.close()
+
+    asyncio.run(scenario())
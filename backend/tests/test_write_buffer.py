@@ -0,0 +1,93 @@
+"""Coalesced board saves: db.save_boards and the WriteBuffer in front of it."""
+
+import asyncio
+
+import pytest
+
+import db
+from db import VersionConflict
+from write_buffer import WriteBuffer
+
+
+def _board(title: str) -> dict:
+    return {"columns": [{"id": "col", "title": title, "cardIds": []}], "cards": {}}
+
+
+def test_save_boards_stores_only_the_last_write_but_versions_each(path):
+    _, version = db.get_board_version("user", path)
+    [outcomes] = db.save_boards([("user", None, [(_board("a"), None), (_board("b"), None)])], path)
+    assert outcomes == [version + 1, version + 2]
+    assert db.get_board("user", path) == _board("b")
+    revisions = db.list_revisions("user", path=path)["revisions"]
+    assert [(r["version"], r["kind"]) for r in revisions[:2]] == [(version + 2, "delta"), (version, "snapshot")]
+    assert db.get_revision("user", version + 2, path=path) == _board("b")
+    assert db.get_revision("user", version + 1, path=path) is None
+
+
+def test_save_boards_checks_if_match_as_if_applied_in_order(path):
+    _, version = db.get_board_version("user", path)
+    [outcomes] = db.save_boards([(
+        "user", None,
+        [(_board("first"), version), (_board("stale"), version), (_board("last"), None)],
+    )], path)
+    assert (outcomes[0], outcomes[2]) == (version + 1, version + 2)
+    assert isinstance(outcomes[1], VersionConflict) and outcomes[1].current == version + 2
+    assert db.get_board("user", path) == _board("last")
+
+    [[outcome]] = db.save_boards([("user", None, [(_board("x"), version)])], path)
+    assert isinstance(outcome, VersionConflict)
+    assert db.save_boards([("nobody", None, [(_board("x"), None)])], path) == [[None]]
+
+
+def test_buffer_coalesces_a_burst_into_one_commit(path):
+    async def scenario():
+        buffer = WriteBuffer(window=0.05)
+        versions = await asyncio.gather(
+            *(buffer.save("user", _board(f"drag {n}")) for n in range(10))
+        )
+        return buffer.stats(), versions
+
+    _, before = db.get_board_version("user", path)
+    stats, versions = asyncio.run(scenario())
+    assert versions == [before + n for n in range(1, 11)]
+    assert (stats["writes"], stats["commits"], stats["coalesced"]) == (10, 1, 9)
+    assert db.get_board("user", path) == _board("drag 9")
+
+
+def test_buffer_raises_conflicts_to_their_writer(path):
+    async def scenario():
+        buffer = WriteBuffer(window=0.01)
+        return await asyncio.gather(
+            buffer.save("user", _board("ok")),
+            buffer.save("user", _board("stale"), expected_version=0),
+            return_exceptions=True,
+        )
+
+    ok, stale = asyncio.run(scenario())
+    assert isinstance(stale, VersionConflict) and stale.current == ok
+
+
+def test_overwritten_write_cannot_if_match_over_the_newer_one(path):
+    async def scenario():
+        buffer = WriteBuffer(window=0.05)
+        return await asyncio.gather(buffer.save("user", _board("A")), buffer.save("user", _board("B")))
+
+    a, b = asyncio.run(scenario())
+    assert a < b
+    with pytest.raises(VersionConflict):
+        db.save_board("user", _board("A again"), expected_version=a, path=path)
+    assert db.save_board("user", _board("B again"), expected_version=b, path=path) == b + 1
+
+
+def test_close_commits_queued_writes(path):
+    async def scenario():
+        buffer = WriteBuffer(window=10)
+        save = asyncio.create_task(buffer.save("user", _board("queued")))
+        await asyncio.sleep(0)
+        save.cancel()   # the client went away; the write still lands
+        await buffer.close()
+        return buffer.stats()
+
+    stats = asyncio.run(scenario())
+    assert (stats["commits"], stats["queued"]) == (1, 0)
+    assert db.get_board("user", path) == _board("queued")
@@ -0,0 +1,131 @@
+"""Write-behind buffer that coalesces bursts of whole-board saves.
+
+The frontend sends a full PUT /api/board for every drag, rename and edit,
+often several within a few milliseconds. Instead of one transaction (and, at
+synchronous=FULL, one fsync) per request, saves wait up to WINDOW seconds in
+a per-board queue. db.save_boards then commits everything queued, for every
+board, in one transaction. Within a board only the newest accepted write is
+stored, because each one replaces the whole board. Every accepted write
+still gets its own version, so only the newest one's ETag matches the
+stored board and an If-Match based on an overwritten write conflicts.
+
+A save returns only after the transaction holding it has committed, so an
+acknowledged write is as durable as a direct one, and later reads see it.
+close() flushes whatever is queued; the app calls it on shutdown.
+"""
+
+import asyncio
+import os
+import time
+
+import metrics
+from db import VersionConflict, save_board, save_boards, run_db
+
+DEFAULT_WINDOW_MS = 10.0
+
+_Key = tuple[str, int | None]
+
+
+class WriteBuffer:
+    def __init__(self, window: float = DEFAULT_WINDOW_MS / 1000):
+        self.window = window
+        self._pending: dict[_Key, list[tuple[dict, int | None, asyncio.Future]]] = {}
+        self._flusher: asyncio.Task | None = None
+        self._timer: asyncio.Task | None = None
+        self._closing = False
+        self._writes = 0
+        self._commits = 0
+        self._coalesced = 0
+        self._conflicts = 0
+
+    async def save(
+        self,
+        username: str,
+        data: dict,
+        expected_version: int | None = None,
+        board_id: int | None = None,
+    ) -> int | None:
+        """Queue a whole-board write and return its version once committed.
+
+        Same contract as db.save_board: None if the user has no board, and
+        VersionConflict when expected_version is no longer current.
+        """
+        self._writes += 1
+        if self.window <= 0:
+            self._commits += 1
+            return await run_db(save_board, username, data, expected_version, board_id=board_id)
+        future = asyncio.get_running_loop().create_future()
+        self._pending.setdefault((username, board_id), []).append((data, expected_version, future))
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_loop())
+        # A client that goes away does not take its write with it.
+        return await asyncio.shield(future)
+
+    async def close(self) -> None:
+        """Commit everything queued now, without waiting out the window."""
+        self._closing = True
+        try:
+            if self._timer is not None:
+                self._timer.cancel()
+            if self._flusher is not None:
+                await self._flusher
+        finally:
+            self._closing = False
+
+    async def _flush_loop(self) -> None:
+        # The only task that commits, so batches reach the DB in order.
+        try:
+            while self._pending:
+                if not self._closing:
+                    self._timer = asyncio.create_task(asyncio.sleep(self.window))
+                    await asyncio.wait({self._timer})   # returns early if close() cancels it
+                    self._timer = None
+                await self._commit()
+        finally:
+            self._flusher = None
+
+    async def _commit(self) -> None:
+        pending, self._pending = self._pending, {}
+        batch = [
+            (username, board_id, [(data, expected) for data, expected, _ in writes])
+            for (username, board_id), writes in pending.items()
+        ]
+        queued = sum(len(writes) for writes in pending.values())
+        started = time.perf_counter()
+        try:
+            outcomes = await run_db(save_boards, batch)
+        except Exception as e:
+            for writes in pending.values():
+                for _, _, future in writes:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+        finally:
+            self._commits += 1
+            metrics.board_write_batch_seconds.observe(time.perf_counter() - started)
+            metrics.board_write_batch_size.observe(queued)
+        for writes, results in zip(pending.values(), outcomes):
+            self._coalesced += len(writes) - 1
+            for (_, _, future), result in zip(writes, results):
+                if future.done():
+                    continue
+                if isinstance(result, VersionConflict):
+                    self._conflicts += 1
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "window_ms": self.window * 1000,
+            "queued": sum(len(writes) for writes in self._pending.values()),
+            "writes": self._writes,
+            "commits": self._commits,
+            "coalesced": self._coalesced,
+            "conflicts": self._conflicts,
+        }
+
+
+write_buffer = WriteBuffer(
+    window=float(os.environ.get("BOARD_WRITE_WINDOW_MS", DEFAULT_WINDOW_MS)) / 1000
+)